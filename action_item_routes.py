@@ -2,7 +2,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from datetime import date
+from sqlalchemy import insert, text
 from models import db, User, Meeting, ActionItem
+from services.owner_index import resolve_owners
 
 action_bp = Blueprint("action_bp", __name__, url_prefix="/api")
 
@@ -18,11 +20,81 @@ def _resolve_owner_id(owner_val: str | None):
     """把 'owner'(使用者名稱字串) 轉到 ms_users.id，查不到就回 None。"""
     if not owner_val:
         return None
-    owner_val = str(owner_val).strip()
-    if not owner_val:
-        return None
-    user = User.query.filter_by(username=owner_val).first()
-    return user.id if user else None
+    hit = resolve_owners([owner_val]).get(str(owner_val).strip())
+    return hit[0] if hit else None
+
+def _autoinc_step():
+    """innodb_autoinc_lock_mode 為 0/1 時，單一多列 INSERT 取得的 id 保證連續，回傳 auto_increment_increment；
+    mode 2 (interleaved，MySQL 8 預設) 不保證，回傳 None。"""
+    lock_mode, step = db.session.execute(text("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")).one()
+    return int(step) if int(lock_mode) in (0, 1) else None
+
+def _insert_without_returning(table, values):
+    """MySQL 沒有 INSERT ... RETURNING：依 values 順序回傳 (id, created_at)。"""
+    step = _autoinc_step()
+    if step:
+        # 單一多列 INSERT：lastrowid 是這批的第一個 id，其餘依 step 連續
+        result = db.session.execute(insert(table).values(values))
+        ids = [result.lastrowid + i * step for i in range(result.rowcount)]
+    else:
+        ids = [db.session.execute(insert(table).values(row)).inserted_primary_key[0] for row in values]
+    created = dict(db.session.query(ActionItem.id, ActionItem.created_at).filter(ActionItem.id.in_(ids)).all())
+    return [(item_id, created.get(item_id)) for item_id in ids]
+
+def bulk_create_action_items(meeting, items):
+    """一次解析所有 owner、一次 executemany 寫入，回傳與 ActionItem.to_dict() 相同格式的 list。
+
+    沒有 action 的項目略過；呼叫端負責 commit。
+    """
+    rows = []
+    for r in items:
+        action_text = (r.get("action") or "").strip()
+        if not action_text:
+            continue
+        rows.append({
+            "meeting_id": meeting.id,
+            "item": (r.get("item") or r.get("context") or "").strip() or None,
+            "action": action_text,
+            "owner_id": r.get("owner_id"),
+            "due_date": _parse_date(r.get("due_date") or r.get("duedate")),
+            "status": "pending",
+            "_owner": r.get("owner"),
+        })
+    if not rows:
+        return []
+
+    owners = resolve_owners(row["_owner"] for row in rows if row["owner_id"] is None)
+    usernames = {user_id: username for user_id, username in owners.values()}
+    for row in rows:
+        if row["owner_id"] is None:
+            hit = owners.get(str(row["_owner"] or "").strip())
+            row["owner_id"] = hit[0] if hit else None
+    explicit_ids = {row["owner_id"] for row in rows if row["owner_id"] is not None} - usernames.keys()
+    if explicit_ids:
+        usernames.update(db.session.query(User.id, User.username).filter(User.id.in_(explicit_ids)).all())
+
+    values = [{k: v for k, v in row.items() if not k.startswith("_")} for row in rows]
+    # 用 Core 的 table insert：ORM bulk insert 會依「哪些欄位是 None」把資料拆成很多小批
+    table = ActionItem.__table__
+    if db.session.get_bind().dialect.insert_executemany_returning:
+        # 同一個多列 INSERT 內 id 依參數順序遞增，依 id 排序後即對回 values
+        inserted = sorted(db.session.execute(insert(table).returning(table.c.id, table.c.created_at), values).all())
+    else:
+        inserted = _insert_without_returning(table, values)
+
+    return [{
+        "id": item_id,
+        "meeting_id": row["meeting_id"],
+        "item": row["item"],
+        "action": row["action"],
+        "owner_id": row["owner_id"],
+        "due_date": row["due_date"].isoformat() if row["due_date"] else None,
+        "status": row["status"],
+        "attachment_path": None,
+        "created_at": created_at.isoformat() if created_at else None,
+        "meeting_topic": meeting.topic,
+        "owner_name": usernames.get(row["owner_id"]),
+    } for row, (item_id, created_at) in zip(values, inserted)]
 
 @action_bp.post("/action-items")
 @jwt_required()
@@ -82,31 +154,10 @@ def batch_create_action_items(meeting_id: int):
     if not meeting:
         return jsonify({"error": "meeting not found"}), 404
 
-    created = []
     try:
-        for r in items:
-            action_text = (r.get("action") or "").strip()
-            if not action_text:
-                continue  # 沒有 action 的略過
-
-            item_text = (r.get("item") or r.get("context") or "").strip() or None
-            owner_id = r.get("owner_id")
-            if owner_id is None:
-                owner_id = _resolve_owner_id(r.get("owner"))
-            due = _parse_date(r.get("due_date") or r.get("duedate"))
-
-            ai = ActionItem(
-                meeting_id=meeting_id,
-                item=item_text,
-                action=action_text,
-                owner_id=owner_id,
-                due_date=due,
-                status="pending",
-            )
-            db.session.add(ai)
-            created.append(ai)
+        created = bulk_create_action_items(meeting, items)  # 沒有 action 的略過
         db.session.commit()
-        return jsonify([c.to_dict() for c in created]), 201
+        return jsonify(created), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"batch create failed: {e}"}), 400
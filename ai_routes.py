@@ -1,10 +1,26 @@
 # ai_routes.py
+import os
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from services.dify_client import translate_text as _translate_text, summarize_text as _summarize_text, extract_action_items as _extract_action_items
+from flask_jwt_extended import jwt_required, current_user
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+from task_signatures import ai_translate_text_task, ai_summarize_text_task, ai_extract_action_items_task
 
 ai_bp = Blueprint("ai_bp", __name__, url_prefix="/api")
 
+# Dify 呼叫交給 Celery worker；結果在這段時間內回來就直接回傳，否則回 202 + task_id
+AI_FAST_PATH_MS = int(os.getenv("AI_FAST_PATH_MS", "1500"))
+
+def _run_with_fast_path(task, result_key, *args, **kwargs):
+    async_result = task.apply_async(args=args, kwargs=kwargs)
+    try:
+        result = async_result.get(timeout=AI_FAST_PATH_MS / 1000, propagate=False)
+    except CeleryTimeoutError:
+        return jsonify({"task_id": async_result.id, "status_url": f"/api/status/{async_result.id}"}), 202
+    if not isinstance(result, dict) or result.get("status") != "Success":
+        error = result.get("error") if isinstance(result, dict) else str(result)
+        return jsonify({"error": error or "AI request failed"}), 502
+    return jsonify({result_key: result[result_key]})
+
 @ai_bp.post("/translate/text")
 @jwt_required()
 def translate_text_api():
@@ -13,9 +29,9 @@ def translate_text_api():
     target = (data.get("target_lang") or "繁體中文").strip()
     if not text:
         return jsonify({"error": "text is required"}), 400
-    user_id = str(get_jwt_identity() or "user")
-    translated = _translate_text(text, target, user_id=user_id)
-    return jsonify({"translated": translated})
+    user_id = str(current_user.id)
+    return _run_with_fast_path(ai_translate_text_task, "translated", text, target, user_id=user_id,
+                               bypass_cache=bool(data.get("no_cache")))
 
 @ai_bp.post("/summarize/text")
 @jwt_required()
@@ -24,9 +40,9 @@ def summarize_text_api():
     text = (data.get("text") or "").strip()
     if not text:
         return jsonify({"error": "text is required"}), 400
-    user_id = str(get_jwt_identity() or "user")
-    summary = _summarize_text(text, user_id=user_id)
-    return jsonify({"summary": summary})
+    user_id = str(current_user.id)
+    return _run_with_fast_path(ai_summarize_text_task, "summary", text, user_id=user_id,
+                               bypass_cache=bool(data.get("no_cache")))
 
 @ai_bp.post("/action-items/preview")
 @jwt_required()
@@ -35,6 +51,6 @@ def preview_action_items_api():
     text = (data.get("text") or "").strip()
     if not text:
         return jsonify({"error": "text is required"}), 400
-    user_id = str(get_jwt_identity() or "user")
-    items = _extract_action_items(text, user_id=user_id)
-    return jsonify({"items": items})
+    user_id = str(current_user.id)
+    return _run_with_fast_path(ai_extract_action_items_task, "items", text, user_id=user_id,
+                               bypass_cache=bool(data.get("no_cache")))
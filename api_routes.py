@@ -1,25 +1,48 @@
 import os
 import uuid
+import base64
 import requests
 import json
 import re
-from flask import request, jsonify, send_from_directory
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+import time
+import logging
+import threading
+import redis
+from flask import request, jsonify, send_from_directory, Response, stream_with_context
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt, current_user
 from werkzeug.utils import secure_filename
+from sqlalchemy import and_, or_, exists
 from models import User, Meeting, ActionItem
 from app import app, db
-from tasks import (
-    celery,
+from auth import revocations, authenticate, client_ip, LoginError
+from celery_app import celery
+from task_signatures import (
     extract_audio_task,
     transcribe_audio_task,
     translate_segments_task,
     summarize_text_task,
-    preview_action_items_task
+    preview_action_items_task,
+    build_processing_pipeline,
+    PIPELINE_STAGES
 )
+from services.redis_store import get_redis
+from services import result_cache, progress_bus, upload_store, task_queues, dify_client
 from datetime import datetime, date
 
+logger = logging.getLogger(__name__)
+
 # --- Helper Function for File Uploads ---
 def save_uploaded_file(file_key='file'):
+    # 分段上傳完成後只送 blob (sha256)，直接使用已存好的檔案
+    blob = request.form.get('blob')
+    if blob and file_key not in request.files:
+        blob = blob.lower()
+        # 只能引用自己上傳過的 blob；別人的 sha256 視同不存在
+        owned = upload_store.owns_blob(app.config['UPLOAD_FOLDER'], blob, get_jwt_identity())
+        blob_path = owned and upload_store.find_blob(app.config['UPLOAD_FOLDER'], blob)
+        if not blob_path:
+            return None, (jsonify({'error': '找不到已上傳的檔案'}), 404)
+        return blob_path, None
     if file_key not in request.files:
         return None, (jsonify({'error': '請求中沒有檔案部分'}), 400)
     file = request.files[file_key]
@@ -34,39 +57,224 @@ def save_uploaded_file(file_key='file'):
         return file_path, None
     return None, (jsonify({'error': '未知的檔案錯誤'}), 500)
 
+def _form_flag(name):
+    """'on' / 'off' → True / False；沒送則回 None 交由伺服器預設值決定。"""
+    value = request.form.get(name)
+    return None if value is None else value == 'on'
+
+def _output_stem(input_path):
+    """輸出檔路徑前綴；blob 由多個請求共用，輸出改用新的 uuid 避免互相覆蓋。"""
+    if os.path.dirname(os.path.abspath(input_path)) == os.path.abspath(app.config['UPLOAD_FOLDER']):
+        return os.path.splitext(input_path)[0]
+    return os.path.join(app.config['UPLOAD_FOLDER'], str(uuid.uuid4()))
+
+# --- Helpers for List Endpoints (keyset pagination / filters / sparse fields) ---
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+class InvalidCursor(ValueError):
+    pass
+
+@app.errorhandler(InvalidCursor)
+def _invalid_cursor(e):
+    return jsonify({'error': 'Invalid cursor'}), 400
+
+def _page_limit():
+    """只有 client 帶 limit 或 cursor 時才分頁；沒帶的舊 client 仍拿到完整清單。"""
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return None
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _page(query, limit):
+    # 多查一筆判斷是否還有下一頁
+    return (query if limit is None else query.limit(limit + 1)).all()
+
+def _requested_fields():
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    return {f.strip() for f in raw.split(',') if f.strip()}
+
+def _encode_cursor(*values):
+    raw = json.dumps([v.isoformat() if isinstance(v, (datetime, date)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _cursor_int(value):
+    if type(value) is not int:
+        raise TypeError(value)
+    return value
+
+def _cursor_datetime(value):
+    if not isinstance(value, str):
+        raise TypeError(value)
+    return datetime.fromisoformat(value)
+
+def _decode_cursor(*converters):
+    """依 converters 逐欄驗證並轉型；cursor 格式、長度或型別不符一律回 400。"""
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8'))
+        if not isinstance(values, list) or len(values) != len(converters):
+            raise InvalidCursor(cursor)
+        return [convert(value) for convert, value in zip(converters, values)]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+
+class InvalidFilter(ValueError):
+    pass
+
+@app.errorhandler(InvalidFilter)
+def _invalid_filter(e):
+    return jsonify({'error': f'Invalid {e}'}), 400
+
+def _arg_int(name):
+    """格式錯誤回 400，不要默默變成 None (owner_id IS NULL 會列出未指派的資料)。"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidFilter(name)
+
+def _arg_datetime(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise InvalidFilter(name)
+
+def _paginated(rows, limit, make_cursor, serialize):
+    """下一頁的 cursor 放在 X-Next-Cursor header，body 維持陣列；limit 為 None 時回傳全部。"""
+    if limit is None:
+        return jsonify([serialize(row) for row in rows])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    response = jsonify([serialize(row) for row in rows])
+    if has_more:
+        response.headers['X-Next-Cursor'] = make_cursor(rows[-1])
+    return response
+
 # --- User Authentication Routes ---
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
     if not data or not data.get('username') or not data.get('password'):
         return jsonify({"msg": "Missing username or password"}), 400
-    user = User.query.filter_by(username=data.get('username')).first()
-    if user and user.check_password(data.get('password')):
+    try:
+        user = authenticate(data.get('username'), data.get('password'), client_ip())
+    except LoginError as e:
+        response = jsonify({"msg": e.message})
+        response.status_code = e.status
+        if e.retry_after:
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    if user:
+        if not user.is_active:
+            return jsonify({"msg": "Account disabled"}), 403
+        # role claim 只給前端顯示用；後端權限以 current_user.role (資料庫) 為準
         access_token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
         return jsonify(access_token=access_token)
     return jsonify({"msg": "Bad username or password"}), 401
 
+@app.route('/api/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    token = get_jwt()
+    try:
+        revocations.revoke(token['jti'], token['exp'])
+    except redis.RedisError:
+        # 撤銷清單寫不進去時 token 仍然有效，不能回報登出成功
+        logger.exception("failed to revoke token %s", token['jti'])
+        return jsonify({"error": "暫時無法撤銷 token，請稍後再試"}), 503
+    return jsonify({"msg": "Logged out"}), 200
+
 # --- Admin User Management Routes ---
 @app.route('/api/admin/users', methods=['GET'])
 @jwt_required()
 def get_all_users():
-    if get_jwt().get('role') != 'admin':
+    if current_user.role != 'admin':
+        return jsonify({"msg": "Administration rights required"}), 403
+    limit, fields = _page_limit(), _requested_fields()
+    query = User.query
+    cursor = _decode_cursor(_cursor_int)
+    if cursor:
+        query = query.filter(User.id > cursor[0])
+    users = _page(query.order_by(User.id.asc()), limit)
+    return _paginated(users, limit, lambda u: _encode_cursor(u.id), lambda u: u.to_dict(fields=fields))
+
+@app.route('/api/admin/users/<int:user_id>', methods=['PATCH'])
+@jwt_required()
+def update_user(user_id):
+    """停用 / 啟用帳號或調整角色；變更後該使用者既有的 token 立即套用新狀態。"""
+    if current_user.role != 'admin':
         return jsonify({"msg": "Administration rights required"}), 403
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    user = User.query.get_or_404(user_id)
+    data = request.get_json(force=True) or {}
+    if 'role' in data:
+        if data['role'] not in ('user', 'admin'):
+            return jsonify({"msg": "role must be 'user' or 'admin'"}), 400
+        user.role = data['role']
+    if 'is_active' in data:
+        user.is_active = bool(data['is_active'])
+    db.session.commit()
+    return jsonify(user.to_dict())
 
 # --- Meeting Management Routes ---
 @app.route('/api/meetings', methods=['GET'])
 @jwt_required()
 def get_meetings():
-    meetings = Meeting.query.order_by(Meeting.meeting_date.desc()).all()
-    return jsonify([meeting.to_dict() for meeting in meetings])
+    """
+    Query params: limit, cursor, fields, creator_id, date_from, date_to,
+    status / owner_id (只列出含有符合條件代辦的會議)
+    """
+    limit, fields = _page_limit(), _requested_fields()
+    query = Meeting.query_with_counts(with_creator=fields is None or 'creator_username' in fields)
+
+    creator_id = _arg_int('creator_id')
+    if creator_id is not None:
+        query = query.filter(Meeting.created_by_id == creator_id)
+    date_from, date_to = _arg_datetime('date_from'), _arg_datetime('date_to')
+    if date_from:
+        query = query.filter(Meeting.meeting_date >= date_from)
+    if date_to:
+        query = query.filter(Meeting.meeting_date <= date_to)
+    item_filters = []
+    if request.args.get('status'):
+        item_filters.append(ActionItem.status == request.args['status'])
+    owner_id = _arg_int('owner_id')
+    if owner_id is not None:
+        item_filters.append(ActionItem.owner_id == owner_id)
+    if item_filters:
+        query = query.filter(exists().where(ActionItem.meeting_id == Meeting.id, *item_filters))
+
+    cursor = _decode_cursor(_cursor_datetime, _cursor_int)
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.filter(or_(
+            Meeting.meeting_date < cursor_date,
+            and_(Meeting.meeting_date == cursor_date, Meeting.id < cursor_id),
+        ))
+    rows = _page(query.order_by(Meeting.meeting_date.desc(), Meeting.id.desc()), limit)
+    return _paginated(
+        rows, limit,
+        lambda row: _encode_cursor(row[0].meeting_date, row[0].id),
+        lambda row: row[0].to_dict(action_item_count=row[1], fields=fields),
+    )
 
 @app.route('/api/meetings/<int:meeting_id>', methods=['GET'])
 @jwt_required()
 def get_meeting_details(meeting_id):
-    meeting = Meeting.query.get_or_404(meeting_id)
-    return jsonify(meeting.to_dict())
+    row = Meeting.query_with_counts().filter(Meeting.id == meeting_id).first_or_404()
+    return jsonify(row[0].to_dict(action_item_count=row[1]))
 
 @app.route('/api/meetings', methods=['POST'])
 @jwt_required()
@@ -80,7 +288,7 @@ def create_meeting():
         meeting_date = datetime.fromisoformat(meeting_date_str.replace('Z', '+00:00')).date()
     except ValueError:
         return jsonify({'error': 'Invalid date format for meeting_date'}), 400
-    new_meeting = Meeting(topic=topic, meeting_date=meeting_date, created_by_id=get_jwt_identity())
+    new_meeting = Meeting(topic=topic, meeting_date=meeting_date, created_by_id=current_user.id)
     db.session.add(new_meeting)
     db.session.commit()
     return jsonify(new_meeting.to_dict()), 201
@@ -89,14 +297,28 @@ def create_meeting():
 @app.route('/api/meetings/<int:meeting_id>/action_items', methods=['GET'])
 @jwt_required()
 def get_action_items_for_meeting(meeting_id):
+    """Query params: limit, cursor, fields, status, owner_id"""
     Meeting.query.get_or_404(meeting_id)
-    action_items = ActionItem.query.filter_by(meeting_id=meeting_id).all()
-    return jsonify([item.to_dict() for item in action_items])
+    limit, fields = _page_limit(), _requested_fields()
+    query = ActionItem.query_with_relations(
+        with_meeting=fields is None or 'meeting_topic' in fields,
+        with_owner=fields is None or 'owner_name' in fields,
+    ).filter(ActionItem.meeting_id == meeting_id)
+    if request.args.get('status'):
+        query = query.filter(ActionItem.status == request.args['status'])
+    owner_id = _arg_int('owner_id')
+    if owner_id is not None:
+        query = query.filter(ActionItem.owner_id == owner_id)
+    cursor = _decode_cursor(_cursor_int)
+    if cursor:
+        query = query.filter(ActionItem.id > cursor[0])
+    action_items = _page(query.order_by(ActionItem.id.asc()), limit)
+    return _paginated(action_items, limit, lambda i: _encode_cursor(i.id), lambda i: i.to_dict(fields=fields))
 
 @app.route('/api/action_items/<int:item_id>', methods=['GET'])
 @jwt_required()
 def get_action_item_details(item_id):
-    action_item = ActionItem.query.get_or_404(item_id)
+    action_item = ActionItem.query_with_relations().filter_by(id=item_id).first_or_404()
     return jsonify(action_item.to_dict())
 
 @app.route('/api/action_items/<int:item_id>', methods=['PUT'])
@@ -128,7 +350,7 @@ def preview_action_items():
     text_content = data.get('text')
     if not text_content:
         return jsonify({'error': 'Text content is required'}), 400
-    task = preview_action_items_task.delay(text_content)
+    task = preview_action_items_task.delay(text_content, bypass_cache=bool(data.get('no_cache')))
     status_url = f'/api/status/{task.id}'
     return jsonify({'task_id': task.id, 'status_url': status_url}), 202
 
@@ -138,7 +360,7 @@ def preview_action_items():
 def handle_extract_audio():
     input_path, error = save_uploaded_file()
     if error: return error
-    output_audio_path = os.path.splitext(input_path)[0] + ".wav"
+    output_audio_path = _output_stem(input_path) + ".wav"
     task = extract_audio_task.delay(input_path, output_audio_path)
     return jsonify({'task_id': task.id, 'status_url': f'/api/status/{task.id}'}), 202
 
@@ -149,8 +371,12 @@ def handle_transcribe_audio():
     if error: return error
     language = request.form.get('language', 'auto')
     use_demucs = request.form.get('use_demucs') == 'on'
-    output_txt_path = os.path.splitext(input_path)[0] + ".txt"
-    task = transcribe_audio_task.delay(input_path, output_txt_path, language, use_demucs)
+    model_size = request.form.get('model') or None
+    output_txt_path = _output_stem(input_path) + ".txt"
+    task = transcribe_audio_task.delay(input_path, output_txt_path, language, use_demucs, model_size,
+                                       bypass_cache=request.form.get('no_cache') == 'on',
+                                       backend=request.form.get('backend') or None,
+                                       use_vad=_form_flag('use_vad'))
     return jsonify({'task_id': task.id, 'status_url': f'/api/status/{task.id}'}), 202
 
 @app.route('/api/translate_text', methods=['POST'])
@@ -159,8 +385,9 @@ def handle_translate_text():
     input_path, error = save_uploaded_file()
     if error: return error
     target_language = request.form.get('target_language', '繁體中文')
-    output_txt_path = os.path.splitext(input_path)[0] + "_translated.txt"
-    task = translate_segments_task.delay(input_path, output_txt_path, target_language)
+    output_txt_path = _output_stem(input_path) + "_translated.txt"
+    task = translate_segments_task.delay(input_path, output_txt_path, target_language,
+                                         bypass_cache=request.form.get('no_cache') == 'on')
     return jsonify({'task_id': task.id, 'status_url': f'/api/status/{task.id}'}), 202
 
 @app.route('/api/summarize_text', methods=['POST'])
@@ -170,18 +397,217 @@ def handle_summarize_text():
     text_content = data.get('text_content')
     if not text_content:
         return jsonify({'error': '請求中缺少 text_content'}), 400
-    task = summarize_text_task.delay(text_content, data.get('target_language', '繁體中文'), data.get('conversation_id'), data.get('revision_instruction'))
+    task = summarize_text_task.delay(text_content, data.get('target_language', '繁體中文'), data.get('conversation_id'), data.get('revision_instruction'),
+                                     bypass_cache=bool(data.get('no_cache')))
     return jsonify({'task_id': task.id, 'status_url': f'/api/status/{task.id}'}), 202
 
-# --- Task Status and Download Routes ---
-@app.route('/api/status/<task_id>')
+# --- Fused Processing Pipeline ---
+PIPELINE_TTL_SECONDS = 24 * 3600
+PIPELINE_WEIGHTS = {'extract': 15, 'transcribe': 55, 'translate': 10, 'summary': 10, 'action_items': 10}
+
+def _load_pipeline(pipeline_id):
+    """只回傳目前使用者自己的 pipeline (admin 可看全部)；別人的視同不存在，不透露 id 是否有效。"""
+    raw = get_redis().get(f"pipeline:{pipeline_id}")
+    pipeline = json.loads(raw) if raw else None
+    if pipeline and str(pipeline.get('user_id')) != str(get_jwt_identity()) and current_user.role != 'admin':
+        return None
+    return pipeline
+
+def _stage_status(stage):
+    task = celery.AsyncResult(stage['task_id'])
+    info = task.info if isinstance(task.info, dict) else ({'error': str(task.info)} if task.info else {})
+    state = task.state
+    if state == 'SUCCESS' and info.get('status') == 'Error':
+        state = 'FAILURE'
+    if state == 'SUCCESS':
+        fraction = 1.0
+        if info.get('result_path'):
+            info['download_filename'] = os.path.basename(info['result_path'])
+    elif state == 'PROGRESS' and info.get('total'):
+        fraction = info.get('current', 0) / info['total']
+    else:
+        fraction = 0.0
+    return {'task_id': stage['task_id'], 'state': state, 'info': info}, fraction
+
+@app.route('/api/pipeline', methods=['POST'])
 @jwt_required()
-def get_task_status(task_id):
+def start_pipeline():
+    input_path, error = save_uploaded_file()
+    if error: return error
+    canvas, stages = build_processing_pipeline(
+        input_path,
+        language=request.form.get('language', 'auto'),
+        target_language=request.form.get('target_language', '繁體中文'),
+        use_demucs=request.form.get('use_demucs') == 'on',
+        model_size=request.form.get('model') or None,
+        output_stem=_output_stem(input_path),
+        backend=request.form.get('backend') or None,
+        use_vad=_form_flag('use_vad'),
+    )
+    pipeline_id = str(uuid.uuid4())
+    get_redis().set(f"pipeline:{pipeline_id}", json.dumps({'user_id': get_jwt_identity(), 'stages': stages}), ex=PIPELINE_TTL_SECONDS)
+    canvas.apply_async()
+    return jsonify({
+        'pipeline_id': pipeline_id,
+        'task_id': pipeline_id,
+        'status_url': f'/api/pipeline/{pipeline_id}',
+        'stages': {name: stage['task_id'] for name, stage in stages.items()},
+    }), 202
+
+@app.route('/api/pipeline/<pipeline_id>')
+@jwt_required()
+def get_pipeline_status(pipeline_id):
+    pipeline = _load_pipeline(pipeline_id)
+    if not pipeline:
+        return jsonify({'error': 'pipeline not found'}), 404
+    stages, progress, current_msg = {}, 0.0, None
+    for name in PIPELINE_STAGES:
+        stages[name], fraction = _stage_status(pipeline['stages'][name])
+        progress += PIPELINE_WEIGHTS[name] * fraction
+        if stages[name]['state'] == 'PROGRESS' and not current_msg:
+            current_msg = f"{name}: {stages[name]['info'].get('status_msg', '')}"
+
+    states = [stage['state'] for stage in stages.values()]
+    if 'FAILURE' in states:
+        state = 'FAILURE'
+    elif 'REVOKED' in states:
+        state = 'REVOKED'
+    elif all(s == 'SUCCESS' for s in states):
+        state = 'SUCCESS'
+    elif any(s in ('PROGRESS', 'SUCCESS', 'STARTED') for s in states):
+        state = 'PROGRESS'
+    else:
+        state = 'PENDING'
+    failed = next((stage['info'].get('error') for stage in stages.values() if stage['state'] == 'FAILURE'), None)
+    info = {'current': round(progress, 1), 'total': 100, 'status_msg': current_msg or state.lower()}
+    if failed:
+        info['error'] = failed
+    return jsonify({'pipeline_id': pipeline_id, 'state': state, 'info': info, 'stages': stages})
+
+@app.route('/api/pipeline/<pipeline_id>/stop', methods=['POST'])
+@jwt_required()
+def stop_pipeline(pipeline_id):
+    pipeline = _load_pipeline(pipeline_id)
+    if not pipeline:
+        return jsonify({'error': 'pipeline not found'}), 404
+    for stage in pipeline['stages'].values():
+        celery.control.revoke(stage['task_id'], terminate=True)
+    return jsonify({'status': 'revoked'}), 200
+
+@app.route('/api/admin/cache_stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    if current_user.role != 'admin':
+        return jsonify({"msg": "Administration rights required"}), 403
+    stats = result_cache.stats()
+    stats['dify'] = dify_client.metrics()
+    return jsonify(stats)
+
+@app.route('/api/admin/queue_stats', methods=['GET'])
+@jwt_required()
+def get_queue_stats():
+    if current_user.role != 'admin':
+        return jsonify({"msg": "Administration rights required"}), 403
+    return jsonify(task_queues.stats(celery.conf.broker_url))
+
+# --- Task Status and Download Routes ---
+def _task_snapshot(task_id):
     task = celery.AsyncResult(task_id)
     response_data = {'state': task.state, 'info': task.info if isinstance(task.info, dict) else str(task.info)}
     if task.state == 'SUCCESS' and isinstance(task.info, dict) and 'result_path' in task.info and task.info.get('result_path'):
         response_data['info']['download_filename'] = os.path.basename(task.info['result_path'])
-    return jsonify(response_data)
+    return response_data
+
+@app.route('/api/status/<task_id>')
+@jwt_required()
+def get_task_status(task_id):
+    return jsonify(_task_snapshot(task_id))
+
+# --- Push-based Task Progress (Server-Sent Events) ---
+# 每條 SSE 連線佔住一個 worker thread，需用 gthread worker 跑 (見 gunicorn.conf.py)。
+# 每個 process 同時開著的連線數限制在 thread 數以下，留 thread 給一般 API；超過回 503，前端改為輪詢
+EVENTS_MAX_TASKS = 20
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_MAX_SECONDS = int(os.getenv('EVENTS_MAX_SECONDS', '300'))  # 到時結束連線讓 thread 輪替，EventSource 會自動重連
+EVENTS_MAX_CONNECTIONS = int(os.getenv('EVENTS_MAX_CONNECTIONS', '16'))
+READY_STATES = {'SUCCESS', 'FAILURE', 'REVOKED'}
+_event_streams = threading.BoundedSemaphore(EVENTS_MAX_CONNECTIONS)
+
+def _progress_delta(last, state, info):
+    """只送出和上一筆不同的欄位；state 改變時一律送。"""
+    info = info if isinstance(info, dict) else {'result': info}
+    previous = last.get('info', {})
+    delta = {k: v for k, v in info.items() if previous.get(k) != v}
+    if state == last.get('state') and not delta:
+        return None
+    last['state'], last['info'] = state, {**previous, **info}
+    return {'state': state, 'info': delta}
+
+@app.route('/api/events')
+@jwt_required(locations=['headers', 'query_string'])
+def task_events():
+    """
+    以一條 SSE 連線同時訂閱多個 task：/api/events?task_ids=a,b,c
+    (EventSource 無法帶 header，token 可用 ?jwt=<token> 傳入)
+    """
+    task_ids = [t for t in request.args.get('task_ids', '').split(',') if t][:EVENTS_MAX_TASKS]
+    if not task_ids:
+        return jsonify({'error': 'task_ids is required'}), 400
+    if not _event_streams.acquire(blocking=False):
+        response = jsonify({'error': 'Too many event streams, poll /api/status instead'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(EVENTS_HEARTBEAT_SECONDS)
+        return response
+
+    def event(task_id, delta):
+        return f"event: progress\ndata: {json.dumps({'task_id': task_id, **delta}, ensure_ascii=False, default=str)}\n\n"
+
+    def stream():
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        # 先訂閱再取快照，避免兩者之間的更新遺失
+        pubsub.subscribe(*[progress_bus.channel_for(t) for t in task_ids])
+        last = {t: {} for t in task_ids}
+        pending = set(task_ids)
+        started = last_sent = time.monotonic()
+        try:
+            for task_id in task_ids:
+                snapshot = _task_snapshot(task_id)
+                yield event(task_id, _progress_delta(last[task_id], snapshot['state'], snapshot['info']))
+                if snapshot['state'] in READY_STATES:
+                    pending.discard(task_id)
+            while pending and time.monotonic() - started < EVENTS_MAX_SECONDS:
+                message = pubsub.get_message(timeout=1.0)
+                if message:
+                    payload = json.loads(message['data'])
+                    updates = [(payload['task_id'], payload['state'], payload['info'])]
+                elif time.monotonic() - last_sent >= EVENTS_HEARTBEAT_SECONDS:
+                    # 心跳時順便以快照校正，補上可能漏掉的推送 (例如 revoke)
+                    snapshots = {t: _task_snapshot(t) for t in pending}
+                    updates = [(t, snap['state'], snap['info']) for t, snap in snapshots.items()]
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+                else:
+                    continue
+                for task_id, state, info in updates:
+                    if task_id not in pending:
+                        continue
+                    delta = _progress_delta(last[task_id], state, info)
+                    if delta:
+                        yield event(task_id, delta)
+                        last_sent = time.monotonic()
+                    if state in READY_STATES:
+                        pending.discard(task_id)
+            if not pending:
+                # 全部結束才送 end；時間到則直接斷線，讓 EventSource 重連後從快照接續
+                yield "event: end\ndata: {}\n\n"
+        finally:
+            pubsub.close()
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # 由 WSGI server 關閉 response 時釋放；generator 沒開始跑就斷線時 finally 不會執行
+    response.call_on_close(_event_streams.release)
+    return response
 
 @app.route('/api/download/<filename>')
 @jwt_required()
@@ -9,6 +9,7 @@ from flask_cors import CORS
 from flask.cli import with_appcontext
 
 from models import db, bcrypt, User
+from auth import init_jwt
 
 # --- Flask App Initialization ---
 load_dotenv()
@@ -19,6 +20,8 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=3)
+# 調整後既有密碼會在使用者下次登入時以新成本重新 hash
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', '12'))
 
 project_root = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(project_root, 'uploads')
@@ -32,6 +35,7 @@ db.init_app(app)
 bcrypt.init_app(app)
 migrate = Migrate(app, db)
 jwt = JWTManager(app)
+init_jwt(jwt)
 CORS(app)
 
 # --- Root Route ---
@@ -80,3 +84,9 @@ try: app.register_blueprint(ai_bp)
 except Exception as e: print("ai_routes not registered:", e)
 try: app.register_blueprint(action_bp)
 except Exception as e: print("action_item_routes not registered:", e)
+from upload_routes import upload_bp
+try: app.register_blueprint(upload_bp)
+except Exception as e: print("upload_routes not registered:", e)
+from transcript_routes import transcript_bp
+try: app.register_blueprint(transcript_bp)
+except Exception as e: print("transcript_routes not registered:", e)
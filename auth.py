@@ -0,0 +1,350 @@
+# auth.py
+# JWT 驗證時的使用者查詢與 token 撤銷檢查；熱門端點不必每次查資料庫
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from dataclasses import dataclass
+
+import redis
+from flask import jsonify, request, current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from dotenv import load_dotenv
+
+from models import db, bcrypt, User
+from services.redis_store import get_redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+# 本 process 的變更 (停用、改角色) 立即生效；其他 process 最多延遲這麼久
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+
+# 撤銷清單：依 token 到期日分桶的 Redis bitmap (bloom filter)，過期的桶整個丟掉
+# 2^18 bits (32 KB)、k=7：每桶約 2 萬個撤銷 token 時誤判率約 1%，誤判只會多一次 EXISTS
+REVOCATION_BITS = 1 << 18
+REVOCATION_HASHES = 7
+REVOCATION_BUCKET_SECONDS = 86400
+# 本機 bitmap 副本的更新間隔：其他 process 撤銷的 token 最多延遲這麼久才被擋下
+AUTH_REVOCATION_REFRESH = float(os.getenv("AUTH_REVOCATION_REFRESH", "5"))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """快取用的使用者資料 (不是 ORM 物件，跨 request / session 共用也安全)。"""
+    id: int
+    username: str
+    role: str
+    is_active: bool
+
+
+class UserCache:
+    """user id → UserSnapshot 的 TTL + LRU 快取；查不到的 id 也會暫存 (None)。"""
+
+    def __init__(self, capacity: int = AUTH_USER_CACHE_SIZE, ttl: float = AUTH_USER_CACHE_TTL):
+        self._capacity = max(1, capacity)
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id → (loaded_at, snapshot | None)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and now - entry[0] <= self._ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        row = (db.session.query(User.id, User.username, User.role, User.is_active)
+               .filter(User.id == user_id).first())
+        snapshot = UserSnapshot(row.id, row.username, row.role, bool(row.is_active)) if row else None
+        with self._lock:
+            self._entries[user_id] = (now, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+user_cache = UserCache()
+
+
+def _on_user_change(mapper, connection, target):
+    # flush 時先清一次；commit 後再清一次，避免 flush 到 commit 之間讀到舊資料又被快取
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("auth_changed_users", set()).add(target.id)
+
+def _after_commit(session):
+    for user_id in session.info.pop("auth_changed_users", ()):
+        user_cache.invalidate(user_id)
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(User, _event, _on_user_change)
+event.listen(Session, "after_commit", _after_commit)
+
+
+# --- token 撤銷 ---
+def _bucket_key(exp) -> str:
+    return f"jwt:revoked:bloom:{int(exp) // REVOCATION_BUCKET_SECONDS}"
+
+def _bit_offsets(jti: str) -> list[int]:
+    digest = hashlib.sha256(jti.encode("utf-8")).digest()
+    return [int.from_bytes(digest[i * 4:i * 4 + 4], "big") % REVOCATION_BITS for i in range(REVOCATION_HASHES)]
+
+def _bits_set(bitmap: bytes, offsets) -> bool:
+    # Redis bitmap 的 bit 0 是第一個 byte 的最高位
+    for offset in offsets:
+        index = offset >> 3
+        if index >= len(bitmap) or not (bitmap[index] >> (7 - (offset & 7))) & 1:
+            return False
+    return True
+
+
+class RevocationFilter:
+    """本機保存各桶 bloom bitmap 的副本，定期從 Redis 更新。
+
+    bloom 判定「沒撤銷」就直接放行 (不碰網路)；判定「可能撤銷」才用 EXISTS 確認。
+    """
+
+    def __init__(self, refresh: float = AUTH_REVOCATION_REFRESH):
+        self._refresh = refresh
+        self._lock = threading.Lock()
+        self._bitmaps = {}  # bucket key → (fetched_at, bytes)
+
+    def _bitmap(self, key: str) -> bytes:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._bitmaps.get(key)
+        if cached and now - cached[0] <= self._refresh:
+            return cached[1]
+        bitmap = get_redis(decode_responses=False).get(key) or b""
+        with self._lock:
+            self._bitmaps[key] = (now, bitmap)
+            # 已過期的桶不再需要
+            for stale in [k for k, (fetched, _) in self._bitmaps.items() if now - fetched > REVOCATION_BUCKET_SECONDS]:
+                del self._bitmaps[stale]
+        return bitmap
+
+    def is_revoked(self, jti: str, exp) -> bool:
+        if not jti or exp is None:
+            return False
+        try:
+            if not _bits_set(self._bitmap(_bucket_key(exp)), _bit_offsets(jti)):
+                return False
+            return bool(get_redis().exists(f"jwt:revoked:{jti}"))
+        except redis.RedisError as e:
+            # 與其他 Redis 功能一致：Redis 不通時放行，只記 log
+            logger.warning("token revocation check unavailable: %s", e)
+            return False
+
+    def revoke(self, jti: str, exp):
+        ttl = max(1, int(exp - time.time()))
+        key = _bucket_key(exp)
+        pipe = get_redis().pipeline()
+        pipe.set(f"jwt:revoked:{jti}", 1, ex=ttl)
+        for offset in _bit_offsets(jti):
+            pipe.setbit(key, offset, 1)
+        pipe.expireat(key, (int(exp) // REVOCATION_BUCKET_SECONDS + 1) * REVOCATION_BUCKET_SECONDS)
+        pipe.execute()
+        with self._lock:
+            self._bitmaps.pop(key, None)  # 本 process 立即生效
+
+
+revocations = RevocationFilter()
+
+
+# --- 登入：bcrypt 在有上限的 thread pool 執行 (bcrypt 計算時會釋放 GIL)，並以 Redis 限制嘗試次數 ---
+LOGIN_WORKERS = int(os.getenv("LOGIN_WORKERS", str(os.cpu_count() or 2)))
+# 排隊上限：最久只等約 (LOGIN_MAX_PENDING / LOGIN_WORKERS) 次 bcrypt 的時間，再多直接回 503 + Retry-After
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", str(4 * LOGIN_WORKERS)))
+LOGIN_TIMEOUT = float(os.getenv("LOGIN_TIMEOUT", "10"))
+LOGIN_IP_LIMIT = int(os.getenv("LOGIN_IP_LIMIT", "30"))  # 每個 IP 每個 window 的嘗試次數 (含成功)
+LOGIN_IP_WINDOW = int(os.getenv("LOGIN_IP_WINDOW", "60"))
+# 同一帳號從同一 IP 連續失敗的次數；以 (帳號, IP) 計，別人無法從自己的 IP 把帳號 (例如 admin) 鎖住
+LOGIN_USER_FAIL_LIMIT = int(os.getenv("LOGIN_USER_FAIL_LIMIT", "5"))
+LOGIN_USER_WINDOW = int(os.getenv("LOGIN_USER_WINDOW", "900"))
+# 不分 IP 的帳號總失敗次數：擋住分散在大量 IP 的猜密碼；門檻較高，避免別人輕易把帳號鎖住
+LOGIN_ACCOUNT_FAIL_LIMIT = int(os.getenv("LOGIN_ACCOUNT_FAIL_LIMIT", "50"))
+LOGIN_ACCOUNT_WINDOW = int(os.getenv("LOGIN_ACCOUNT_WINDOW", "900"))
+# 前面有 reverse proxy 時才信任 X-Forwarded-For，否則任何人都能偽造 IP 繞過限制
+LOGIN_TRUST_FORWARDED = os.getenv("LOGIN_TRUST_FORWARDED", "0") == "1"
+
+
+class LoginError(Exception):
+    def __init__(self, message: str, status: int, retry_after: int | None = None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.retry_after = retry_after
+
+
+_login_lock = threading.Lock()
+_login_pool = None
+_login_pool_pid = None
+_login_slots = threading.BoundedSemaphore(LOGIN_WORKERS + LOGIN_MAX_PENDING)
+_dummy_hashes = {}
+
+
+def _pool() -> ThreadPoolExecutor:
+    # fork 後 (gunicorn prefork) 重建，thread 不會跟著 fork 過來
+    global _login_pool, _login_pool_pid
+    with _login_lock:
+        if _login_pool is None or _login_pool_pid != os.getpid():
+            _login_pool = ThreadPoolExecutor(max_workers=max(1, LOGIN_WORKERS), thread_name_prefix="login")
+            _login_pool_pid = os.getpid()
+        return _login_pool
+
+
+def _hash_rounds(password_hash: str) -> int | None:
+    # $2b$12$<salt+hash>
+    try:
+        return int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _verify(password_hash: str | None, password: str, rounds: int):
+    """回傳 (是否正確, 需要更新時的新 hash)。帳號不存在時比對同成本的假 hash，回應時間與密碼錯誤相同。"""
+    if password_hash is None:
+        if rounds not in _dummy_hashes:
+            _dummy_hashes[rounds] = bcrypt.generate_password_hash(os.urandom(16).hex(), rounds).decode("utf-8")
+        bcrypt.check_password_hash(_dummy_hashes[rounds], password)
+        return False, None
+    if not bcrypt.check_password_hash(password_hash, password):
+        return False, None
+    # BCRYPT_LOG_ROUNDS 調整後，使用者下次登入時改用新成本重新 hash
+    if _hash_rounds(password_hash) != rounds:
+        return True, bcrypt.generate_password_hash(password, rounds).decode("utf-8")
+    return True, None
+
+
+def _run_in_pool(fn, *args):
+    if not _login_slots.acquire(blocking=False):
+        raise LoginError("Login service busy, please retry", 503, retry_after=1)
+    try:
+        future = _pool().submit(fn, *args)
+    except Exception:
+        _login_slots.release()
+        raise
+    future.add_done_callback(lambda _: _login_slots.release())
+    try:
+        return future.result(timeout=LOGIN_TIMEOUT)
+    except FuturesTimeout:
+        raise LoginError("Login service busy, please retry", 503, retry_after=1)
+
+
+def client_ip() -> str:
+    if LOGIN_TRUST_FORWARDED and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or "unknown"
+
+
+def _limit_keys(username: str, ip: str) -> tuple[str, str, str]:
+    name = username.strip().casefold()[:80]
+    return f"login:ip:{ip}", f"login:fail:{ip}:{name}", f"login:fail:account:{name}"
+
+
+def _check_limits(username: str, ip: str):
+    """固定時間窗計數；超過上限回 429 與 Retry-After。Redis 不通時放行。"""
+    ip_key, user_key, account_key = _limit_keys(username, ip)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.set(ip_key, 0, ex=LOGIN_IP_WINDOW, nx=True)
+        pipe.incr(ip_key)
+        pipe.ttl(ip_key)
+        pipe.get(user_key)
+        pipe.ttl(user_key)
+        pipe.get(account_key)
+        pipe.ttl(account_key)
+        _, ip_count, ip_ttl, failures, user_ttl, account_failures, account_ttl = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("login rate limiting unavailable: %s", e)
+        return
+    if ip_count > LOGIN_IP_LIMIT:
+        raise LoginError("Too many login attempts, please retry later", 429, retry_after=max(1, ip_ttl))
+    if int(failures or 0) >= LOGIN_USER_FAIL_LIMIT:
+        raise LoginError("Too many failed attempts for this account, please retry later", 429,
+                         retry_after=max(1, user_ttl))
+    if int(account_failures or 0) >= LOGIN_ACCOUNT_FAIL_LIMIT:
+        raise LoginError("Too many failed attempts for this account, please retry later", 429,
+                         retry_after=max(1, account_ttl))
+
+
+def _record_failure(username: str, ip: str):
+    _, user_key, account_key = _limit_keys(username, ip)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.set(user_key, 0, ex=LOGIN_USER_WINDOW, nx=True)
+        pipe.incr(user_key)
+        pipe.set(account_key, 0, ex=LOGIN_ACCOUNT_WINDOW, nx=True)
+        pipe.incr(account_key)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def _clear_failures(username: str, ip: str):
+    try:
+        get_redis().delete(*_limit_keys(username, ip)[1:])
+    except redis.RedisError:
+        pass
+
+
+def authenticate(username: str, password: str, ip: str):
+    """檢查速率限制後在 login pool 驗證密碼；成功回傳 User，帳密錯誤回傳 None，被限制時拋出 LoginError。"""
+    username, password = str(username), str(password)
+    _check_limits(username, ip)
+    rounds = current_app.config.get("BCRYPT_LOG_ROUNDS", 12)
+    user = User.query.filter_by(username=username).first()
+    ok, new_hash = _run_in_pool(_verify, user.password_hash if user else None, password, rounds)
+    if not ok:
+        _record_failure(username, ip)
+        return None
+    _clear_failures(username, ip)
+    if new_hash:
+        user.password_hash = new_hash
+        db.session.commit()
+    return user
+
+
+def init_jwt(jwt):
+    """註冊 flask_jwt_extended callbacks：current_user 為 UserSnapshot，停用或不存在的使用者一律 401。"""
+
+    @jwt.user_lookup_loader
+    def load_user(_jwt_header, jwt_data):
+        try:
+            user = user_cache.get(int(jwt_data["sub"]))
+        except (TypeError, ValueError):
+            return None
+        return user if user and user.is_active else None
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error(_jwt_header, _jwt_data):
+        return jsonify({"msg": "User not found or disabled"}), 401
+
+    @jwt.token_in_blocklist_loader
+    def token_revoked(_jwt_header, jwt_data):
+        return revocations.is_revoked(jwt_data.get("jti"), jwt_data.get("exp"))
@@ -0,0 +1,124 @@
+"""Batch action-item creation benchmark (1,000-item payloads).
+
+Compares the previous per-row path (one owner lookup per item, ORM add,
+to_dict() per row) with bulk_create_action_items (one IN query, in-memory
+alias/fuzzy index, one executemany) on an in-memory SQLite database and
+reports SQL statement counts and wall time. Every run also checks that
+the returned ids map to the inserted action/owner rows. Owner names mix exact
+usernames, case/width variants, email-style aliases and typos.
+
+    python benchmarks/bench_batch_action_items.py
+"""
+import os
+import sys
+import random
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, User, Meeting, ActionItem
+
+ITEMS = 1000
+USERS = 200
+ROUNDS = 3
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    db.session.add_all([User(username=f"user.{i:03d}@example.com" if i % 2 else f"Chen Wei {i:03d}", password_hash="x")
+                        for i in range(USERS)])
+    meeting = Meeting(topic="Quarterly planning", meeting_date=datetime(2024, 1, 1))
+    db.session.add(meeting)
+    db.session.commit()
+    return meeting.id
+
+
+def payload(rng):
+    names = [u for (u,) in db.session.query(User.username)]
+    variants = [
+        lambda n: n,                                  # exact
+        lambda n: n.upper(),                          # case
+        lambda n: n.split("@")[0] if "@" in n else n.replace(" ", ""),  # alias
+        lambda n: n[:-1] + ("x" if n[-1] != "x" else "y"),              # typo
+    ]
+    return [{
+        "item": f"topic {i}",
+        "action": f"follow up {i}",
+        "owner": rng.choice(variants)(rng.choice(names)),
+        "due_date": "2024-02-01",
+    } for i in range(ITEMS)]
+
+
+def legacy_create(meeting_id, items):
+    meeting = db.session.get(Meeting, meeting_id)
+    created = []
+    for r in items:
+        user = User.query.filter_by(username=str(r["owner"]).strip()).first()
+        ai = ActionItem(meeting_id=meeting.id, item=r["item"], action=r["action"],
+                        owner_id=user.id if user else None,
+                        due_date=datetime.fromisoformat(r["due_date"]).date(), status="pending")
+        db.session.add(ai)
+        created.append(ai)
+    db.session.commit()
+    return [c.to_dict() for c in created]
+
+
+def bulk_create(meeting_id, items):
+    from action_item_routes import bulk_create_action_items
+    created = bulk_create_action_items(db.session.get(Meeting, meeting_id), items)
+    db.session.commit()
+    return created
+
+
+def check_mapping(result):
+    """回傳的 id 必須對到資料庫中同一筆 action / owner，否則 raise。"""
+    rows = {row.id: (row.action, row.owner_id)
+            for row in ActionItem.query.filter(ActionItem.id.in_([r["id"] for r in result]))}
+    wrong = [r["id"] for r in result if rows.get(r["id"]) != (r["action"], r["owner_id"])]
+    if wrong or len(rows) != len(result):
+        raise AssertionError(f"{len(wrong)} returned ids do not match the inserted rows (e.g. {wrong[:5]})")
+
+
+def measure(fn, *args):
+    statements = []
+    listener = lambda *a: statements.append(a[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        started = time.perf_counter()
+        result = fn(*args)
+        return result, len(statements), (time.perf_counter() - started) * 1000
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+        db.session.expunge_all()
+
+
+def main():
+    app = make_app()
+    rng = random.Random(42)
+    with app.app_context():
+        for name, fn in (("legacy", legacy_create), ("bulk", bulk_create)):
+            for round_no in range(ROUNDS):
+                meeting_id = seed()
+                items = payload(rng)
+                result, statements, elapsed_ms = measure(fn, meeting_id, items)
+                check_mapping(result)
+                resolved = sum(1 for r in result if r["owner_id"])
+                print(f"{name:<7} round={round_no} items={len(result):<5} statements={statements:<5} "
+                      f"owners_resolved={resolved:<5} {elapsed_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
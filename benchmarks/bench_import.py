@@ -0,0 +1,115 @@
+"""Cold-start benchmark: import time and RSS per process type.
+
+Each target is imported in a fresh interpreter with ``-X importtime``.
+The report shows wall time for the import, the summed import time from
+the importtime log, peak/current RSS, and the packages that take the
+most import time (self time summed per top-level package). ``web`` is
+what a gunicorn worker loads (app + all blueprints). ``worker`` is
+``celery -A tasks`` before any task runs.
+``worker-media`` also loads the transcription stack that the first
+transcribe task imports.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --repeat 5 --top 15 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "web": "import app",
+    "worker": "import tasks",
+    "worker-media": "import tasks; import services.transcription, services.audio, services.vad",
+}
+
+HEAVY = ("tasks", "whisper", "torch", "numpy", "faster_whisper", "demucs", "opencc")
+
+PROBE = """
+import resource, sys, time
+started = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - started
+rss_kb = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+print('RESULT', elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, rss_kb,
+      ','.join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def parse_importtime(stderr: str) -> tuple[float, dict[str, int]]:
+    """回傳 (所有 import 的 self 時間總和 ms, 依頂層套件加總的 self 時間 us)。"""
+    total_us, packages = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        package = name.strip().split(".")[0]
+        total_us += int(self_us)
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return total_us / 1000, packages
+
+
+def run_target(stmt: str) -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    # app.py 需要資料庫 URL 才能建立 SQLAlchemy；import 階段不會連線
+    env.setdefault("DATABASE_URL", "sqlite://")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE.format(stmt=stmt, heavy=HEAVY)],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    result = [line for line in proc.stdout.splitlines() if line.startswith("RESULT")]
+    if proc.returncode or not result:
+        tail = [l for l in proc.stderr.splitlines() if l.strip() and not l.startswith("import time:")][-1:] or ["no output"]
+        return {"error": tail[0]}
+    _, elapsed, maxrss_kb, rss_kb, *heavy = result[0].split(" ")
+    import_ms, packages = parse_importtime(proc.stderr)
+    return {
+        "wall_ms": float(elapsed) * 1000,
+        "import_ms": import_ms,
+        "maxrss_mb": int(maxrss_kb) / 1024,
+        "rss_mb": int(rss_kb) / 1024,
+        "heavy": [m for m in (heavy[0].split(",") if heavy else []) if m],
+        "packages": packages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print one JSON object per target (for tracking over time)")
+    args = parser.parse_args()
+
+    for name in [t.strip() for t in args.targets.split(",") if t.strip()]:
+        runs = [run_target(TARGETS[name]) for _ in range(args.repeat)]
+        failed = [r for r in runs if "error" in r]
+        if failed:
+            print(f"{name:<13} failed: {failed[0]['error']}")
+            continue
+        summary = {
+            "target": name,
+            "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+            "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+            "maxrss_mb": round(max(r["maxrss_mb"] for r in runs), 1),
+            "rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1),
+            "heavy_modules": runs[-1]["heavy"],
+        }
+        if args.json:
+            print(json.dumps(summary))
+            continue
+        print(f"{name:<13} wall={summary['wall_ms']:8.1f} ms  importtime={summary['import_ms']:8.1f} ms  "
+              f"rss={summary['rss_mb']:6.1f} MB  peak={summary['maxrss_mb']:6.1f} MB  "
+              f"heavy={','.join(summary['heavy_modules']) or '-'}")
+        for package, self_us in sorted(runs[-1]["packages"].items(), key=lambda t: -t[1])[:args.top]:
+            print(f"    {self_us / 1000:8.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Login load benchmark: login p50/p99 under concurrent traffic.
+
+Starts the app on a threaded local server (one thread per request, like
+gunicorn gthread). Three kinds of client run against it at once:
+- legitimate users logging in with the right password, each from its own IP,
+  pausing ``--think`` seconds between logins;
+- attackers sending wrong passwords for real and made-up usernames from one IP;
+- a probe hitting a cheap endpoint, to show whether bcrypt starves the API.
+
+Two routes are compared. ``legacy`` runs check_password inline, as /api/login
+did before. ``current`` is /api/login, with the bounded bcrypt pool and Redis
+rate limits. Rate limiting needs a reachable REDIS_URL. Without it the limits
+fail open, and only the pool bound is measured.
+
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --users 8 --attackers 16 --seconds 20 --rounds 12
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 每個 client 用自己的 X-Forwarded-For 模擬不同來源
+os.environ.setdefault("LOGIN_TRUST_FORWARDED", "1")
+
+ATTACKER_IP = "203.0.113.66"
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else float("nan")
+
+
+def setup(rounds, users):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_login.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["BCRYPT_LOG_ROUNDS"] = str(rounds)
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-login-secret-key-0123456789abcdef")
+    from flask import request, jsonify
+    from flask_jwt_extended import create_access_token
+    from app import app
+    from models import db, User
+
+    @app.route("/bench/legacy_login", methods=["POST"])
+    def legacy_login():
+        data = request.get_json()
+        user = User.query.filter_by(username=data.get("username")).first()
+        if user and user.check_password(data.get("password")):
+            return jsonify(access_token=create_access_token(identity=str(user.id)))
+        return jsonify({"msg": "Bad username or password"}), 401
+
+    with app.app_context():
+        db.create_all()
+        for i in range(users):
+            user = User(username=f"bench{i}")
+            user.set_password(f"secret-{i}")
+            db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def redis_available():
+    import redis
+    from services.redis_store import get_redis
+    try:
+        return bool(get_redis().ping())
+    except redis.RedisError:
+        return False
+
+
+def run_scenario(base_url, path, users, attackers, seconds, think):
+    import requests
+
+    stop = threading.Event()
+    legit, legit_status, attack_status, probe = [], Counter(), Counter(), []
+    lock = threading.Lock()
+
+    def legit_client(i):
+        session = requests.Session()
+        headers = {"X-Forwarded-For": f"198.51.100.{i + 1}"}
+        while not stop.is_set():
+            started = time.perf_counter()
+            r = session.post(base_url + path, json={"username": f"bench{i}", "password": f"secret-{i}"}, headers=headers)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                legit.append(elapsed)
+                legit_status[r.status_code] += 1
+            stop.wait(think)
+
+    def attacker(_):
+        session = requests.Session()
+        rng = random.Random()
+        while not stop.is_set():
+            name = f"bench{rng.randrange(users)}" if rng.random() < 0.5 else f"ghost{rng.randrange(10**6)}"
+            r = session.post(base_url + path, json={"username": name, "password": "hunter2"},
+                             headers={"X-Forwarded-For": ATTACKER_IP})
+            with lock:
+                attack_status[r.status_code] += 1
+
+    def prober():
+        session = requests.Session()
+        while not stop.is_set():
+            started = time.perf_counter()
+            session.get(base_url + "/")
+            with lock:
+                probe.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.05)
+
+    threads = ([threading.Thread(target=legit_client, args=(i,)) for i in range(users)]
+               + [threading.Thread(target=attacker, args=(i,)) for i in range(attackers)]
+               + [threading.Thread(target=prober)])
+    for t in threads:
+        t.daemon = True
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join(timeout=30)
+    return legit, legit_status, attack_status, probe
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--attackers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--think", type=float, default=2.0, help="pause between logins of one legitimate user")
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_LOG_ROUNDS", "12")))
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    logging.getLogger("auth").setLevel(logging.ERROR)  # Redis 不通時每次登入都會警告一次
+    app = setup(args.rounds, args.users)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    print(f"bcrypt rounds={args.rounds} users={args.users} attackers={args.attackers} cpus={os.cpu_count()} "
+          f"rate limiting={'on' if redis_available() else 'off (Redis unreachable, limits fail open)'}")
+
+    for name, path in (("legacy", "/bench/legacy_login"), ("current", "/api/login")):
+        legit, legit_status, attack_status, probe = run_scenario(base_url, path, args.users, args.attackers, args.seconds,
+                                                                   args.think)
+        ok = legit_status.get(200, 0)
+        print(f"{name:<8} login p50={statistics.median(legit) if legit else float('nan'):8.1f} ms "
+              f"p99={percentile(legit, 0.99):8.1f} ms  ok={ok:<5} other={dict(legit_status - Counter({200: ok}))}  "
+              f"attacks={dict(attack_status)}  probe p50={statistics.median(probe) if probe else float('nan'):6.1f} ms "
+              f"p99={percentile(probe, 0.99):7.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
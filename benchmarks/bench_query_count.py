@@ -0,0 +1,90 @@
+"""Query-count benchmark for the meeting / action item list endpoints.
+
+Seeds an in-memory SQLite database at several sizes and asserts that the
+list queries issue the same number of SQL statements regardless of row
+count (i.e. no N+1 lazy loads or per-row COUNTs).
+
+    python benchmarks/bench_query_count.py
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, User, Meeting, ActionItem
+
+SIZES = (10, 100, 500)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(n_meetings):
+    db.drop_all()
+    db.create_all()
+    users = [User(username=f"user{i}", password_hash="x") for i in range(20)]
+    db.session.add_all(users)
+    db.session.flush()
+    base = datetime(2024, 1, 1)
+    for i in range(n_meetings):
+        meeting = Meeting(topic=f"Meeting {i}", meeting_date=base + timedelta(days=i), created_by_id=users[i % 20].id)
+        db.session.add(meeting)
+        db.session.flush()
+        db.session.add_all([
+            ActionItem(meeting_id=meeting.id, action=f"action {i}-{j}", owner_id=users[j % 20].id)
+            for j in range(3)
+        ])
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def count_statements(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        started = time.perf_counter()
+        fn()
+        return len(statements), (time.perf_counter() - started) * 1000
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+        db.session.expunge_all()
+
+
+def list_meetings():
+    rows = Meeting.query_with_counts().order_by(Meeting.meeting_date.desc()).all()
+    return [meeting.to_dict(action_item_count=count) for meeting, count in rows]
+
+
+def list_action_items():
+    return [item.to_dict() for item in ActionItem.query_with_relations().all()]
+
+
+def main():
+    app = make_app()
+    results = {}
+    with app.app_context():
+        for size in SIZES:
+            seed(size)
+            for name, fn in (("meetings", list_meetings), ("action_items", list_action_items)):
+                statements, elapsed_ms = count_statements(fn)
+                results.setdefault(name, []).append(statements)
+                print(f"{name:<13} rows={size:<5} statements={statements:<3} {elapsed_ms:8.1f} ms")
+
+    for name, counts in results.items():
+        assert len(set(counts)) == 1, f"{name}: statement count grows with rows: {counts}"
+    print("OK: statement counts are constant across sizes")
+
+
+if __name__ == "__main__":
+    main()
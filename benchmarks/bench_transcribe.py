@@ -0,0 +1,84 @@
+"""Transcription backend benchmark: real-time factor and peak RSS.
+
+Each backend runs in its own subprocess so peak RSS reflects only that
+engine (model weights + inference buffers). Real-time factor is
+transcription wall time divided by audio duration (lower is better).
+
+    python benchmarks/bench_transcribe.py sample.wav
+    python benchmarks/bench_transcribe.py sample.wav --model small --backends whisper,faster-whisper
+"""
+import argparse
+import difflib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run_one(audio_path, backend, model_size, device):
+    from services.audio import decode_pcm
+    from services.transcription import SAMPLE_RATE, get_model, transcribe_chunked
+
+    audio = decode_pcm(audio_path)
+    started = time.perf_counter()
+    model, info = get_model(model_size, device, backend)
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = transcribe_chunked(model, audio, model_size=model_size, device=device, workers=1, backend=backend)
+    elapsed = time.perf_counter() - started
+    duration = len(audio) / SAMPLE_RATE
+    return {
+        "backend": backend,
+        "model": info["key"],
+        "audio_seconds": round(duration, 1),
+        "load_seconds": round(load_seconds, 2),
+        "transcribe_seconds": round(elapsed, 2),
+        "rtf": round(elapsed / duration, 3) if duration else None,
+        # Linux 回傳 KB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "segments": len(result["segments"]),
+        "language": result["language"],
+        "text": result["text"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("audio")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--backends", default="whisper,faster-whisper")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_one(args.audio, args.child, args.model, args.device), ensure_ascii=False))
+        return
+
+    results = []
+    for backend in args.backends.split(","):
+        proc = subprocess.run(
+            [sys.executable, __file__, args.audio, "--model", args.model, "--device", args.device, "--child", backend],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{backend:<15} FAILED\n{proc.stderr.strip()[-2000:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    baseline = results[0]["text"] if results else ""
+    print(f"{'backend':<15} {'model':<22} {'load s':>7} {'xcribe s':>9} {'RTF':>6} {'peak RSS MB':>12} {'segs':>5} {'text sim':>9}")
+    for r in results:
+        similarity = difflib.SequenceMatcher(None, baseline, r["text"]).ratio()
+        print(f"{r['backend']:<15} {r['model']:<22} {r['load_seconds']:>7} {r['transcribe_seconds']:>9} "
+              f"{r['rtf']:>6} {r['peak_rss_mb']:>12} {r['segments']:>5} {similarity:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
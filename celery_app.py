@@ -0,0 +1,55 @@
+# celery_app.py
+# Celery app 與 queue 設定；web process 只 import 這裡與 task_signatures，不載入 tasks (Whisper / torch)
+import os
+import time
+from celery import Celery, current_task
+from celery.signals import celeryd_init, before_task_publish
+from dotenv import load_dotenv
+
+from services import task_queues
+
+load_dotenv()
+
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+# app 名稱維持 'tasks'：task 名稱 (tasks.xxx) 與既有的 worker 指令 celery -A tasks worker 不變
+celery = Celery('tasks', broker=CELERY_BROKER_URL, backend=CELERY_RESULT_BACKEND, include=['tasks'])
+celery.conf.update(
+    task_queues=task_queues.QUEUES,
+    task_routes=task_queues.TASK_ROUTES,
+    task_default_queue=task_queues.INTERACTIVE_QUEUE,
+)
+
+# worker 訂閱的 queue (celeryd_init 時記下，fork 出的 worker process 會繼承)
+worker_queues = []
+
+@celeryd_init.connect
+def apply_queue_profile(sender=None, conf=None, options=None, **kwargs):
+    # celery -A tasks worker -Q media → concurrency 1、prefetch 1
+    queues = (options or {}).get('queues')
+    if isinstance(queues, str):
+        queues = [q.strip() for q in queues.split(',') if q.strip()]
+    worker_queues[:] = list(queues or [])
+    profile = task_queues.worker_profile(worker_queues)
+    if profile:
+        conf.worker_concurrency = profile['concurrency']
+        conf.worker_prefetch_multiplier = profile['prefetch_multiplier']
+
+@before_task_publish.connect
+def stamp_task_headers(headers=None, **kwargs):
+    # 送出時間用來算排隊等待；使用者 id 用於公平排程 (web 端取 JWT，pipeline 後續階段沿用上一個 task 的)
+    headers.setdefault(task_queues.ENQUEUED_HEADER, time.time())
+    if not headers.get(task_queues.USER_HEADER):
+        user_id = _publishing_user()
+        if user_id:
+            headers[task_queues.USER_HEADER] = str(user_id)
+
+def _publishing_user():
+    if current_task and current_task.request.id:
+        return task_queues.header(current_task.request, task_queues.USER_HEADER)
+    try:
+        from flask import has_request_context
+        from flask_jwt_extended import get_jwt_identity
+        return get_jwt_identity() if has_request_context() else None
+    except Exception:
+        return None
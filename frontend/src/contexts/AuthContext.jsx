@@ -54,6 +54,11 @@ export const AuthProvider = ({ children }) => {
     };
 
     const logout = () => {
+        // Revoke the token server-side (best effort); the local session is cleared either way
+        const current = localStorage.getItem('token');
+        if (current) {
+            axios.post('/api/logout', null, { headers: { Authorization: `Bearer ${current}` } }).catch(() => {});
+        }
         localStorage.removeItem('token');
         setToken(null);
         setUser(null);
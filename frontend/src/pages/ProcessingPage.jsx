@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import {
     Box, Typography, Paper, Button, TextField, Select, MenuItem, FormControl, InputLabel, CircularProgress, Alert, Grid, Card, CardContent, CardActions, Chip, LinearProgress
 } from '@mui/material';
@@ -7,9 +7,12 @@ import {
     extractAudio, 
     transcribeAudio, 
     translateTextFile, 
+    runPipeline,
+    stopPipeline,
     summarizeText, 
     previewActionItems, 
     pollTaskStatus, 
+    subscribeTaskEvents,
     stopTask, 
     getFileContent
 } from '../services/api';
@@ -72,21 +75,59 @@ const ProcessingPage = () => {
             if (key === 'summary' && updatedTask.info.summary) {
                 setSummary(updatedTask.info.summary);
             }
-            if (key === 'action_preview' && updatedTask.info.parsed_items) {
-                // Add a temporary unique ID for react keys
-                const itemsWithTempId = updatedTask.info.parsed_items.map(item => ({ ...item, tempId: Math.random() }));
-                setActionItems(itemsWithTempId);
+        }
+        if (key === 'pipeline' && updatedTask.stages) {
+            const { transcribe, summary: summaryStage, action_items } = updatedTask.stages;
+            if (transcribe?.state === 'SUCCESS' && transcribe.info?.download_filename && !updatedTask.transcriptLoaded) {
+                updatedTask.transcriptLoaded = true;
+                getFileContent(transcribe.info.download_filename).then(setText).catch(() => setError('Failed to fetch transcribed text content.'));
+            }
+            if (summaryStage?.state === 'SUCCESS' && summaryStage.info?.summary) {
+                setSummary(summaryStage.info.summary);
+            }
+            // Items arrive progressively as transcript windows finish (PROGRESS) and once more on SUCCESS
+            if (action_items?.info?.parsed_items) {
+                setActionItems(action_items.info.parsed_items.map(item => ({ ...item, tempId: Math.random() })));
             }
         }
+        if (key === 'action_preview' && updatedTask.info?.parsed_items) {
+            // Add a temporary unique ID for react keys; partial results are replaced as more windows finish
+            setActionItems(updatedTask.info.parsed_items.map(item => ({ ...item, tempId: Math.random() })));
+        }
+        if (key === 'summary' && updatedTask.state === 'PROGRESS' && updatedTask.info?.partial_summary) {
+            setSummary(updatedTask.info.partial_summary);
+        }
         if (key === 'translate' && updatedTask.info.preview) {
             setTranslationPreview(updatedTask.info.preview);
         }
 
     }, []);
 
+    const tasksRef = useRef(tasks);
+    tasksRef.current = tasks;
+
+    // Single task IDs are pushed over one SSE connection; the connection is rebuilt only when the set of active IDs changes
+    const activeTaskIds = Object.entries(tasks)
+        .filter(([key, task]) => key !== 'pipeline' && task?.task_id && (task.state === 'PENDING' || task.state === 'PROGRESS'))
+        .map(([, task]) => task.task_id)
+        .sort()
+        .join(',');
+
+    useEffect(() => {
+        if (!activeTaskIds) return undefined;
+        return subscribeTaskEvents(activeTaskIds.split(','), (event) => {
+            const entry = Object.entries(tasksRef.current).find(([, task]) => task?.task_id === event.task_id);
+            if (!entry) return;
+            const [key, task] = entry;
+            const info = typeof task.info === 'object' && task.info ? task.info : {};
+            handleTaskUpdate(key, { ...task, state: event.state, info: { ...info, ...event.info } });
+        }, () => setError('Lost connection to task progress stream.'));
+    }, [activeTaskIds, handleTaskUpdate]);
+
+    // The aggregated pipeline view is still polled
     useEffect(() => {
         const intervalIds = Object.entries(tasks).map(([key, task]) => {
-            if (task && (task.state === 'PENDING' || task.state === 'PROGRESS')) {
+            if (key === 'pipeline' && task && (task.state === 'PENDING' || task.state === 'PROGRESS')) {
                 return setInterval(async () => {
                     try {
                         const updatedTask = await pollTaskStatus(task.status_url);
@@ -118,8 +159,8 @@ const ProcessingPage = () => {
 
     const handleStopTask = async (taskId) => {
         try {
-            await stopTask(taskId);
             const taskKey = Object.keys(tasks).find(k => tasks[k].task_id === taskId);
+            await (taskKey === 'pipeline' ? stopPipeline(taskId) : stopTask(taskId));
             if (taskKey) {
                 setTasks(prev => ({ ...prev, [taskKey]: { ...prev[taskKey], state: 'REVOKED' } }));
             }
@@ -143,6 +184,10 @@ const ProcessingPage = () => {
                         <Typography variant="h6">File-based Tools</Typography>
                         <Button variant="contained" component="label" sx={{ mt: 2 }}>Upload File<input type="file" hidden onChange={e => setFile(e.target.files[0])} /></Button>
                         {file && <Typography sx={{ mt: 1, fontStyle: 'italic' }}>{file.name}</Typography>}
+                        <Box sx={{mt:2}}>
+                            <Button size="small" variant="contained" disabled={!file} onClick={() => handleStartTask('pipeline', runPipeline, file, transcribeLang, translateLang, false)}>Run Full Pipeline</Button>
+                            <TaskMonitor task={tasks.pipeline} onStop={handleStopTask} />
+                        </Box>
                         <Box sx={{mt:2}}>
                             <Button size="small" variant="outlined" disabled={!file} onClick={() => handleStartTask('extract', extractAudio, file)}>Extract Audio</Button>
                             <TaskMonitor task={tasks.extract} onStop={handleStopTask} />
@@ -27,10 +27,51 @@ axios.interceptors.request.use(config => {
     return Promise.reject(error);
 });
 
+// Chunked, resumable upload: files above this size go through /uploads and are referenced by their sha256 blob
+const CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_MAX_RETRIES = 5;
+
+export const uploadFileChunked = async (file, onProgress) => {
+    const { data: session } = await axios.post('/uploads', { filename: file.name, size: file.size });
+    if (session.complete) return session.blob;
+    const uploadId = session.upload_id;
+    let offset = 0;
+    let retries = 0;
+    while (offset < file.size) {
+        const end = Math.min(offset + UPLOAD_CHUNK_SIZE, file.size);
+        try {
+            const { data } = await axios.put(`/uploads/${uploadId}`, file.slice(offset, end), {
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Range': `bytes ${offset}-${end - 1}/${file.size}`,
+                },
+            });
+            offset = data.offset;
+            retries = 0;
+            if (onProgress) onProgress(offset / file.size);
+        } catch (err) {
+            if (++retries > UPLOAD_MAX_RETRIES) throw err;
+            // Resume from whatever the server committed (409 carries it; otherwise ask)
+            const committed = err.response?.data?.offset;
+            offset = typeof committed === 'number'
+                ? committed
+                : (await axios.get(`/uploads/${uploadId}`)).data.offset;
+            await new Promise(resolve => setTimeout(resolve, 500 * retries));
+        }
+    }
+    const { data: done } = await axios.post(`/uploads/${uploadId}/complete`);
+    return done.blob;
+};
+
 // Helper function to start a task that involves file upload
 const startFileUploadTask = async (endpoint, file, options = {}) => {
     const formData = new FormData();
-    formData.append('file', file);
+    if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+        formData.append('blob', await uploadFileChunked(file));
+    } else {
+        formData.append('file', file);
+    }
     for (const key in options) {
         formData.append(key, options[key]);
     }
@@ -50,11 +91,53 @@ export const pollTaskStatus = async (statusUrl) => {
 
 export const stopTask = (taskId) => axios.post(`/task/${taskId}/stop`);
 
+// Fallback when the event stream is refused (503 when the server is at its SSE connection cap) or drops for good
+const TERMINAL_STATES = ['SUCCESS', 'FAILURE', 'REVOKED'];
+const pollTasks = (taskIds, onUpdate, onError, intervalMs = 2000) => {
+    const pending = new Set(taskIds);
+    const timer = setInterval(async () => {
+        try {
+            await Promise.all([...pending].map(async (taskId) => {
+                const { state, info } = await axios.get(`/status/${taskId}`).then(res => res.data);
+                onUpdate({ task_id: taskId, state, info });
+                if (TERMINAL_STATES.includes(state)) pending.delete(taskId);
+            }));
+            if (!pending.size) clearInterval(timer);
+        } catch (err) {
+            clearInterval(timer);
+            if (onError) onError(err);
+        }
+    }, intervalMs);
+    return () => clearInterval(timer);
+};
+
+// Push-based progress: one SSE connection multiplexes many task IDs; each event carries only changed fields
+export const subscribeTaskEvents = (taskIds, onUpdate, onError) => {
+    const token = localStorage.getItem('token') || localStorage.getItem('accessToken');
+    const params = new URLSearchParams({ task_ids: taskIds.join(',') });
+    if (token) params.set('jwt', token);
+    const source = new EventSource(`/api/events?${params.toString()}`);
+    let stopPolling = null;
+    source.addEventListener('progress', (e) => onUpdate(JSON.parse(e.data)));
+    source.addEventListener('end', () => source.close());
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED && !stopPolling) stopPolling = pollTasks(taskIds, onUpdate, onError);
+    };
+    return () => {
+        source.close();
+        if (stopPolling) stopPolling();
+    };
+};
+
 // --- Processing Tasks ---
 export const extractAudio = (file) => startFileUploadTask('/extract_audio', file);
-export const transcribeAudio = (file, language, useDemucs) => startFileUploadTask('/transcribe_audio', file, { language, use_demucs: useDemucs ? 'on' : 'off' });
+export const transcribeAudio = (file, language, useDemucs, backend = null) => startFileUploadTask('/transcribe_audio', file, { language, use_demucs: useDemucs ? 'on' : 'off', ...(backend ? { backend } : {}) });
 export const translateTextFile = (file, targetLanguage) => startFileUploadTask('/translate_text', file, { target_language: targetLanguage });
 
+// --- Fused Pipeline: extract → transcribe → translate / summarize / action items ---
+export const runPipeline = (file, language, targetLanguage, useDemucs) => startFileUploadTask('/pipeline', file, { language, target_language: targetLanguage, use_demucs: useDemucs ? 'on' : 'off' });
+export const stopPipeline = (pipelineId) => axios.post(`/pipeline/${pipelineId}/stop`);
+
 export const summarizeText = (textContent, conversationId = null, revisionInstruction = null) => {
     return axios.post('/summarize_text', { 
         text_content: textContent, 
@@ -63,6 +146,20 @@ export const summarizeText = (textContent, conversationId = null, revisionInstru
     }).then(res => res.data); // Return data directly
 };
 
+// --- Segment-level transcript: window by time (start/end seconds) or page by offset/limit ---
+export const getTranscriptSegments = (filename, params = {}) =>
+    axios.get(`/transcripts/${filename}`, { params }).then(res => res.data);
+export const getTranscriptText = (filename, format = 'srt', params = {}) =>
+    axios.get(`/transcripts/${filename}`, { params: { ...params, format } }).then(res => res.data);
+
+// --- Persisted transcripts / summaries and full-text search ---
+export const saveTranscriptToMeeting = (meetingId, filename, language = null) =>
+    axios.post(`/meetings/${meetingId}/transcripts`, { filename, language }).then(res => res.data);
+export const saveSummaryToMeeting = (meetingId, content, language = null) =>
+    axios.post(`/meetings/${meetingId}/summaries`, { content, language }).then(res => res.data);
+export const searchMeetings = (q, params = {}) =>
+    axios.get('/search', { params: { ...params, q } }).then(res => res.data);
+
 // --- File Download and Content Fetching ---
 export const downloadFile = async (filename) => {
     const response = await axios.get(`/download/${filename}`, {
@@ -122,15 +219,35 @@ export const batchCreateActionItems = (meetingId, actionItems) => {
     return axios.post(`/meetings/${meetingId}/action_items/batch`, actionItems);
 };
 
-// === AI 同步處理 ===
+// === AI 處理 (fast path：短時間內完成直接回 200，否則回 202 + task_id，改等推播結果) ===
+const waitForTask = (taskId) => new Promise((resolve, reject) => {
+  let info = {};
+  const close = subscribeTaskEvents([taskId], (event) => {
+    info = { ...info, ...event.info };
+    if (event.state === 'SUCCESS') {
+      close();
+      info.status === 'Error' ? reject(new Error(info.error)) : resolve(info);
+    } else if (event.state === 'FAILURE' || event.state === 'REVOKED') {
+      close();
+      reject(new Error(info.error || event.state));
+    }
+  }, reject);
+});
+
+const resolveFastPath = async (response, key) => {
+  if (response.status !== 202) return response.data;
+  const info = await waitForTask(response.data.task_id);
+  return { [key]: info[key] };
+};
+
 export const translateText = (text, target_lang = '繁體中文') =>
-  api.post('/translate/text', { text, target_lang }).then(r => r.data);
+  api.post('/translate/text', { text, target_lang }).then(r => resolveFastPath(r, 'translated'));
 
 export const summarizeText = (text) =>
-  api.post('/summarize/text', { text }).then(r => r.data);
+  api.post('/summarize/text', { text }).then(r => resolveFastPath(r, 'summary'));
 
 export const previewActionItems = (text) =>
-  api.post('/action-items/preview', { text }).then(r => r.data);
+  api.post('/action-items/preview', { text }).then(r => resolveFastPath(r, 'items'));
 
 // === 代辦儲存 ===
 export const createActionItem = (payload) =>
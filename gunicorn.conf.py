@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# gunicorn 會自動讀取工作目錄下的這個檔案：gunicorn app:app
+#
+# /api/events (SSE) 每條連線會佔住一個 worker thread 直到 task 結束或 EVENTS_MAX_SECONDS，
+# 預設的 sync worker 一個 process 只有一個 thread，幾條 SSE 就能把整個 web 卡住，所以改用 gthread。
+# 不用 gevent：bcrypt 登入 pool、SQLAlchemy 連線與 Redis client 都以 thread 為前提，monkey patch 會改變其行為。
+# 每個 process 的 SSE 連線上限 EVENTS_MAX_CONNECTIONS 必須小於 threads，超過的連線回 503，前端改為輪詢 /api/status。
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+# gthread 的 timeout 只看 worker 主迴圈的心跳，長時間的 SSE 不會被誤殺
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive = 5
+
+_events = int(os.getenv("EVENTS_MAX_CONNECTIONS", "16"))
+if _events >= threads:
+    raise RuntimeError(f"EVENTS_MAX_CONNECTIONS ({_events}) must be below GUNICORN_THREADS ({threads})")
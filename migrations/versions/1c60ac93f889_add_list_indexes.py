@@ -0,0 +1,36 @@
+"""add composite indexes for keyset pagination and list filters
+
+Revision ID: 1c60ac93f889
+Revises: 5b1e0f7c2a93
+Create Date: 2026-10-16 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c60ac93f889'
+down_revision = '5b1e0f7c2a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ms_meetings', schema=None) as batch_op:
+        batch_op.create_index('ix_ms_meetings_meeting_date_id', ['meeting_date', 'id'], unique=False)
+        batch_op.create_index('ix_ms_meetings_created_by_date', ['created_by_id', 'meeting_date', 'id'], unique=False)
+
+    with op.batch_alter_table('ms_action_items', schema=None) as batch_op:
+        batch_op.create_index('ix_ms_action_items_meeting_status', ['meeting_id', 'status', 'id'], unique=False)
+        batch_op.create_index('ix_ms_action_items_owner_status', ['owner_id', 'status', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ms_action_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_ms_action_items_owner_status')
+        batch_op.drop_index('ix_ms_action_items_meeting_status')
+
+    with op.batch_alter_table('ms_meetings', schema=None) as batch_op:
+        batch_op.drop_index('ix_ms_meetings_created_by_date')
+        batch_op.drop_index('ix_ms_meetings_meeting_date_id')
@@ -0,0 +1,61 @@
+"""initial schema: users, meetings and action items
+
+Revision ID: 5b1e0f7c2a93
+Revises:
+Create Date: 2026-10-16 09:05:10.204377
+
+Tables as they existed before migrations were introduced. Databases that were
+created earlier with db.create_all() already have them: run
+`flask db stamp 5b1e0f7c2a93` once, then `flask db upgrade`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e0f7c2a93'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ms_users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('password_hash', sa.String(length=128), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table('ms_meetings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('topic', sa.String(length=255), nullable=False),
+        sa.Column('meeting_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_by_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['created_by_id'], ['ms_users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('ms_action_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('meeting_id', sa.Integer(), nullable=False),
+        sa.Column('item', sa.Text(), nullable=True),
+        sa.Column('action', sa.Text(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('due_date', sa.Date(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('attachment_path', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['meeting_id'], ['ms_meetings.id'], ),
+        sa.ForeignKeyConstraint(['owner_id'], ['ms_users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('ms_action_items')
+    op.drop_table('ms_meetings')
+    op.drop_table('ms_users')
@@ -0,0 +1,107 @@
+"""add transcripts, transcript segments and summaries with full-text indexes
+
+Revision ID: 7d3f2a91b6c4
+Revises: 1c60ac93f889
+Create Date: 2026-10-16 14:03:27.552910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f2a91b6c4'
+down_revision = '1c60ac93f889'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_FTS = [
+    ('ms_transcript_segments', 'text'),
+    ('ms_summaries', 'content'),
+]
+
+
+def upgrade():
+    op.create_table('ms_transcripts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('meeting_id', sa.Integer(), nullable=False),
+        sa.Column('language', sa.String(length=32), nullable=True),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('source_filename', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['meeting_id'], ['ms_meetings.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ms_transcripts', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ms_transcripts_meeting_id'), ['meeting_id'], unique=False)
+
+    op.create_table('ms_transcript_segments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('transcript_id', sa.Integer(), nullable=False),
+        sa.Column('meeting_id', sa.Integer(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.Float(), nullable=True),
+        sa.Column('end_time', sa.Float(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['meeting_id'], ['ms_meetings.id'], ),
+        sa.ForeignKeyConstraint(['transcript_id'], ['ms_transcripts.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ms_transcript_segments', schema=None) as batch_op:
+        batch_op.create_index('ix_ms_transcript_segments_transcript_seq', ['transcript_id', 'seq'], unique=False)
+        batch_op.create_index('ix_ms_transcript_segments_meeting', ['meeting_id'], unique=False)
+
+    op.create_table('ms_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('meeting_id', sa.Integer(), nullable=False),
+        sa.Column('language', sa.String(length=32), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['meeting_id'], ['ms_meetings.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ms_summaries', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ms_summaries_meeting_id'), ['meeting_id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        # ngram parser 讓中日韓文字不需空白斷詞也能被索引
+        op.execute("ALTER TABLE ms_transcript_segments ADD FULLTEXT INDEX ft_ms_transcript_segments_text (text) WITH PARSER ngram")
+        op.execute("ALTER TABLE ms_summaries ADD FULLTEXT INDEX ft_ms_summaries_content (content) WITH PARSER ngram")
+    elif dialect == 'sqlite':
+        for table, column in SQLITE_FTS:
+            fts = f"{table}_fts"
+            op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({column}, content='{table}', content_rowid='id', tokenize='trigram')")
+            op.execute(f"""CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column});
+            END""")
+            op.execute(f"""CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+            END""")
+            op.execute(f"""CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column});
+                INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column});
+            END""")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for table, _ in SQLITE_FTS:
+            fts = f"{table}_fts"
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
+
+    with op.batch_alter_table('ms_summaries', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ms_summaries_meeting_id'))
+    op.drop_table('ms_summaries')
+
+    with op.batch_alter_table('ms_transcript_segments', schema=None) as batch_op:
+        batch_op.drop_index('ix_ms_transcript_segments_meeting')
+        batch_op.drop_index('ix_ms_transcript_segments_transcript_seq')
+    op.drop_table('ms_transcript_segments')
+
+    with op.batch_alter_table('ms_transcripts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ms_transcripts_meeting_id'))
+    op.drop_table('ms_transcripts')
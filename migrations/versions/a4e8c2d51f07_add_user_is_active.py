@@ -0,0 +1,26 @@
+"""add ms_users.is_active for disabling accounts
+
+Revision ID: a4e8c2d51f07
+Revises: 7d3f2a91b6c4
+Create Date: 2026-10-16 15:02:11.508313
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e8c2d51f07'
+down_revision = '7d3f2a91b6c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ms_users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+
+
+def downgrade():
+    with op.batch_alter_table('ms_users', schema=None) as batch_op:
+        batch_op.drop_column('is_active')
@@ -1,16 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.sql import func
+from sqlalchemy.orm import joinedload
 from flask_bcrypt import Bcrypt
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
 
+def _select_fields(data, fields):
+    """fields=None 回傳全部欄位；否則只留指定欄位 (id 一律保留)。"""
+    if fields is None:
+        return data
+    return {k: v for k, v in data.items() if k == 'id' or k in fields}
+
 class User(db.Model):
     __tablename__ = 'ms_users'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='user') # 'user' or 'admin'
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())  # 停用後既有 token 也會被拒
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
 
     def set_password(self, password):
@@ -19,13 +27,14 @@ class User(db.Model):
     def check_password(self, password):
         return bcrypt.check_password_hash(self.password_hash, password)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None):
+        return _select_fields({
             'id': self.id,
             'username': self.username,
             'role': self.role,
+            'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        }, fields)
 
 class Meeting(db.Model):
     __tablename__ = 'ms_meetings'
@@ -35,19 +44,45 @@ class Meeting(db.Model):
     created_by_id = db.Column(db.Integer, db.ForeignKey('ms_users.id'), nullable=True) # Allow null for now
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (
+        # keyset pagination: ORDER BY meeting_date DESC, id DESC
+        db.Index('ix_ms_meetings_meeting_date_id', 'meeting_date', 'id'),
+        db.Index('ix_ms_meetings_created_by_date', 'created_by_id', 'meeting_date', 'id'),
+    )
+
     creator = db.relationship('User', backref=db.backref('meetings', lazy=True))
     action_items = db.relationship('ActionItem', backref='meeting', lazy='dynamic', cascade="all, delete-orphan")
+    transcripts = db.relationship('Transcript', backref='meeting', lazy='dynamic', cascade="all, delete-orphan")
+    summaries = db.relationship('Summary', backref='meeting', lazy='dynamic', cascade="all, delete-orphan")
 
-    def to_dict(self):
-        return {
+    @classmethod
+    def query_with_counts(cls, with_creator=True):
+        """Meeting 清單專用：一次 JOIN 帶出 creator 與代辦數量，避免逐筆 lazy load / COUNT。"""
+        counts = (
+            db.session.query(ActionItem.meeting_id.label('meeting_id'), func.count(ActionItem.id).label('action_item_count'))
+            .group_by(ActionItem.meeting_id)
+            .subquery()
+        )
+        query = (
+            db.session.query(cls, func.coalesce(counts.c.action_item_count, 0))
+            .outerjoin(counts, counts.c.meeting_id == cls.id)
+        )
+        return query.options(joinedload(cls.creator)) if with_creator else query
+
+    def to_dict(self, action_item_count=None, fields=None):
+        data = {
             'id': self.id,
             'topic': self.topic,
             'meeting_date': self.meeting_date.isoformat() if self.meeting_date else None,
             'created_by_id': self.created_by_id,
-            'creator_username': self.creator.username if self.creator else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'action_item_count': self.action_items.count()
         }
+        # 關聯欄位只在需要時才取，避免 sparse fields 仍觸發 lazy load
+        if fields is None or 'creator_username' in fields:
+            data['creator_username'] = self.creator.username if self.creator else None
+        if fields is None or 'action_item_count' in fields:
+            data['action_item_count'] = self.action_items.count() if action_item_count is None else action_item_count
+        return _select_fields(data, fields)
 
 class ActionItem(db.Model):
     __tablename__ = 'ms_action_items'
@@ -61,19 +96,104 @@ class ActionItem(db.Model):
     attachment_path = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        db.Index('ix_ms_action_items_meeting_status', 'meeting_id', 'status', 'id'),
+        db.Index('ix_ms_action_items_owner_status', 'owner_id', 'status', 'id'),
+    )
+
     owner = db.relationship('User', backref=db.backref('action_items', lazy=True))
 
-    def to_dict(self):
-        return {
+    @classmethod
+    def query_with_relations(cls, with_meeting=True, with_owner=True):
+        options = []
+        if with_meeting:
+            options.append(joinedload(cls.meeting))
+        if with_owner:
+            options.append(joinedload(cls.owner))
+        return cls.query.options(*options)
+
+    def to_dict(self, fields=None):
+        data = {
             'id': self.id,
             'meeting_id': self.meeting_id,
-            'meeting_topic': self.meeting.topic if self.meeting else None,
             'item': self.item,
             'action': self.action,
             'owner_id': self.owner_id,
-            'owner_name': self.owner.username if self.owner else None,
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'status': self.status,
             'attachment_path': self.attachment_path,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if fields is None or 'meeting_topic' in fields:
+            data['meeting_topic'] = self.meeting.topic if self.meeting else None
+        if fields is None or 'owner_name' in fields:
+            data['owner_name'] = self.owner.username if self.owner else None
+        return _select_fields(data, fields)
+
+class Transcript(db.Model):
+    __tablename__ = 'ms_transcripts'
+    id = db.Column(db.Integer, primary_key=True)
+    meeting_id = db.Column(db.Integer, db.ForeignKey('ms_meetings.id'), nullable=False, index=True)
+    language = db.Column(db.String(32), nullable=True)
+    kind = db.Column(db.String(20), nullable=False, default='original') # 'original' or 'translated'
+    source_filename = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+    segments = db.relationship('TranscriptSegment', backref='transcript', lazy='dynamic',
+                               cascade="all, delete-orphan", order_by='TranscriptSegment.seq')
+
+    def to_dict(self, segment_count=None):
+        return {
+            'id': self.id,
+            'meeting_id': self.meeting_id,
+            'language': self.language,
+            'kind': self.kind,
+            'source_filename': self.source_filename,
+            'segment_count': self.segments.count() if segment_count is None else segment_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+class TranscriptSegment(db.Model):
+    __tablename__ = 'ms_transcript_segments'
+    id = db.Column(db.Integer, primary_key=True)
+    transcript_id = db.Column(db.Integer, db.ForeignKey('ms_transcripts.id'), nullable=False)
+    # 冗餘存 meeting_id，搜尋結果直接 JOIN meeting，不必再經過 transcript
+    meeting_id = db.Column(db.Integer, db.ForeignKey('ms_meetings.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.Float, nullable=True)
+    end_time = db.Column(db.Float, nullable=True)
+    text = db.Column(db.Text, nullable=False)
+
+    # 全文索引 (MySQL FULLTEXT ngram / SQLite FTS5) 由 migration 建立，見 services/search.py
+    __table_args__ = (
+        db.Index('ix_ms_transcript_segments_transcript_seq', 'transcript_id', 'seq'),
+        db.Index('ix_ms_transcript_segments_meeting', 'meeting_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'transcript_id': self.transcript_id,
+            'meeting_id': self.meeting_id,
+            'seq': self.seq,
+            'start': self.start_time,
+            'end': self.end_time,
+            'text': self.text,
+        }
+
+class Summary(db.Model):
+    __tablename__ = 'ms_summaries'
+    id = db.Column(db.Integer, primary_key=True)
+    meeting_id = db.Column(db.Integer, db.ForeignKey('ms_meetings.id'), nullable=False, index=True)
+    language = db.Column(db.String(32), nullable=True)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'meeting_id': self.meeting_id,
+            'language': self.language,
+            'content': self.content,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
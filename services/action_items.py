@@ -0,0 +1,175 @@
+# services/action_items.py
+import os
+import re
+import json
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from services.transcript import parse_segments, estimate_tokens, pack_batches, render
+
+load_dotenv()
+
+# 每個視窗的輸入預算；輸出 (待辦清單) 跟著變短，長會議也不會被截斷
+ACTION_WINDOW_TOKENS = int(os.getenv("ACTION_WINDOW_TOKENS", "4000"))
+ACTION_WINDOW_OVERLAP = int(os.getenv("ACTION_WINDOW_OVERLAP", "2"))  # 與前一個視窗重疊的 segment 數
+ACTION_WORKERS = int(os.getenv("ACTION_WORKERS", "4"))
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_EMPTY_ARRAY_RE = re.compile(r"^\s*(?:```(?:json)?)?\s*\[\s*\]\s*(?:```)?\s*$", re.IGNORECASE)
+_KEY_RE = re.compile(r"[\W_]+")
+
+
+class ObjectStream:
+    """從 LLM 輸出中逐段取出已完整的 JSON object。
+
+    不要求整段是合法 JSON：碼框、前後說明文字、被截斷的陣列結尾都會略過，
+    只回傳大括號成對且能解析的 object。dropped 記錄無法解析或不完整的片段數。
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._start = None  # 目前 object 的 '{' 位置
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self.dropped = 0
+
+    def feed(self, chunk: str) -> list[dict]:
+        self._buf += chunk
+        return self._scan()
+
+    def close(self) -> list[dict]:
+        # 沒有收尾的 object 放棄，從它的 '{' 之後重新掃描，避免少一個 '}' 就吃掉後面所有項目
+        out = []
+        while self._start is not None:
+            self.dropped += 1
+            self._pos, self._start = self._start + 1, None
+            self._in_str = self._escape = False
+            out += self._scan()
+        return out
+
+    def _scan(self) -> list[dict]:
+        out, buf, i = [], self._buf, self._pos
+        while i < len(buf):
+            if self._start is None:
+                i = buf.find("{", i)
+                if i < 0:
+                    i = len(buf)
+                    break
+                self._start, self._depth = i, 0
+            ch = buf[i]
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(buf[self._start:i + 1], out)
+                    self._start = None
+            i += 1
+        # 已處理完的前綴不再保留
+        cut = i if self._start is None else self._start
+        self._buf, self._pos = buf[cut:], i - cut
+        if self._start is not None:
+            self._start = 0
+        return out
+
+    def _emit(self, fragment: str, out: list):
+        try:
+            obj = json.loads(fragment)
+        except json.JSONDecodeError:
+            try:
+                obj = json.loads(_TRAILING_COMMA_RE.sub(r"\1", fragment))
+            except json.JSONDecodeError:
+                self.dropped += 1
+                return
+        if "action" not in obj:
+            # 包成 {"items": [...]} 的回應：展開裡面的 object
+            nested = [o for v in obj.values() if isinstance(v, list) for o in v if isinstance(o, dict)]
+            if nested:
+                out.extend(nested)
+                return
+        out.append(obj)
+
+
+def parse_objects(answer) -> tuple[list[dict], int, bool]:
+    """回傳 (含 action 的 object, 丟棄的片段數, 是否可解析)；明確的空陣列視為可解析。"""
+    if not isinstance(answer, str):
+        return [], 0, False
+    stream = ObjectStream()
+    objects = stream.feed(answer) + stream.close()
+    items = [o for o in objects if str(o.get("action") or "").strip()]
+    return items, stream.dropped, bool(items) or bool(_EMPTY_ARRAY_RE.match(answer))
+
+
+def item_key(item: dict) -> str:
+    norm = lambda s: _KEY_RE.sub("", unicodedata.normalize("NFKC", str(s or "")).casefold())
+    return norm(item.get("item")) + "|" + norm(item.get("action"))
+
+
+def merge_items(groups) -> list[dict]:
+    """依視窗順序合併並去重 (item + action 正規化後相同)；重複項目只補上前一筆缺的欄位。"""
+    merged = {}
+    for group in groups:
+        for item in group:
+            key = item_key(item)
+            if key not in merged:
+                merged[key] = dict(item)
+                continue
+            kept = merged[key]
+            for k, v in item.items():
+                if v not in (None, "") and kept.get(k) in (None, ""):
+                    kept[k] = v
+    return list(merged.values())
+
+
+def windows(text: str, budget: int = ACTION_WINDOW_TOKENS, overlap: int = ACTION_WINDOW_OVERLAP) -> list[str]:
+    """短逐字稿原樣作為單一視窗；否則依 segment 邊界切塊，每塊帶上前一塊最後幾個 segment。"""
+    if not (text or "").strip():
+        return []
+    if estimate_tokens(text) <= budget:
+        return [text]
+    batches = pack_batches(parse_segments(text), budget)
+    return [render((batches[i - 1][-overlap:] if i and overlap > 0 else []) + batch)
+            for i, batch in enumerate(batches)]
+
+
+def extract_windows(text: str, extract, budget: int = ACTION_WINDOW_TOKENS, overlap: int = ACTION_WINDOW_OVERLAP,
+                    workers: int = ACTION_WORKERS, on_window=None) -> tuple[list[dict], dict]:
+    """以 extract(window_text) -> str 平行處理每個視窗，回傳 (去重後的項目, 統計)。
+
+    on_window(done, total, items) 在每個視窗完成時以目前合併結果呼叫。
+    單一視窗呼叫失敗只記在 stats['failed']；全部失敗時拋出第一個錯誤。
+    """
+    parts = windows(text, budget, overlap)
+    stats = {"windows": len(parts), "failed": 0, "dropped": 0}
+    if not parts:
+        return [], stats
+    results, errors = [None] * len(parts), []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(parts)))) as pool:
+        futures = {pool.submit(extract, part): i for i, part in enumerate(parts)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                answer = future.result()
+            except Exception as e:
+                errors.append(e)
+                answer = None
+            items, dropped, ok = parse_objects(answer)
+            results[futures[future]] = items
+            stats["dropped"] += dropped
+            stats["failed"] += 0 if ok else 1
+            if on_window:
+                on_window(done, len(parts), merge_items(r for r in results if r))
+    if len(errors) == len(parts):
+        raise errors[0]
+    return merge_items(r for r in results if r), stats
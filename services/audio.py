@@ -0,0 +1,93 @@
+# services/audio.py
+import subprocess
+import threading
+import wave
+
+import numpy as np
+
+# Whisper 吃的格式：16 kHz / mono / 16-bit PCM
+SAMPLE_RATE = 16000
+_READ_BYTES = 1 << 16
+
+
+def probe_duration(path: str) -> float | None:
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+           "-of", "default=noprint_wrappers=1:nokey=1", path]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip()
+        return float(out) if out and out != "N/A" else None
+    except (subprocess.CalledProcessError, ValueError, FileNotFoundError):
+        return None
+
+
+def stream_pcm(path: str, on_progress=None, sample_rate: int = SAMPLE_RATE):
+    """以 ffmpeg pipe 只解碼音軌，逐塊 yield s16le bytes。
+
+    進度取自 ffmpeg 的 -progress 輸出 (out_time_us / 總長度)，
+    on_progress(ratio) 在呼叫端的 thread 中觸發，每前進 1% 最多一次。
+    """
+    duration = probe_duration(path)
+    cmd = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", path, "-vn", "-map", "0:a:0",
+        "-ac", "1", "-ar", str(sample_rate), "-acodec", "pcm_s16le", "-f", "s16le",
+        "-progress", "pipe:2", "-nostats", "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    state = {"ratio": 0.0}
+    errors = []
+
+    def read_stderr():
+        for raw in proc.stderr:
+            key, sep, value = raw.decode("utf-8", errors="replace").strip().partition("=")
+            if not sep or " " in key:
+                errors.append(raw.decode("utf-8", errors="replace").strip())
+            elif key == "out_time_us" and value.isdigit() and duration:
+                state["ratio"] = min(1.0, int(value) / 1e6 / duration)
+            elif key == "progress" and value == "end":
+                state["ratio"] = 1.0
+
+    reader = threading.Thread(target=read_stderr, daemon=True)
+    reader.start()
+    reported = 0.0
+    finished = False
+    try:
+        while True:
+            block = proc.stdout.read(_READ_BYTES)
+            if not block:
+                break
+            if on_progress and state["ratio"] - reported >= 0.01:
+                reported = state["ratio"]
+                on_progress(reported)
+            yield block
+        finished = True
+    finally:
+        if not finished:
+            proc.kill()
+        proc.stdout.close()
+        returncode = proc.wait()
+        reader.join()
+
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({returncode}): {' | '.join(errors[-5:])}")
+    if on_progress:
+        on_progress(1.0)
+
+
+def extract_to_wav(path: str, output_path: str, on_progress=None) -> str:
+    """串流寫出 16 kHz mono WAV，不經過完整解碼的暫存檔。"""
+    with wave.open(output_path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        for block in stream_pcm(path, on_progress):
+            out.writeframes(block)
+    return output_path
+
+
+def decode_pcm(path: str, on_progress=None) -> np.ndarray:
+    """直接解碼成 float32 陣列交給轉錄，完全不落地。"""
+    buf = bytearray()
+    for block in stream_pcm(path, on_progress):
+        buf.extend(block)
+    return np.frombuffer(buf, np.int16).astype(np.float32) / 32768.0
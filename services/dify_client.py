@@ -1,66 +1,246 @@
 # services/dify_client.py
-import os, json, re, requests
+import os, json, time, random, threading, logging, requests
+import redis
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from services import result_cache, action_items
+from services.redis_store import get_redis
+
 load_dotenv()
 
 DIFY_BASE = os.getenv("DIFY_API_BASE_URL", "https://api.dify.ai/v1")
 TIMEOUT = 60
+POOL_SIZE = int(os.getenv("DIFY_POOL_SIZE", "16"))
+MAX_CONCURRENCY = int(os.getenv("DIFY_MAX_CONCURRENCY", "4"))  # 每把 API key 同時在途的請求數
+MAX_RETRIES = int(os.getenv("DIFY_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("DIFY_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("DIFY_BACKOFF_MAX", "20"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+STREAM_PUSH_INTERVAL = 0.5  # 秒；串流時推送 partial answer 的最短間隔
+# 呼叫統計放 Redis，web 與各 worker process 的數字彙總在一起 (admin cache_stats 顯示)
+METRICS_KEY = "dify:metrics"          # hash: <path>:calls / errors / retries / total_ms / last_ms
+METRICS_MAX_KEY = "dify:metrics:max"  # zset: path -> 最大延遲 ms
 
-def _post_completion(api_key: str, query: str, inputs: dict | None = None, user_id: str = "system"):
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+_semaphores = {}
+
+# --- 連線池 / 併發上限 / 重試 ---
+def get_session() -> requests.Session:
+    """Keep-alive session；fork 後 (gunicorn / celery prefork) 會重建，避免共用 socket。"""
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+def _semaphore_for(api_key: str) -> threading.BoundedSemaphore:
+    with _lock:
+        if api_key not in _semaphores:
+            _semaphores[api_key] = threading.BoundedSemaphore(MAX_CONCURRENCY)
+        return _semaphores[api_key]
+
+def _backoff_delay(attempt: int, retry_after: str | None = None) -> float:
+    # exponential backoff + full jitter；有 Retry-After 時至少等那麼久
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay = max(delay, min(BACKOFF_MAX, float(retry_after)))
+        except ValueError:
+            pass
+    return delay
+
+def _record(path: str, started: float, status, retried: bool = False):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.debug("dify %s -> %s in %.0f ms", path, status, elapsed_ms)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(METRICS_KEY, f"{path}:calls", 1)
+        pipe.hincrbyfloat(METRICS_KEY, f"{path}:total_ms", round(elapsed_ms, 1))
+        pipe.hset(METRICS_KEY, f"{path}:last_ms", round(elapsed_ms, 1))
+        pipe.zadd(METRICS_MAX_KEY, {path: round(elapsed_ms, 1)}, gt=True)
+        if status is None or status >= 400:
+            pipe.hincrby(METRICS_KEY, f"{path}:errors", 1)
+        if retried:
+            pipe.hincrby(METRICS_KEY, f"{path}:retries", 1)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+def metrics() -> dict:
+    """每個 endpoint 的呼叫延遲統計 (串流請求量的是到 response header 為止)；Redis 不通時回傳空 dict。"""
+    try:
+        raw = get_redis().hgetall(METRICS_KEY)
+        max_ms = dict(get_redis().zrange(METRICS_MAX_KEY, 0, -1, withscores=True))
+    except redis.RedisError:
+        return {}
+    result = {}
+    for field, value in raw.items():
+        path, _, name = field.rpartition(":")
+        m = result.setdefault(path, {"calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "last_ms": 0.0,
+                                     "max_ms": max_ms.get(path, 0.0)})
+        m[name] = float(value) if name.endswith("_ms") else int(value)
+    for m in result.values():
+        m["avg_ms"] = round(m["total_ms"] / m["calls"], 1) if m["calls"] else 0.0
+    return result
+
+def _send(url: str, path: str, headers: dict, payload: dict, stream: bool, timeout) -> requests.Response:
+    session = get_session()
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            resp = session.post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            _record(path, started, None, retried=attempt < MAX_RETRIES)
+            if attempt >= MAX_RETRIES:
+                raise
+            time.sleep(_backoff_delay(attempt))
+            attempt += 1
+            continue
+        retry = resp.status_code in RETRY_STATUSES and attempt < MAX_RETRIES
+        _record(path, started, resp.status_code, retried=retry)
+        if retry:
+            delay = _backoff_delay(attempt, resp.headers.get("Retry-After"))
+            resp.close()
+            time.sleep(delay)
+            attempt += 1
+            continue
+        resp.raise_for_status()
+        return resp
+
+@contextmanager
+def post(api_key: str, path: str, payload: dict, stream: bool = False, timeout=TIMEOUT, base_url: str | None = None):
+    """對 Dify 發 POST：共用連線池、每把 key 限制併發、429/5xx 自動退避重試。
+
+    以 context manager 使用，串流讀取期間會持續佔用該 key 的併發名額。
+    """
     if not api_key:
         raise RuntimeError("Dify API key is not set")
-    url = f"{DIFY_BASE}/completion-messages"
+    url = f"{(base_url or DIFY_BASE).rstrip('/')}/{path.lstrip('/')}"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
+    with _semaphore_for(api_key):
+        resp = _send(url, path, headers, payload, stream, timeout)
+        try:
+            yield resp
+        finally:
+            resp.close()
+
+# --- chat-messages (含 SSE 串流) ---
+def _iter_sse_events(response):
+    """解析 Dify chat-messages 的 server-sent events，逐一 yield JSON payload。"""
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        try:
+            yield json.loads(line[5:].strip())
+        except json.JSONDecodeError:
+            continue
+
+def _collect_stream(response, on_token=None) -> dict:
+    result = {"answer": ""}
+    parts = []
+    last_push = 0.0
+    for event in _iter_sse_events(response):
+        kind = event.get("event")
+        if kind in ("message", "agent_message"):
+            parts.append(event.get("answer") or "")
+            result["conversation_id"] = event.get("conversation_id") or result.get("conversation_id")
+            result["message_id"] = event.get("message_id") or result.get("message_id")
+            now = time.monotonic()
+            # 第一個 token 立即推送，之後節流
+            if on_token and (last_push == 0.0 or now - last_push >= STREAM_PUSH_INTERVAL):
+                last_push = now
+                on_token("".join(parts))
+        elif kind == "message_end":
+            result["conversation_id"] = event.get("conversation_id") or result.get("conversation_id")
+            result["message_id"] = event.get("message_id") or result.get("message_id")
+            result["metadata"] = event.get("metadata", {})
+        elif kind == "error":
+            result["error"] = event.get("message") or event.get("code") or "stream error"
+            break
+    result["answer"] = "".join(parts)
+    if "error" in result and not result["answer"]:
+        result["answer"] = f"Dify API stream error: {result['error']}"
+    elif on_token:
+        on_token(result["answer"])
+    return result
+
+def chat_message(api_key: str, query: str, user_id: str = "system", inputs: dict | None = None,
+                 response_mode: str = "streaming", conversation_id: str | None = None,
+                 timeout=TIMEOUT, on_token=None, base_url: str | None = None) -> dict:
+    payload = {"inputs": inputs or {}, "query": query, "user": user_id, "response_mode": response_mode}
+    if conversation_id:
+        payload["conversation_id"] = conversation_id
+    streaming = response_mode == "streaming"
+    with post(api_key, "/chat-messages", payload, stream=streaming, timeout=timeout, base_url=base_url) as resp:
+        return _collect_stream(resp, on_token) if streaming else resp.json()
+
+# --- 快取判斷 ---
+ERROR_PREFIXES = ("Error:", "Dify API")  # ask_dify / _collect_stream 失敗時放進 answer 的錯誤訊息
+
+def usable_answer(answer) -> bool:
+    """result_cache 的 should_store：只快取非空白的文字回答，錯誤訊息或沒有 answer 的 response 不寫入。"""
+    return isinstance(answer, str) and bool(answer.strip()) and not answer.startswith(ERROR_PREFIXES)
+
+# --- completion-messages ---
+def _post_completion(api_key: str, query: str, inputs: dict | None = None, user_id: str = "system"):
     payload = {
         "inputs": inputs or {},
         "response_mode": "blocking",
         "user": user_id,
         "query": query,
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=TIMEOUT)
-    resp.raise_for_status()
-    data = resp.json()
+    with post(api_key, "/completion-messages", payload) as resp:
+        data = resp.json()
     return data.get("answer") or data
 
-def translate_text(text: str, target_lang: str, user_id: str = "system") -> str:
+def translate_text(text: str, target_lang: str, user_id: str = "system", bypass_cache: bool = False) -> str:
     api_key = os.getenv("DIFY_TRANSLATOR_API_KEY")
     query = f"目標語言：{target_lang}\n需翻譯內容：\n{text}"
-    return _post_completion(api_key, query, user_id=user_id)
+    return result_cache.cached("translate", api_key, target_lang, text,
+                               lambda: _post_completion(api_key, query, user_id=user_id), bypass=bypass_cache,
+                               should_store=usable_answer)
 
-def summarize_text(text: str, user_id: str = "system") -> str:
+def summarize_text(text: str, user_id: str = "system", bypass_cache: bool = False) -> str:
     api_key = os.getenv("DIFY_SUMMARIZER_API_KEY")
-    return _post_completion(api_key, text, user_id=user_id)
+    return result_cache.cached("summarize", api_key, None, text,
+                               lambda: _post_completion(api_key, text, user_id=user_id), bypass=bypass_cache,
+                               should_store=usable_answer)
 
-def extract_action_items(text: str, user_id: str = "system") -> list[dict]:
+def extract_action_items(text: str, user_id: str = "system", bypass_cache: bool = False, on_window=None) -> list[dict]:
+    """長逐字稿分視窗平行抽取，合併去重；on_window(done, total, items) 回報目前結果 (鍵名已正規化)。"""
     api_key = os.getenv("DIFY_ACTION_EXTRACTOR_API_KEY")
-    raw = _post_completion(api_key, text, user_id=user_id)
 
-    # 容錯：去除 ```json 之類的碼框，只保留第一段 JSON 陣列
-    s = str(raw).strip()
-    s = re.sub(r"^```(?:json)?|```$", "", s, flags=re.IGNORECASE|re.MULTILINE).strip()
-    if not (s.startswith("[") and s.endswith("]")):
-        import re as _re
-        m = _re.search(r"\[[\s\S]*\]", s)
-        if m: s = m.group(0)
+    def extract(window):
+        return result_cache.cached("extract-window", api_key, None, window,
+                                   lambda: _post_completion(api_key, window, user_id=user_id),
+                                   bypass=bypass_cache, should_store=usable_answer)
 
-    items = json.loads(s)
-    if not isinstance(items, list):
-        raise ValueError("Extractor 回傳非陣列")
+    progress = on_window and (lambda done, total, items: on_window(done, total, _normalize_items(items)))
+    items, stats = action_items.extract_windows(text, extract, on_window=progress)
+    if stats["windows"] and stats["failed"] == stats["windows"]:
+        raise ValueError("Extractor 回傳內容無法解析為待辦陣列")
+    return _normalize_items(items)
 
+def _normalize_items(items: list[dict]) -> list[dict]:
     # 正規化鍵名供後續儲存：owner 暫保留名字，儲存時會解析成 owner_id
-    normalized = []
-    for i in items:
-        for k in ("item", "action", "owner", "duedate"):
-            if k not in i:
-                raise ValueError(f"Extractor 回傳元素缺少必要鍵：{k}")
-        normalized.append({
-            "item": i["item"],
-            "action": i["action"],
-            "owner": i["owner"],
-            "due_date": i["duedate"],  # 後端用 due_date，稍後再 parse 成 date
-        })
-    return normalized
+    return [{
+        "item": i.get("item") or "",
+        "action": i["action"],
+        "owner": i.get("owner") or "",
+        "due_date": i.get("duedate") or i.get("due_date") or "",  # 後端用 due_date，稍後再 parse 成 date
+    } for i in items]
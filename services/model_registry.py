@@ -0,0 +1,68 @@
+# services/model_registry.py
+import threading
+import time
+from collections import OrderedDict
+
+
+class ModelRegistry:
+    """Process-wide LRU cache of loaded models.
+
+    Keys are whatever tuple the loader accepts (e.g. (model_size, device)).
+    A Celery worker process keeps the registry alive between tasks, so each
+    model is deserialized once per process instead of once per job.
+    """
+
+    def __init__(self, loader, capacity: int = 1, on_evict=None):
+        self._loader = loader
+        self._on_evict = on_evict
+        self._capacity = max(1, int(capacity))
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = {}
+
+    def get(self, *key):
+        """回傳 (model, lookup_info)；lookup_info 供 task 寫入 progress meta。"""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key], self._lookup_info(key, hit=True, elapsed=0.0)
+
+            self.misses += 1
+            started = time.perf_counter()
+            model = self._loader(*key)
+            elapsed = time.perf_counter() - started
+            self._models[key] = model
+            self.load_seconds[key] = elapsed
+
+            while len(self._models) > self._capacity:
+                old_key, old_model = self._models.popitem(last=False)
+                self.evictions += 1
+                if self._on_evict:
+                    self._on_evict(old_key, old_model)
+            return model, self._lookup_info(key, hit=False, elapsed=elapsed)
+
+    def __contains__(self, key):
+        return key in self._models
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "resident": ["@".join(map(str, k)) for k in self._models],
+        }
+
+    def _lookup_info(self, key, hit: bool, elapsed: float) -> dict:
+        info = self.stats()
+        info.update({
+            "key": "@".join(map(str, key)),
+            "hit": hit,
+            "load_seconds": round(elapsed, 3),
+        })
+        return info
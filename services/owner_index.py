@@ -0,0 +1,121 @@
+# services/owner_index.py
+import os
+import re
+import time
+import difflib
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from sqlalchemy import event
+
+from models import db, User
+
+OWNER_INDEX_TTL = float(os.getenv("OWNER_INDEX_TTL", "300"))
+OWNER_FUZZY_CUTOFF = float(os.getenv("OWNER_FUZZY_CUTOFF", "0.85"))
+OWNER_FUZZY_CANDIDATES = 20  # 只對共用 bigram 最多的前幾個 alias 計算相似度
+
+_PAREN_RE = re.compile(r"[\(（\[【].*?[\)）\]】]")
+_SEP_RE = re.compile(r"[\s._\-·・]+")
+
+
+def normalize(name) -> str:
+    """NFKC + casefold + 去掉括號註記 (例如「王小明(PM)」) 與多餘空白。"""
+    name = unicodedata.normalize("NFKC", str(name or "")).casefold()
+    return " ".join(_PAREN_RE.sub(" ", name).split())
+
+
+def _bigrams(text: str) -> set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def aliases(username: str) -> set[str]:
+    """使用者名稱的可接受寫法：原名、email 前綴、去掉分隔符號 (john.doe → johndoe)。"""
+    base = normalize(username)
+    names = {base}
+    if "@" in base:
+        names.add(base.split("@", 1)[0])
+    names |= {_SEP_RE.sub("", n) for n in list(names)}
+    return {n for n in names if n}
+
+
+class OwnerIndex:
+    """本 process 內的使用者名稱索引 (alias → (id, username))。
+
+    User 有新增 / 修改 / 刪除時由 ORM event 標記過期；其他 process 的變更靠 TTL 更新。
+    """
+
+    def __init__(self, ttl: float = OWNER_INDEX_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._aliases = {}
+        self._grams = {}  # bigram → aliases，模糊比對先用它挑候選
+        self._fuzzy = {}  # 模糊比對結果的 memo，隨索引一起重建
+        self._loaded_at = 0.0
+
+    def invalidate(self, *args, **kwargs):
+        self._loaded_at = 0.0
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            if time.monotonic() - self._loaded_at > self._ttl:
+                index = {}
+                for user_id, username in db.session.query(User.id, User.username):
+                    for alias in aliases(username):
+                        # 同一個 alias 對到多個人時不採用，避免指派錯人
+                        ambiguous = alias in index and (index[alias] is None or index[alias][0] != user_id)
+                        index[alias] = None if ambiguous else (user_id, username)
+                self._aliases = {k: v for k, v in index.items() if v}
+                grams = defaultdict(list)
+                for alias in self._aliases:
+                    for gram in _bigrams(alias):
+                        grams[gram].append(alias)
+                self._grams = dict(grams)
+                self._fuzzy = {}
+                self._loaded_at = time.monotonic()
+            return self._aliases
+
+    def lookup(self, name: str):
+        """alias 完全相同優先，其次 difflib 相似度達門檻的唯一最佳結果。"""
+        index = self._snapshot()
+        key = normalize(name)
+        hit = index.get(key) or index.get(_SEP_RE.sub("", key))
+        if hit:
+            return hit
+        if key not in self._fuzzy:
+            self._fuzzy[key] = self._closest(index, key)
+        return self._fuzzy[key]
+
+    def _closest(self, index: dict, key: str):
+        shared = Counter(alias for gram in _bigrams(key) for alias in self._grams.get(gram, ()))
+        candidates = [alias for alias, _ in shared.most_common(OWNER_FUZZY_CANDIDATES)]
+        close = difflib.get_close_matches(key, candidates, n=2, cutoff=OWNER_FUZZY_CUTOFF)
+        if not close:
+            return None
+        if len(close) == 1 or index[close[0]] == index[close[1]]:
+            return index[close[0]]
+        # 前兩名分數相同 (例如 chen1 / chen2) 視為無法判斷
+        first, second = (difflib.SequenceMatcher(None, key, c).ratio() for c in close)
+        return index[close[0]] if first > second else None
+
+
+owner_index = OwnerIndex()
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(User, _event, owner_index.invalidate)
+
+
+def resolve_owners(names) -> dict:
+    """把多個 owner 名稱轉成 {原始名稱: (user_id, username)}，查不到的不會出現在結果中。
+
+    先以一次 IN 查詢比對完全相同的 username (以資料庫為準)，剩下的再用記憶體索引做 alias / 模糊比對。
+    """
+    wanted = {str(n).strip() for n in names if n is not None and str(n).strip()}
+    if not wanted:
+        return {}
+    exact = {username: (user_id, username)
+             for user_id, username in db.session.query(User.id, User.username).filter(User.username.in_(wanted))}
+    resolved = {}
+    for name in wanted:
+        hit = exact.get(name) or owner_index.lookup(name)
+        if hit:
+            resolved[name] = hit
+    return resolved
@@ -0,0 +1,26 @@
+# services/progress_bus.py
+import json
+import logging
+import redis
+
+from services.redis_store import get_redis
+
+# 每個 task 一個 channel，SSE 連線只訂閱自己關心的 task
+CHANNEL_PREFIX = "task-progress:"
+
+logger = logging.getLogger(__name__)
+
+
+def channel_for(task_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+
+def publish(task_id: str, state: str, info) -> None:
+    """把 task 狀態推到 Redis pub/sub；推送失敗不影響 task 本身 (前端仍可 fallback 輪詢)。"""
+    if not task_id:
+        return
+    payload = {"task_id": task_id, "state": state, "info": info if isinstance(info, dict) else {"result": str(info)}}
+    try:
+        get_redis().publish(channel_for(task_id), json.dumps(payload, ensure_ascii=False, default=str))
+    except redis.RedisError as e:
+        logger.warning("progress publish failed: %s", e)
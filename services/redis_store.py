@@ -0,0 +1,20 @@
+# services/redis_store.py
+import os
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 預設與 Celery broker 共用同一個 Redis
+REDIS_URL = os.getenv("REDIS_URL") or os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+
+_clients = {}
+
+
+def get_redis(decode_responses: bool = True) -> redis.Redis:
+    """每個 process 共用一組 connection pool。"""
+    client = _clients.get(decode_responses)
+    if client is None:
+        client = redis.Redis.from_url(REDIS_URL, decode_responses=decode_responses)
+        _clients[decode_responses] = client
+    return client
@@ -0,0 +1,120 @@
+# services/result_cache.py
+import os
+import json
+import time
+import hashlib
+import unicodedata
+import re
+import logging
+import redis
+from dotenv import load_dotenv
+
+from services.redis_store import get_redis
+from services.upload_store import BLOB_DIR
+
+load_dotenv()
+
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000"))
+RESULT_CACHE_DISABLED = os.getenv("RESULT_CACHE_DISABLED", "0") == "1"
+
+PREFIX = "aicache"
+INDEX_KEY = f"{PREFIX}:index"   # zset: cache key -> 寫入時間，用來做容量上限的淘汰
+STATS_KEY = f"{PREFIX}:stats"   # hash: <operation>:hits / misses / bypass
+
+logger = logging.getLogger(__name__)
+_WS_RE = re.compile(r"\s+")
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def normalize_text(text: str) -> str:
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", str(text))).strip()
+
+
+def make_key(operation: str, identity: str, target_language: str | None, text: str) -> str:
+    """(operation, API key 身分, 目標語言, 正規化內容) 的雜湊；API key 本身不會寫進 Redis。"""
+    ident = hashlib.sha256((identity or "").encode("utf-8")).hexdigest()[:16]
+    raw = "\x1f".join([operation, ident, target_language or "", normalize_text(text)])
+    return f"{PREFIX}:{operation}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    # 分段上傳的 blob 檔名就是內容的 sha256，不必重讀整個檔案
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if os.path.basename(os.path.dirname(path)) == BLOB_DIR and _DIGEST_RE.match(stem):
+        return stem
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _count(operation: str, field: str):
+    try:
+        get_redis().hincrby(STATS_KEY, f"{operation}:{field}", 1)
+    except redis.RedisError:
+        pass
+
+
+def get(key: str, operation: str):
+    try:
+        raw = get_redis().get(key)
+    except redis.RedisError as e:
+        logger.warning("result cache unavailable: %s", e)
+        return None
+    _count(operation, "hits" if raw is not None else "misses")
+    return json.loads(raw) if raw is not None else None
+
+
+def put(key: str, value):
+    r = get_redis()
+    now = time.time()
+    try:
+        pipe = r.pipeline()
+        pipe.set(key, json.dumps(value, ensure_ascii=False), ex=RESULT_CACHE_TTL)
+        pipe.zadd(INDEX_KEY, {key: now})
+        pipe.zremrangebyscore(INDEX_KEY, "-inf", now - RESULT_CACHE_TTL)
+        pipe.zcard(INDEX_KEY)
+        size = pipe.execute()[-1]
+        if size > RESULT_CACHE_MAX_ENTRIES:
+            evicted = [k for k, _ in r.zpopmin(INDEX_KEY, size - RESULT_CACHE_MAX_ENTRIES)]
+            if evicted:
+                r.delete(*evicted)
+    except redis.RedisError as e:
+        logger.warning("result cache write failed: %s", e)
+
+
+def cached(operation: str, identity: str, target_language: str | None, text: str, compute,
+           bypass: bool = False, should_store=None):
+    """有快取就直接回傳，否則呼叫 compute() 並寫入。Redis 掛掉時直接 compute (fail open)。
+
+    should_store(value) 回傳 False 時不寫入 (例如 API 錯誤訊息)。
+    """
+    if bypass or RESULT_CACHE_DISABLED:
+        _count(operation, "bypass")
+        return compute()
+    key = make_key(operation, identity, target_language, text)
+    hit = get(key, operation)
+    if hit is not None:
+        return hit
+    value = compute()
+    if should_store is None or should_store(value):
+        put(key, value)
+    return value
+
+
+def stats() -> dict:
+    try:
+        raw = get_redis().hgetall(STATS_KEY)
+        entries = get_redis().zcard(INDEX_KEY)
+    except redis.RedisError:
+        return {}
+    result = {"entries": entries, "operations": {}}
+    for field, value in raw.items():
+        operation, _, kind = field.rpartition(":")
+        result["operations"].setdefault(operation, {"hits": 0, "misses": 0, "bypass": 0})[kind] = int(value)
+    for op in result["operations"].values():
+        total = op["hits"] + op["misses"]
+        op["hit_rate"] = round(op["hits"] / total, 3) if total else 0.0
+    return result
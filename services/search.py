@@ -0,0 +1,163 @@
+# services/search.py
+import os
+import re
+import html
+from sqlalchemy import text
+
+from models import db
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_TERMS = 8
+SNIPPET_CHARS = 160
+# SQLite 只對最新的 N 筆命中計算 bm25 排序；常見詞命中數萬筆時仍能維持在毫秒級
+SEARCH_CANDIDATES = 1000
+# 索引查不到的短詞退回 LIKE (無法用索引)；全站搜尋時只掃最新的 N 筆，避免整表掃描
+SEARCH_LIKE_SCAN = 20000
+# 與 MySQL 的 ngram_token_size 一致；比它短的詞 (例如單一中文字) FULLTEXT 查不到
+MYSQL_NGRAM_TOKEN_SIZE = int(os.getenv("MYSQL_NGRAM_TOKEN_SIZE", "2"))
+
+# SQLite (本機測試) 用 FTS5 external-content 表 + trigger 同步；trigram tokenizer 可搜中日韓子字串
+# MySQL 則是 FULLTEXT ... WITH PARSER ngram。兩者都由 migration 建立，這裡只保留給測試 / benchmark 建表用
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS ms_transcript_segments_fts
+       USING fts5(text, content='ms_transcript_segments', content_rowid='id', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS ms_transcript_segments_fts_ai AFTER INSERT ON ms_transcript_segments BEGIN
+         INSERT INTO ms_transcript_segments_fts(rowid, text) VALUES (new.id, new.text);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS ms_transcript_segments_fts_ad AFTER DELETE ON ms_transcript_segments BEGIN
+         INSERT INTO ms_transcript_segments_fts(ms_transcript_segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS ms_transcript_segments_fts_au AFTER UPDATE ON ms_transcript_segments BEGIN
+         INSERT INTO ms_transcript_segments_fts(ms_transcript_segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+         INSERT INTO ms_transcript_segments_fts(rowid, text) VALUES (new.id, new.text);
+       END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS ms_summaries_fts
+       USING fts5(content, content='ms_summaries', content_rowid='id', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS ms_summaries_fts_ai AFTER INSERT ON ms_summaries BEGIN
+         INSERT INTO ms_summaries_fts(rowid, content) VALUES (new.id, new.content);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS ms_summaries_fts_ad AFTER DELETE ON ms_summaries BEGIN
+         INSERT INTO ms_summaries_fts(ms_summaries_fts, rowid, content) VALUES ('delete', old.id, old.content);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS ms_summaries_fts_au AFTER UPDATE ON ms_summaries BEGIN
+         INSERT INTO ms_summaries_fts(ms_summaries_fts, rowid, content) VALUES ('delete', old.id, old.content);
+         INSERT INTO ms_summaries_fts(rowid, content) VALUES (new.id, new.content);
+       END""",
+]
+
+# (table, fts table, text column)
+_SOURCES = {
+    'segments': ('ms_transcript_segments', 'ms_transcript_segments_fts', 'text'),
+    'summaries': ('ms_summaries', 'ms_summaries_fts', 'content'),
+}
+
+
+def parse_terms(query: str) -> list[str]:
+    terms = []
+    for term in (query or '').split():
+        term = term.strip('"')
+        if term and term.lower() not in (t.lower() for t in terms):
+            terms.append(term)
+    return terms[:SEARCH_MAX_TERMS]
+
+
+def highlight(content: str, terms: list[str], width: int | None = None) -> str:
+    """HTML escape 後把命中的詞包上 <mark>；width 有值時只取第一個命中附近的片段。"""
+    pattern = re.compile('|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    prefix = suffix = ''
+    if width and len(content) > width:
+        first = pattern.search(content)
+        lo = max(0, (first.start() if first else 0) - width // 3)
+        prefix, suffix = ('…' if lo else ''), ('…' if lo + width < len(content) else '')
+        content = content[lo:lo + width]
+    out, pos = [], 0
+    for m in pattern.finditer(content):
+        out.append(html.escape(content[pos:m.start()]))
+        out.append(f'<mark>{html.escape(m.group())}</mark>')
+        pos = m.end()
+    out.append(html.escape(content[pos:]))
+    return prefix + ''.join(out) + suffix
+
+
+def _like_escape(term: str) -> str:
+    # 用 '!' 當跳脫字元：MySQL 字串裡的反斜線本身還要再跳脫一次
+    return term.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+def _match_clause(source: str, terms: list[str], dialect: str, scoped: bool = False):
+    """回傳 (FROM 附加的 JOIN, WHERE 條件, ORDER BY, 參數)；所有詞都必須出現 (AND)。
+
+    索引查得到的詞 (SQLite trigram 至少三個字、MySQL ngram 至少 ngram_token_size 個字) 走全文索引，
+    其餘短詞以 LIKE 在索引的命中裡過濾；全部都是短詞時退回 LIKE，只掃最新 SEARCH_LIKE_SCAN 筆。
+    scoped (限定單一會議) 時命中數本來就少，不套用候選與掃描上限。
+    """
+    table, fts, column = _SOURCES[source]
+    min_len = {'mysql': MYSQL_NGRAM_TOKEN_SIZE, 'sqlite': 3}.get(dialect)
+    indexed = [t for t in terms if min_len and len(t) >= min_len]
+    short = [t for t in terms if t not in indexed]
+    params = {f't{i}': f'%{_like_escape(t)}%' for i, t in enumerate(short)}
+    likes = [f"x.{column} LIKE :t{i} ESCAPE '!'" for i in range(len(short))]
+    if not indexed:
+        scan = '' if scoped else (f"JOIN (SELECT id FROM {table} ORDER BY id DESC LIMIT {SEARCH_LIKE_SCAN}) s "
+                                  f"ON s.id = x.id")
+        return scan, ' AND '.join(likes), 'x.id DESC', params
+    if dialect == 'mysql':
+        query = ' '.join('+"%s"' % t.replace('"', '') for t in indexed)
+        match = f"MATCH(x.{column}) AGAINST (:q IN BOOLEAN MODE)"
+        return '', ' AND '.join([match, *likes]), f"{match} DESC", {**params, 'q': query}
+    query = ' '.join('"%s"' % t.replace('"', '""') for t in indexed)
+    if scoped:
+        return (f"JOIN {fts} f ON f.rowid = x.id", ' AND '.join([f"{fts} MATCH :q", *likes]),
+                f"bm25({fts})", {**params, 'q': query})
+    candidates = (f"JOIN (SELECT rowid, bm25({fts}) AS score FROM {fts} WHERE {fts} MATCH :q "
+                  f"ORDER BY rowid DESC LIMIT {SEARCH_CANDIDATES}) f ON f.rowid = x.id")
+    return candidates, ' AND '.join(likes) or '1 = 1', 'f.score', {**params, 'q': query}
+
+
+def search(query: str, limit: int = SEARCH_DEFAULT_LIMIT, meeting_id: int | None = None) -> dict:
+    """搜尋逐字稿段落與摘要，回傳含 <mark> 標示與時間戳的命中結果。"""
+    terms = parse_terms(query)
+    if not terms:
+        return {'query': query, 'segments': [], 'summaries': []}
+    limit = max(1, min(int(limit), SEARCH_MAX_LIMIT))
+    dialect = db.session.get_bind().dialect.name
+    meeting_filter = ' AND x.meeting_id = :meeting_id' if meeting_id else ''
+
+    join, where, order, params = _match_clause('segments', terms, dialect, scoped=bool(meeting_id))
+    rows = db.session.execute(text(f"""
+        SELECT x.id, x.meeting_id, x.transcript_id, x.start_time, x.end_time, x.text, m.topic, m.meeting_date
+        FROM ms_transcript_segments x {join}
+        JOIN ms_meetings m ON m.id = x.meeting_id
+        WHERE {where}{meeting_filter}
+        ORDER BY {order}
+        LIMIT :limit
+    """), {**params, 'limit': limit, 'meeting_id': meeting_id}).all()
+    segments = [{
+        'segment_id': r.id,
+        'meeting_id': r.meeting_id,
+        'meeting_topic': r.topic,
+        'meeting_date': r.meeting_date.isoformat() if hasattr(r.meeting_date, 'isoformat') else r.meeting_date,
+        'transcript_id': r.transcript_id,
+        'start': r.start_time,
+        'end': r.end_time,
+        'highlight': highlight(r.text, terms),
+    } for r in rows]
+
+    join, where, order, params = _match_clause('summaries', terms, dialect, scoped=bool(meeting_id))
+    rows = db.session.execute(text(f"""
+        SELECT x.id, x.meeting_id, x.language, x.content, m.topic
+        FROM ms_summaries x {join}
+        JOIN ms_meetings m ON m.id = x.meeting_id
+        WHERE {where}{meeting_filter}
+        ORDER BY {order}
+        LIMIT :limit
+    """), {**params, 'limit': limit, 'meeting_id': meeting_id}).all()
+    summaries = [{
+        'summary_id': r.id,
+        'meeting_id': r.meeting_id,
+        'meeting_topic': r.topic,
+        'language': r.language,
+        'highlight': highlight(r.content, terms, width=SNIPPET_CHARS),
+    } for r in rows]
+    return {'query': query, 'segments': segments, 'summaries': summaries}
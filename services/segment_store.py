@@ -0,0 +1,70 @@
+# services/segment_store.py
+import os
+import json
+import struct
+from bisect import bisect_left
+
+from services.transcript import Segment
+
+# <stem>.segments.jsonl  每行一個 segment：{"start", "end", "text"}
+# <stem>.segments.idx    每個 segment 16 bytes：(start 秒 float64, 該行在 jsonl 的 byte offset uint64)
+# 讀取某個時間窗或第 n 段時只要讀 idx (兩小時約 2-3 萬段 ≈ 幾百 KB) 再 seek 到 jsonl，不必載入整份逐字稿
+SEGMENTS_SUFFIX = ".segments.jsonl"
+INDEX_SUFFIX = ".segments.idx"
+_RECORD = struct.Struct("<dQ")
+
+
+def paths_for(stem: str) -> tuple[str, str]:
+    return stem + SEGMENTS_SUFFIX, stem + INDEX_SUFFIX
+
+
+def write_segments(stem: str, segments: list[dict]) -> str:
+    data_path, index_path = paths_for(stem)
+    with open(data_path + ".tmp", "wb") as data, open(index_path + ".tmp", "wb") as index:
+        for seg in segments:
+            index.write(_RECORD.pack(float(seg["start"]), data.tell()))
+            line = {"start": seg["start"], "end": seg["end"], "text": seg["text"].strip()}
+            data.write(json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n")
+    os.replace(data_path + ".tmp", data_path)
+    os.replace(index_path + ".tmp", index_path)
+    return data_path
+
+
+def _load_index(index_path: str) -> tuple[list[float], list[int]]:
+    with open(index_path, "rb") as f:
+        records = list(_RECORD.iter_unpack(f.read()))
+    return [r[0] for r in records], [r[1] for r in records]
+
+
+def count(stem: str) -> int:
+    return os.path.getsize(paths_for(stem)[1]) // _RECORD.size
+
+
+def read_segments(stem: str, start: float | None = None, end: float | None = None,
+                  offset: int = 0, limit: int | None = None) -> tuple[list[Segment], int, int]:
+    """讀取 [start, end) 時間窗內 (或從第 offset 段起) 的 segment。
+
+    回傳 (segments, 第一段的 index, 總段數)。start/end 以秒為單位，與 offset 可並用。
+    """
+    data_path, index_path = paths_for(stem)
+    starts, offsets = _load_index(index_path)
+    first = offset
+    if start is not None:
+        # 前一段可能跨過 start，一併納入
+        first = max(first, bisect_left(starts, start) - 1, 0)
+    if first >= len(offsets):
+        return [], first, len(starts)
+    segments = []
+    with open(data_path, "rb") as f:
+        f.seek(offsets[first])
+        for line in f:
+            item = json.loads(line)
+            if end is not None and item["start"] >= end:
+                break
+            if start is not None and item["end"] <= start:
+                first += 1
+                continue
+            segments.append(Segment(item["start"], item["end"], item["text"]))
+            if limit is not None and len(segments) >= limit:
+                break
+    return segments, first, len(starts)
@@ -0,0 +1,111 @@
+# services/separation.py
+import os
+import hashlib
+
+import numpy as np
+import torch
+from dotenv import load_dotenv
+
+from services.model_registry import ModelRegistry
+
+load_dotenv()
+
+DEMUCS_MODEL = os.getenv("DEMUCS_MODEL", "htdemucs")
+# 每次送進 demucs 的最長音訊；輸出含所有 source，整段一次處理會吃掉數 GB 記憶體
+DEMUCS_BLOCK_SECONDS = float(os.getenv("DEMUCS_BLOCK_SECONDS", "60"))
+DEMUCS_CACHE_DIR = os.getenv("DEMUCS_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads", ".demucs")
+DEMUCS_CACHE_MAX_BYTES = int(os.getenv("DEMUCS_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+
+
+def _device() -> str:
+    return os.getenv("DEMUCS_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def _load_demucs(name: str, device: str):
+    from demucs.pretrained import get_model  # 只有開啟 use_demucs 的 worker 才需要載入
+    model = get_model(name)
+    model.to(device)
+    model.eval()
+    return model
+
+
+def _release_demucs(key, model):
+    del model
+    if key[1].startswith("cuda"):
+        torch.cuda.empty_cache()
+
+
+# 每個 worker process 只保留一個常駐的分離模型
+demucs_models = ModelRegistry(_load_demucs, capacity=1, on_evict=_release_demucs)
+
+
+def cache_path(audio_digest: str, regions_key: str, model_name: str = DEMUCS_MODEL) -> str:
+    """分離結果只跟輸入內容、模型與處理範圍有關，換語言或轉錄模型都可以直接沿用。"""
+    key = hashlib.sha256(f"{audio_digest}\x1f{model_name}\x1f{regions_key}".encode("utf-8")).hexdigest()
+    return os.path.join(DEMUCS_CACHE_DIR, f"{key}.npy")
+
+
+def _prune_cache():
+    try:
+        files = [os.path.join(DEMUCS_CACHE_DIR, n) for n in os.listdir(DEMUCS_CACHE_DIR) if n.endswith(".npy")]
+        files.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(f) for f in files)
+        while files and total > DEMUCS_CACHE_MAX_BYTES:
+            oldest = files.pop(0)
+            total -= os.path.getsize(oldest)
+            os.remove(oldest)
+    except OSError:
+        pass
+
+
+def _separate_block(model, block: np.ndarray, sr: int, device: str) -> np.ndarray:
+    import torchaudio.functional as AF
+    from demucs.apply import apply_model
+
+    wav = torch.from_numpy(block).to(device)
+    wav = AF.resample(wav, sr, model.samplerate)
+    # 16k mono → 模型取樣率、聲道數；依 demucs 慣例先正規化再還原
+    wav = wav.unsqueeze(0).repeat(model.audio_channels, 1)
+    ref = wav.mean(0)
+    mean, std = ref.mean(), ref.std() + 1e-8
+    with torch.no_grad():
+        sources = apply_model(model, ((wav - mean) / std)[None], split=True, overlap=0.25, device=device)[0]
+    vocals = sources[model.sources.index("vocals")] * std + mean
+    out = AF.resample(vocals.mean(0), model.samplerate, sr)[:len(block)].cpu().numpy().astype(np.float32)
+    # 來回重新取樣可能少一兩個 sample，補零讓長度與輸入一致
+    return np.pad(out, (0, len(block) - len(out)))
+
+
+def separate_vocals(audio: np.ndarray, sr: int, audio_digest: str, regions=None, on_progress=None) -> np.ndarray:
+    """回傳只含人聲的 16k mono 音訊 (長度與輸入相同)。
+
+    regions 為 VAD 語音區 [(start, end)]；有給時只處理這些範圍，其餘保留原音。
+    結果以 (輸入雜湊, 模型, 範圍) 快取在磁碟上。on_progress(ratio) 在每個區塊完成時呼叫。
+    """
+    regions_key = "full" if regions is None else hashlib.sha256(repr(list(regions)).encode()).hexdigest()[:16]
+    path = cache_path(audio_digest, regions_key)
+    if os.path.exists(path):
+        os.utime(path)
+        return np.load(path)
+
+    device = _device()
+    model, _ = demucs_models.get(DEMUCS_MODEL, device)
+    block_len = int(DEMUCS_BLOCK_SECONDS * sr)
+    blocks = [(pos, min(pos + block_len, end))
+              for start, end in (regions or [(0, len(audio))])
+              for pos in range(start, end, block_len)]
+
+    out = audio.copy()
+    for done, (start, end) in enumerate(blocks, start=1):
+        out[start:end] = _separate_block(model, audio[start:end], sr, device)
+        if on_progress:
+            on_progress(done / len(blocks))
+
+    os.makedirs(DEMUCS_CACHE_DIR, exist_ok=True)
+    tmp = path + f".{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, out)
+    os.replace(tmp, path)
+    _prune_cache()
+    return out
@@ -0,0 +1,77 @@
+# services/summarizer.py
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from services.transcript import Segment, parse_segments, estimate_tokens, pack_batches, render
+
+load_dotenv()
+
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+
+
+class IncompleteSummaryError(RuntimeError):
+    """某個部分摘要沒有可用的內容；少了一段的摘要會默默漏掉那段會議，寧可讓 task 失敗重跑。"""
+
+
+def _usable_partials(partials: list, stage: str) -> list[str]:
+    missing = [i for i, p in enumerate(partials, start=1) if not isinstance(p, str) or not p.strip()]
+    if missing:
+        raise IncompleteSummaryError(
+            f"{stage}: part {', '.join(map(str, missing))} of {len(partials)} returned no summary")
+    return [p.strip() for p in partials]
+
+
+def _summarize_all(prompts: list[str], complete, workers: int, on_done=None) -> list[str]:
+    results = [None] * len(prompts)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(prompts)))) as pool:
+        futures = {pool.submit(complete, p): i for i, p in enumerate(prompts)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if on_done:
+                on_done(done, len(prompts))
+    return results
+
+
+def build_summary_prompt(text: str, target_language: str, complete, budget: int = SUMMARY_CHUNK_TOKENS,
+                         workers: int = SUMMARY_WORKERS, on_progress=None) -> str:
+    """回傳最後一次 (reduce) 呼叫的 prompt。
+
+    短逐字稿直接回傳原本的單次 prompt；超過預算時先依 segment 邊界切塊、
+    以 complete(prompt) -> str 平行摘要 (map)，部分摘要仍過長就再分層合併，
+    最後由呼叫端以回傳的 prompt 做最終 reduce，以便沿用 conversation_id。
+    on_progress(stage, done, total) 在每個部分摘要完成時被呼叫。
+    任何一個部分摘要是空的 (complete 失敗時應回傳空字串) 就拋出 IncompleteSummaryError。
+    """
+    if estimate_tokens(text) <= budget:
+        return f"Summarize for {target_language}: {text}"
+
+    batches = pack_batches(parse_segments(text), budget)
+    prompts = [
+        f"Summarize part {i}/{len(batches)} of a meeting transcript for {target_language}. "
+        f"Keep decisions, owners and deadlines:\n{render(batch)}"
+        for i, batch in enumerate(batches, start=1)
+    ]
+    partials = _usable_partials(
+        _summarize_all(prompts, complete, workers, lambda d, t: on_progress and on_progress("map", d, t)), "map")
+
+    level = 1
+    while estimate_tokens("\n\n".join(partials)) > budget and len(partials) > 1:
+        groups = pack_batches([Segment(None, None, p) for p in partials], budget)
+        if len(groups) == len(partials):
+            groups = [groups[i:i + 2] for i in range(0, len(groups), 2)]
+            groups = [[seg for g in pair for seg in g] for pair in groups]
+        prompts = [
+            f"Merge these partial meeting summaries into one for {target_language}:\n\n"
+            + "\n\n".join(seg.text for seg in group)
+            for group in groups
+        ]
+        partials = _usable_partials(
+            _summarize_all(prompts, complete, workers,
+                           lambda d, t: on_progress and on_progress(f"reduce-{level}", d, t)),
+            f"reduce-{level}")
+        level += 1
+
+    numbered = "\n\n".join(f"Part {i}:\n{p}" for i, p in enumerate(partials, start=1))
+    return f"Combine these partial summaries of one meeting into a single summary for {target_language}:\n\n{numbered}"
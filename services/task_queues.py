@@ -0,0 +1,149 @@
+# services/task_queues.py
+import os
+import time
+import logging
+import redis
+from kombu import Queue
+from dotenv import load_dotenv
+
+from services.redis_store import get_redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# media: ffmpeg / Whisper / demucs，吃 CPU、一次跑很久
+# llm: 長時間的 Dify 批次 (整份翻譯、map-reduce 摘要)，主要在等網路
+# interactive: 使用者在畫面上等結果的短任務
+MEDIA_QUEUE, LLM_QUEUE, INTERACTIVE_QUEUE = "media", "llm", "interactive"
+QUEUES = (Queue(MEDIA_QUEUE), Queue(LLM_QUEUE), Queue(INTERACTIVE_QUEUE))
+
+TASK_ROUTES = {
+    "tasks.extract_audio_task": {"queue": MEDIA_QUEUE},
+    "tasks.transcribe_audio_task": {"queue": MEDIA_QUEUE},
+    "tasks.translate_segments_task": {"queue": LLM_QUEUE},
+    "tasks.summarize_text_task": {"queue": LLM_QUEUE},
+    "tasks.preview_action_items_task": {"queue": INTERACTIVE_QUEUE},
+    "tasks.ai_translate_text_task": {"queue": INTERACTIVE_QUEUE},
+    "tasks.ai_summarize_text_task": {"queue": INTERACTIVE_QUEUE},
+    "tasks.ai_extract_action_items_task": {"queue": INTERACTIVE_QUEUE},
+}
+
+# worker 以 -Q <queue> 啟動時套用 (命令列有指定 -c / --prefetch-multiplier 時以命令列為準)
+# 長任務 prefetch 1：worker 不會先把後面的 1GB 轉錄搶走，其他 worker 閒下來就能接
+QUEUE_PROFILES = {
+    MEDIA_QUEUE: {"concurrency": int(os.getenv("MEDIA_CONCURRENCY", "1")), "prefetch_multiplier": 1},
+    LLM_QUEUE: {"concurrency": int(os.getenv("LLM_CONCURRENCY", "8")), "prefetch_multiplier": 1},
+    INTERACTIVE_QUEUE: {"concurrency": int(os.getenv("INTERACTIVE_CONCURRENCY", "4")), "prefetch_multiplier": 4},
+}
+
+# 每個使用者在各 queue 同時執行的上限；超過的 task 延後重新排到隊尾，讓其他使用者先跑
+FAIR_MAX_INFLIGHT = {
+    MEDIA_QUEUE: int(os.getenv("FAIR_MAX_INFLIGHT_MEDIA", "1")),
+    LLM_QUEUE: int(os.getenv("FAIR_MAX_INFLIGHT_LLM", "3")),
+    INTERACTIVE_QUEUE: int(os.getenv("FAIR_MAX_INFLIGHT_INTERACTIVE", "4")),
+}
+FAIR_RETRY_SECONDS = float(os.getenv("FAIR_RETRY_SECONDS", "5"))
+FAIR_SLOT_TTL = 6 * 3600  # worker 異常結束沒有 release 時，計數最多殘留這麼久
+
+USER_HEADER = "x_user_id"
+ENQUEUED_HEADER = "x_enqueued_at"
+_WAIT_SAMPLES = 200
+
+
+def worker_profile(queues) -> dict | None:
+    """只訂閱單一 queue 的 worker 才套用對應設定；混合 queue 的 worker 維持全域預設。"""
+    if isinstance(queues, str):
+        queues = [q.strip() for q in queues.split(",") if q.strip()]
+    queues = list(queues or [])
+    return QUEUE_PROFILES.get(queues[0]) if len(queues) == 1 else None
+
+
+def header(request, name):
+    # 自訂 header 在 Celery 5 會併入 request 屬性；舊格式則留在 request.headers
+    return getattr(request, name, None) or (getattr(request, "headers", None) or {}).get(name)
+
+
+def _slot_key(queue: str, user_id) -> str:
+    # ZSET：member 為 task_id，score 為名額到期時間
+    return f"fair:running:{queue}:{user_id}"
+
+
+def acquire_slot(queue: str, user_id, task_id) -> bool:
+    """佔用一個執行名額；沒有 user 或 Redis 不通時一律放行 (fail open)。
+
+    每個名額各自帶到期時間，取名額前先清掉過期的，worker 被殺掉沒 release 的名額最多殘留 FAIR_SLOT_TTL；
+    被拒的嘗試會把自己移除，不會延長其他名額的壽命。同一 task_id 重送 (acks_late 重派) 只佔一個名額。
+    """
+    limit = FAIR_MAX_INFLIGHT.get(queue)
+    if not user_id or not limit:
+        return True
+    key = _slot_key(queue, user_id)
+    now = time.time()
+    try:
+        pipe = get_redis().pipeline()
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.zadd(key, {str(task_id): now + FAIR_SLOT_TTL})
+        pipe.zcard(key)
+        pipe.expire(key, FAIR_SLOT_TTL)
+        count = pipe.execute()[2]
+        if count > limit:
+            get_redis().zrem(key, str(task_id))
+            return False
+    except redis.RedisError as e:
+        logger.warning("fair scheduling unavailable: %s", e)
+    return True
+
+
+def release_slot(queue: str, user_id, task_id):
+    if not user_id or not FAIR_MAX_INFLIGHT.get(queue):
+        return
+    try:
+        get_redis().zrem(_slot_key(queue, user_id), str(task_id))
+    except redis.RedisError:
+        pass
+
+
+def record_wait(queue: str, enqueued_at) -> float | None:
+    """記錄 task 從送出到開始執行的等待秒數。"""
+    try:
+        waited = max(0.0, time.time() - float(enqueued_at))
+    except (TypeError, ValueError):
+        return None
+    try:
+        pipe = get_redis().pipeline()
+        pipe.lpush(f"queue-wait:{queue}", round(waited, 3))
+        pipe.ltrim(f"queue-wait:{queue}", 0, _WAIT_SAMPLES - 1)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+    return waited
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct))], 3)
+
+
+def stats(broker_url: str) -> dict:
+    """各 queue 目前排隊數 (broker LLEN)、最近等待時間分布與各使用者執行中的數量。"""
+    try:
+        broker = redis.Redis.from_url(broker_url, decode_responses=True)
+        r = get_redis()
+        result = {}
+        for queue in QUEUE_PROFILES:
+            waits = [float(w) for w in r.lrange(f"queue-wait:{queue}", 0, -1)]
+            inflight = {key.rsplit(":", 1)[1]: r.zcount(key, time.time(), "+inf")
+                        for key in r.scan_iter(match=_slot_key(queue, "*"), count=500)}
+            result[queue] = {
+                "depth": broker.llen(queue),
+                "wait_samples": len(waits),
+                "wait_p50": _percentile(waits, 0.5) if waits else None,
+                "wait_p95": _percentile(waits, 0.95) if waits else None,
+                "wait_max": round(max(waits), 3) if waits else None,
+                "inflight_by_user": {user: n for user, n in inflight.items() if n > 0},
+            }
+        return result
+    except redis.RedisError as e:
+        logger.warning("queue stats unavailable: %s", e)
+        return {}
@@ -0,0 +1,96 @@
+# services/transcript.py
+import os
+import re
+from dataclasses import dataclass
+
+# 轉錄稿格式：[0000s - 0008s] 內容 (見 test.txt)
+SEGMENT_RE = re.compile(r"^\[(\d+(?:\.\d+)?)s\s*-\s*(\d+(?:\.\d+)?)s\]\s*(.*)$")
+# 逐行掃描，group(1) 為去掉前後空白的內容；空白行落在兩行之間的分隔裡
+_LINE_RE = re.compile(r"^[^\S\n]*(\S[^\n]*?)[^\S\n]*$", re.MULTILINE)
+# 過長的無時間戳行才切句，且只在不會出現在縮寫、小數、網域裡的句尾符號切
+_SENTENCE_RE = re.compile(r"[^。！？!?]+[。！？!?]*")
+LONG_LINE_TOKENS = int(os.getenv("LONG_LINE_TOKENS", "800"))
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯＀-￯]")
+
+
+@dataclass
+class Segment:
+    start: float | None
+    end: float | None
+    text: str
+    sep: str = "\n"  # 原文中接在這個 segment 後面的分隔 (換行、空行)，render 時原樣放回
+
+    def format(self) -> str:
+        if self.start is None:
+            return self.text
+        return f"[{int(self.start):04d}s - {int(self.end):04d}s] {self.text}"
+
+
+def parse_segments(text: str) -> list[Segment]:
+    """解析帶時間戳的逐行轉錄稿；沒有時間戳的行整行作為一個 segment。
+
+    每個 segment 記下原文接在後面的分隔，render 可還原段落與空行。
+    """
+    segments = []
+    matches = list(_LINE_RE.finditer(text))
+    for i, m in enumerate(matches):
+        line = m.group(1)
+        sep = text[m.end(1):matches[i + 1].start(1)] if i + 1 < len(matches) else "\n"
+        timed = SEGMENT_RE.match(line)
+        if timed:
+            segments.append(Segment(float(timed.group(1)), float(timed.group(2)), timed.group(3).strip(), sep))
+        elif estimate_tokens(line) > LONG_LINE_TOKENS:
+            pieces = [s for s in _SENTENCE_RE.findall(line) if s.strip()] or [line]
+            for piece, following in zip(pieces, pieces[1:] + [None]):
+                gap = sep if following is None else " " if following[:1].isspace() else ""
+                segments.append(Segment(None, None, piece.strip(), gap))
+        else:
+            segments.append(Segment(None, None, line, sep))
+    return segments
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估 token 數：CJK 一字約一個 token，其餘約四個字元一個 token。"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def pack_batches(segments: list[Segment], budget: int) -> list[list[Segment]]:
+    """依 segment 邊界貪婪打包，每批不超過 token 預算 (單一過長的 segment 自成一批)。"""
+    batches, current, used = [], [], 0
+    for seg in segments:
+        cost = estimate_tokens(seg.text) + 4
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(seg)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def render(segments: list[Segment]) -> str:
+    if not segments:
+        return ""
+    return "".join(seg.format() + seg.sep for seg in segments[:-1]) + segments[-1].format()
+
+
+def _clock(seconds: float, sep: str) -> str:
+    ms = int(round((seconds or 0) * 1000))
+    h, ms = divmod(ms, 3600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+def render_srt(segments: list[Segment], first_index: int = 1) -> str:
+    return "\n".join(
+        f"{i}\n{_clock(seg.start, ',')} --> {_clock(seg.end, ',')}\n{seg.text}\n"
+        for i, seg in enumerate(segments, start=first_index)
+    )
+
+
+def render_vtt(segments: list[Segment]) -> str:
+    cues = "\n".join(f"{_clock(seg.start, '.')} --> {_clock(seg.end, '.')}\n{seg.text}\n" for seg in segments)
+    return "WEBVTT\n\n" + cues
@@ -0,0 +1,294 @@
+# services/transcription.py
+import os
+import queue
+import logging
+from dataclasses import dataclass
+
+import billiard
+
+import numpy as np
+import whisper
+import torch
+from dotenv import load_dotenv
+
+from services.model_registry import ModelRegistry
+from services import vad
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+# 逗號分隔，例如 "base,small"；worker 啟動時預先載入
+WHISPER_PRELOAD_MODELS = [m.strip() for m in os.getenv("WHISPER_PRELOAD_MODELS", WHISPER_MODEL).split(",") if m.strip()]
+WHISPER_MODEL_CACHE_SIZE = int(os.getenv("WHISPER_MODEL_CACHE_SIZE", "2"))
+# whisper (PyTorch fp32) 或 faster-whisper (CTranslate2，CPU 上預設 int8 量化)
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "whisper")
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+FASTER_WHISPER_BEAM_SIZE = int(os.getenv("FASTER_WHISPER_BEAM_SIZE", "5"))
+
+
+def default_device() -> str:
+    return os.getenv("WHISPER_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu")
+
+
+class TranscriptionBackend:
+    """轉錄引擎介面。transcribe() 一律回傳 [{start, end, text}] (秒，相對於傳入的音訊)。"""
+    name = ""
+
+    def load(self, model_size: str, device: str):
+        raise NotImplementedError
+
+    def release(self, device: str):
+        """模型被 registry 淘汰後呼叫，用來釋放裝置上的快取記憶體。"""
+
+    def set_threads(self, threads: int):
+        pass
+
+    def detect_language(self, model, audio) -> str:
+        raise NotImplementedError
+
+    def transcribe(self, model, audio, language: str | None) -> list[dict]:
+        raise NotImplementedError
+
+
+class WhisperBackend(TranscriptionBackend):
+    name = "whisper"
+
+    def load(self, model_size, device):
+        return whisper.load_model(model_size, device=device)
+
+    def release(self, device):
+        if device.startswith("cuda"):
+            torch.cuda.empty_cache()
+
+    def set_threads(self, threads):
+        torch.set_num_threads(threads)
+
+    def detect_language(self, model, audio):
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio[:30 * SAMPLE_RATE]), model.dims.n_mels).to(model.device)
+        _, probs = model.detect_language(mel)
+        return max(probs, key=probs.get)
+
+    def transcribe(self, model, audio, language):
+        result = model.transcribe(audio, language=language)
+        return [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    name = "faster-whisper"
+    cpu_threads = 0  # 0 = CTranslate2 自行決定
+
+    def load(self, model_size, device):
+        from faster_whisper import WhisperModel  # 選用套件，只有選這個 backend 時才需要
+        return WhisperModel(model_size, device=device, compute_type=FASTER_WHISPER_COMPUTE_TYPE,
+                            cpu_threads=self.cpu_threads)
+
+    def set_threads(self, threads):
+        self.cpu_threads = threads
+
+    def detect_language(self, model, audio):
+        # 語言偵測在 transcribe() 回傳前就完成；segments 是 generator，不迭代就不會解碼
+        _, info = model.transcribe(audio[:30 * SAMPLE_RATE], beam_size=1)
+        return info.language
+
+    def transcribe(self, model, audio, language):
+        segments, _ = model.transcribe(audio, language=language, beam_size=FASTER_WHISPER_BEAM_SIZE)
+        return [{"start": s.start, "end": s.end, "text": s.text} for s in segments]
+
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend(), FasterWhisperBackend())}
+
+
+def get_backend(name: str | None = None) -> TranscriptionBackend:
+    name = name or TRANSCRIBE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{name}' (available: {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+
+def _load_model(backend: str, model_size: str, device: str):
+    return get_backend(backend).load(model_size, device)
+
+
+def _release_model(key, model):
+    backend, _, device = key
+    del model
+    get_backend(backend).release(device)
+
+
+# 不同 backend 共用同一個 LRU，容量上限就是這個 process 常駐的模型總數
+transcription_models = ModelRegistry(_load_model, capacity=WHISPER_MODEL_CACHE_SIZE, on_evict=_release_model)
+
+
+def get_model(model_size: str | None = None, device: str | None = None, backend: str | None = None):
+    """從本 process 的 registry 取得模型，回傳 (model, cache_info)；cache_info['key'] 為 backend@size@device。"""
+    return transcription_models.get(get_backend(backend).name, model_size or WHISPER_MODEL, device or default_device())
+
+
+def preload_models():
+    for size in WHISPER_PRELOAD_MODELS:
+        try:
+            _, info = get_model(size)
+            logger.info("Transcription model '%s' preloaded in %ss", info['key'], info['load_seconds'])
+        except Exception:
+            logger.exception("Transcription model '%s' preload failed", size)
+
+
+# --- 長錄音分段轉錄 ---
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "600"))
+TRANSCRIBE_CHUNK_OVERLAP_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_OVERLAP_SECONDS", "2"))
+TRANSCRIBE_SILENCE_SEARCH_SECONDS = float(os.getenv("TRANSCRIBE_SILENCE_SEARCH_SECONDS", "30"))
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+
+
+@dataclass
+class Chunk:
+    index: int
+    start: int       # 含重疊區的起點 (sample)
+    end: int
+    keep_start: int  # 此 chunk 負責的區段，stitch 時只保留中點落在這裡的 segment
+    keep_end: int
+
+
+def _quietest_point(audio, lo: int, hi: int, frame: int) -> int:
+    window = audio[lo:hi]
+    n_frames = len(window) // frame
+    if n_frames == 0:
+        return hi
+    energy = np.sqrt(np.mean(window[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    return lo + int(np.argmin(energy)) * frame + frame // 2
+
+
+def plan_chunks(audio, sr: int = SAMPLE_RATE, chunk_seconds: float = TRANSCRIBE_CHUNK_SECONDS,
+                overlap_seconds: float = TRANSCRIBE_CHUNK_OVERLAP_SECONDS,
+                search_seconds: float = TRANSCRIBE_SILENCE_SEARCH_SECONDS) -> list[Chunk]:
+    """在目標長度附近找能量最低的 frame 切開，並在兩側加上重疊區。"""
+    total = len(audio)
+    chunk_len = int(chunk_seconds * sr)
+    search = min(int(search_seconds * sr), chunk_len // 2)
+    overlap = int(overlap_seconds * sr)
+    frame = int(0.1 * sr)
+
+    cuts = [0]
+    while total - cuts[-1] > chunk_len:
+        target = cuts[-1] + chunk_len
+        cuts.append(_quietest_point(audio, target - search, target, frame))
+    cuts.append(total)
+
+    return [
+        Chunk(i, max(0, cuts[i] - overlap), min(total, cuts[i + 1] + overlap), cuts[i], cuts[i + 1])
+        for i in range(len(cuts) - 1)
+    ]
+
+
+def stitch_segments(chunks: list[Chunk], results: dict, sr: int = SAMPLE_RATE) -> list[dict]:
+    """把各 chunk 的相對時間轉回絕對時間，並去掉重疊區重複的 segment。"""
+    stitched = []
+    for chunk in chunks:
+        offset = chunk.start / sr
+        keep_start, keep_end = chunk.keep_start / sr, chunk.keep_end / sr
+        for seg in results[chunk.index]:
+            start, end = seg["start"] + offset, seg["end"] + offset
+            if not keep_start <= (start + end) / 2 < keep_end:
+                continue
+            text = seg["text"].strip()
+            if stitched and stitched[-1]["text"] == text and start < stitched[-1]["end"]:
+                continue
+            stitched.append({"start": round(start, 2), "end": round(end, 2), "text": text})
+    stitched.sort(key=lambda s: s["start"])
+    return stitched
+
+
+# billiard (Celery 的 multiprocessing 分支) 允許 daemon process 再開子 process；
+# 標準庫的 ProcessPoolExecutor 在 prefork worker 裡會因 "daemonic processes are not allowed to have children" 失敗
+_pool_engine, _pool_model = None, None
+
+
+def _pool_init(engine, model_size, device, threads):
+    global _pool_engine, _pool_model
+    engine.set_threads(threads)
+    _pool_engine, _pool_model = engine, engine.load(model_size, device)
+
+
+def _pool_transcribe(job):
+    index, audio, language = job
+    return index, _pool_engine.transcribe(_pool_model, audio, language)
+
+
+def transcribe_chunked(model, audio, language: str | None = None, model_size: str | None = None,
+                       device: str | None = None, workers: int | None = None, on_chunk=None,
+                       backend: str | None = None, use_vad: bool | None = None, separate=None) -> dict:
+    """分段轉錄；workers > 1 時以 billiard process pool 平行處理各 chunk (每個子 process 各載一份模型)。
+
+    model 須由 get_model(..., backend=backend) 取得；on_chunk(done, total, segments) 會在每個 chunk 完成時被呼叫。
+    use_vad 時只把語音區送進模型，segment 時間再對回原始時間軸。
+    separate(audio, regions) -> audio 為選用的前處理 (例如人聲分離)，regions 為 None 表示整段處理。
+    """
+    engine = get_backend(backend)
+    if not len(audio):
+        raise ValueError("Decoded audio is empty")
+    use_vad = vad.TRANSCRIBE_VAD if use_vad is None else use_vad
+    timemap, vad_stats = None, None
+    regions = None
+    if use_vad:
+        regions = vad.detect_speech(audio, SAMPLE_RATE)
+        vad_stats = vad.speech_stats(regions, len(audio), SAMPLE_RATE)
+        if not regions:
+            # 整段低於門檻 (例如錄音音量很小) 時不相信 VAD，改為整段轉錄，避免回傳空白逐字稿
+            vad_stats.update(skipped_ratio=0.0, fallback="whole_file")
+    if regions:
+        if separate:
+            audio = separate(audio, regions)
+        audio, timemap = vad.compact(audio, regions, SAMPLE_RATE)
+    elif separate:
+        audio = separate(audio, None)
+    chunks = plan_chunks(audio)
+    language = language or engine.detect_language(model, audio)
+    workers = min(workers or TRANSCRIBE_WORKERS, len(chunks))
+    results = {}
+
+    if workers <= 1:
+        for chunk in chunks:
+            results[chunk.index] = engine.transcribe(model, audio[chunk.start:chunk.end], language)
+            if on_chunk:
+                on_chunk(len(results), len(chunks), results[chunk.index])
+    else:
+        device = device or default_device()
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn：不 fork 已載入模型 / CUDA 狀態的 worker process
+        pool = billiard.get_context("spawn").Pool(processes=workers, initializer=_pool_init,
+                                                  initargs=(engine, model_size or WHISPER_MODEL, device, threads))
+        try:
+            # 用 apply_async 而非 imap：billiard 以 job 的 worker pid 確認結果已被取走，子 process 才會立即結束
+            done = queue.SimpleQueue()
+            for c in chunks:
+                pool.apply_async(_pool_transcribe, ((c.index, audio[c.start:c.end], language),),
+                                 callback=done.put, error_callback=done.put)
+            for _ in chunks:
+                outcome = done.get()
+                if isinstance(outcome, BaseException):
+                    raise outcome
+                index, segments = outcome
+                results[index] = segments
+                if on_chunk:
+                    on_chunk(len(results), len(chunks), segments)
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    segments = stitch_segments(chunks, results)
+    if timemap is not None:
+        segments = timemap.map_segments(segments)
+    return {
+        "text": " ".join(s["text"] for s in segments),
+        "segments": segments,
+        "language": language,
+        "chunks": len(chunks),
+        "backend": engine.name,
+        "vad": vad_stats,
+    }
@@ -0,0 +1,59 @@
+# services/translator.py
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from services.transcript import Segment, parse_segments, pack_batches, render
+
+load_dotenv()
+
+TRANSLATE_BATCH_TOKENS = int(os.getenv("TRANSLATE_BATCH_TOKENS", "1500"))
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "4"))
+
+_NUMBERED_RE = re.compile(r"^\s*<(\d+)>\s*(.*)$")
+
+
+def _batch_query(batch: list[Segment]) -> str:
+    # 以 <n> 標號送出，回來時依標號對回 segment，時間戳不經過 LLM
+    return "\n".join(f"<{i}> {seg.text}" for i, seg in enumerate(batch))
+
+
+def _parse_numbered(answer: str, size: int) -> dict[int, str]:
+    lines = {}
+    for line in str(answer).splitlines():
+        m = _NUMBERED_RE.match(line)
+        if m and int(m.group(1)) < size:
+            lines[int(m.group(1))] = m.group(2).strip()
+    return lines
+
+
+def translate_batch(batch: list[Segment], target_lang: str, translate) -> list[Segment]:
+    lines = _parse_numbered(translate(_batch_query(batch), target_lang), len(batch))
+    out = []
+    for i, seg in enumerate(batch):
+        text = lines.get(i)
+        if text is None:
+            # 標號遺失時退回單句翻譯，確保行數與時間戳對齊
+            text = str(translate(seg.text, target_lang)).strip()
+        out.append(Segment(seg.start, seg.end, text, seg.sep))
+    return out
+
+
+def translate_segments(text: str, target_lang: str, translate, budget: int = TRANSLATE_BATCH_TOKENS,
+                       workers: int = TRANSLATE_WORKERS, on_batch=None) -> str:
+    """把逐字稿依 token 預算分批，以有上限的 thread pool 平行翻譯後依原順序組回。
+
+    translate(text, target_lang) -> str；on_batch(done, total, segments) 在每批完成時呼叫。
+    """
+    batches = pack_batches(parse_segments(text), budget)
+    if not batches:
+        return ""
+    results = [None] * len(batches)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+        futures = {pool.submit(translate_batch, batch, target_lang, translate): i for i, batch in enumerate(batches)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if on_batch:
+                on_batch(done, len(batches), results[futures[future]])
+    return render([seg for batch in results for seg in batch])
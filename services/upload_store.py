@@ -0,0 +1,266 @@
+# services/upload_store.py
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# uploads/
+#   .sessions/<upload_id>.json / .part / .lock   進行中的分段上傳
+#   blobs/<sha256><ext>                           完成後依內容雜湊存放，相同檔案只存一份
+#   .owners/<sha256>/<hash(user_id)>              實際上傳過這份內容的使用者；只有他們能以 sha256 引用 blob
+SESSION_DIR = ".sessions"
+BLOB_DIR = "blobs"
+OWNER_DIR = ".owners"
+LOCK_STALE_SECONDS = 120
+# 超過這麼久沒有再寫入的上傳視為放棄，建立新上傳時順便清掉 (每個 process 最多每 SESSION_SWEEP_SECONDS 掃一次)
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+SESSION_SWEEP_SECONDS = 600
+_READ_BYTES = 1 << 20
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+# 每個 process 保留進行中上傳的 hash 狀態 (offset, hasher)；換 process 續傳時從 .part 重建一次
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+_MAX_HASHERS = 64
+_last_sweep = 0.0
+
+
+def _dirs(upload_folder):
+    sessions = os.path.join(upload_folder, SESSION_DIR)
+    blobs = os.path.join(upload_folder, BLOB_DIR)
+    os.makedirs(sessions, exist_ok=True)
+    os.makedirs(blobs, exist_ok=True)
+    return sessions, blobs
+
+
+def _session_paths(upload_folder, upload_id):
+    if not re.match(r"^[0-9a-f]{32}$", upload_id or ""):
+        raise UploadError("invalid upload id", 404)
+    sessions, _ = _dirs(upload_folder)
+    base = os.path.join(sessions, upload_id)
+    return base + ".json", base + ".part"
+
+
+def _load(upload_folder, upload_id):
+    meta_path, part_path = _session_paths(upload_folder, upload_id)
+    if not os.path.exists(meta_path):
+        raise UploadError("upload not found", 404)
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["offset"] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return meta, part_path
+
+
+@contextmanager
+def _locked(part_path):
+    """跨 process 的簡易檔案鎖，避免同一個上傳被兩個請求同時寫入。"""
+    lock = part_path + ".lock"
+    for _ in range(2):
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.time() - os.path.getmtime(lock) <= LOCK_STALE_SECONDS:
+                raise UploadError("upload is busy", 409)
+            os.remove(lock)
+    else:
+        raise UploadError("upload is busy", 409)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock)
+
+
+def _hasher_at(upload_id, part_path, offset):
+    with _hashers_lock:
+        cached = _hashers.pop(upload_id, None)
+    if cached and cached[0] == offset:
+        return cached[1]
+    hasher = hashlib.sha256()
+    if os.path.exists(part_path):
+        with open(part_path, "rb") as f:
+            for block in iter(lambda: f.read(_READ_BYTES), b""):
+                hasher.update(block)
+    return hasher
+
+
+def _remember(upload_id, offset, hasher):
+    with _hashers_lock:
+        _hashers[upload_id] = (offset, hasher)
+        while len(_hashers) > _MAX_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def find_blob(upload_folder, digest):
+    if not _DIGEST_RE.match(digest or ""):
+        return None
+    _, blobs = _dirs(upload_folder)
+    for name in os.listdir(blobs):
+        if name.startswith(digest):
+            return os.path.join(blobs, name)
+    return None
+
+
+def cleanup_stale_sessions(upload_folder, ttl=UPLOAD_SESSION_TTL, now=None):
+    """刪除最後一次寫入已超過 ttl 秒的上傳 (.json / .part / .lock)，回傳清掉的 upload_id 數。"""
+    sessions, _ = _dirs(upload_folder)
+    now = time.time() if now is None else now
+    last_active = {}
+    for name in os.listdir(sessions):
+        upload_id = name.split(".", 1)[0]
+        try:
+            mtime = os.path.getmtime(os.path.join(sessions, name))
+        except FileNotFoundError:
+            continue
+        last_active[upload_id] = max(last_active.get(upload_id, 0.0), mtime)
+    removed = 0
+    for upload_id, mtime in last_active.items():
+        if now - mtime <= ttl:
+            continue
+        base = os.path.join(sessions, upload_id)
+        for path in (base + ".json", base + ".part", base + ".part.lock"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with _hashers_lock:
+            _hashers.pop(upload_id, None)
+        removed += 1
+    return removed
+
+
+def _sweep(upload_folder):
+    global _last_sweep
+    now = time.time()
+    with _hashers_lock:
+        if now - _last_sweep < SESSION_SWEEP_SECONDS:
+            return
+        _last_sweep = now
+    cleanup_stale_sessions(upload_folder, now=now)
+
+
+def _owner_path(upload_folder, digest, user_id):
+    return os.path.join(upload_folder, OWNER_DIR, digest, hashlib.sha256(str(user_id).encode("utf-8")).hexdigest()[:32])
+
+
+def grant_blob(upload_folder, digest, user_id):
+    path = _owner_path(upload_folder, digest, user_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "a").close()
+
+
+def owns_blob(upload_folder, digest, user_id) -> bool:
+    """只知道 sha256 不算持有檔案：使用者必須自己完整上傳過 (finalize 時以實際內容計算雜湊)。"""
+    if not _DIGEST_RE.match(digest or "") or user_id is None:
+        return False
+    return os.path.exists(_owner_path(upload_folder, digest, user_id))
+
+
+def create_session(upload_folder, filename, size=None, user_id=None, max_size=None):
+    if size is not None and max_size and size > max_size:
+        raise UploadError("file too large", 413)
+    _sweep(upload_folder)
+    upload_id = uuid.uuid4().hex
+    meta_path, part_path = _session_paths(upload_folder, upload_id)
+    meta = {
+        "upload_id": upload_id,
+        "filename": filename,
+        "ext": os.path.splitext(filename)[1].lower(),
+        "size": size,
+        "user_id": user_id,
+        "created_at": time.time(),
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    open(part_path, "wb").close()
+    return {**meta, "offset": 0}
+
+
+def session_status(upload_folder, upload_id):
+    meta, _ = _load(upload_folder, upload_id)
+    return meta
+
+
+def write_chunk(upload_folder, upload_id, start, stream, length, total=None, max_size=None):
+    """把 [start, start+length) 寫到 .part 尾端，同時更新 SHA-256。
+
+    start 必須等於目前已提交的 offset，否則回 409 並附上 offset 讓前端從那裡續傳。
+    連線中斷時已寫入的部分仍算提交，下次從新的 offset 繼續。
+    """
+    meta, part_path = _load(upload_folder, upload_id)
+    with _locked(part_path):
+        offset = os.path.getsize(part_path)
+        if start != offset:
+            raise UploadError("offset mismatch", 409, offset=offset)
+        expected = total if total is not None else meta.get("size")
+        if (expected is not None and start + length > expected) or (max_size and start + length > max_size):
+            raise UploadError("chunk exceeds declared size", 416, offset=offset)
+
+        hasher = _hasher_at(upload_id, part_path, offset)
+        written = 0
+        try:
+            with open(part_path, "ab") as f:
+                while written < length:
+                    block = stream.read(min(_READ_BYTES, length - written))
+                    if not block:
+                        break
+                    f.write(block)
+                    hasher.update(block)
+                    written += len(block)
+        finally:
+            _remember(upload_id, offset + written, hasher)
+    return {**meta, "offset": offset + written}
+
+
+def finalize(upload_folder, upload_id):
+    """計算最終雜湊並移到 blobs/；內容相同的檔案已存在時直接沿用 (去重)。"""
+    meta, part_path = _load(upload_folder, upload_id)
+    meta_path, _ = _session_paths(upload_folder, upload_id)
+    with _locked(part_path):
+        offset = os.path.getsize(part_path)
+        if meta.get("size") is not None and offset != meta["size"]:
+            raise UploadError("upload incomplete", 409, offset=offset)
+        digest = _hasher_at(upload_id, part_path, offset).hexdigest()
+        existing = find_blob(upload_folder, digest)
+        deduplicated = existing is not None
+        if deduplicated:
+            os.remove(part_path)
+        else:
+            _, blobs = _dirs(upload_folder)
+            existing = os.path.join(blobs, digest + meta["ext"])
+            os.replace(part_path, existing)
+    os.remove(meta_path)
+    grant_blob(upload_folder, digest, meta.get("user_id"))
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+    return {
+        "sha256": digest,
+        "blob": digest,
+        "filename": meta["filename"],
+        "size": offset,
+        "deduplicated": deduplicated,
+    }
+
+
+def abort(upload_folder, upload_id):
+    meta_path, part_path = _session_paths(upload_folder, upload_id)
+    with _locked(part_path):
+        for path in (meta_path, part_path):
+            if os.path.exists(path):
+                os.remove(path)
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
@@ -0,0 +1,119 @@
+# services/vad.py
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRANSCRIBE_VAD = os.getenv("TRANSCRIBE_VAD", "1") == "1"
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+# 門檻 = 噪音底 (能量第 10 百分位) + margin，但不低於絕對下限
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+VAD_MIN_DB = float(os.getenv("VAD_MIN_DB", "-55"))
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "300"))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "250"))
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "1000"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))
+# 壓縮後相鄰語音區之間保留的靜音，讓模型仍看得到句子邊界
+VAD_GAP_MS = int(os.getenv("VAD_GAP_MS", "300"))
+
+
+def frame_energy_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = audio[:n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def _runs(mask: np.ndarray) -> list[tuple[int, int]]:
+    """布林陣列中連續 True 的 [start, end) 區間。"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def detect_speech(audio: np.ndarray, sr: int) -> list[tuple[int, int]]:
+    """回傳語音區段 [(start_sample, end_sample)]，已套用 hangover、最短長度、合併與 padding。"""
+    frame = max(1, int(sr * VAD_FRAME_MS / 1000))
+    energy = frame_energy_db(audio, frame)
+    if not len(energy):
+        return []
+    threshold = max(float(np.percentile(energy, 10)) + VAD_MARGIN_DB, VAD_MIN_DB)
+    speech = energy > threshold
+
+    # hangover：語音結束後延續幾個 frame，避免把字尾的弱音切掉
+    hangover = VAD_HANGOVER_MS // VAD_FRAME_MS
+    if hangover:
+        speech = np.convolve(speech.astype(np.int8), np.ones(hangover + 1, dtype=np.int8))[:len(speech)] > 0
+
+    min_speech = VAD_MIN_SPEECH_MS // VAD_FRAME_MS
+    min_silence = VAD_MIN_SILENCE_MS // VAD_FRAME_MS
+    merged = []
+    for start, end in _runs(speech):
+        if merged and start - merged[-1][1] < min_silence:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    pad = int(sr * VAD_PAD_MS / 1000)
+    regions = []
+    for start, end in merged:
+        if end - start < min_speech:
+            continue
+        s, e = max(0, int(start) * frame - pad), min(len(audio), int(end) * frame + pad)
+        if regions and s <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], e)
+        else:
+            regions.append((s, e))
+    return regions
+
+
+@dataclass
+class TimeMap:
+    """壓縮後時間軸 → 原始時間軸。每個語音區在壓縮音訊中的起點、原始起點與長度 (秒)。"""
+    compact_starts: np.ndarray
+    original_starts: np.ndarray
+    lengths: np.ndarray
+
+    def to_original(self, t: float) -> float:
+        if not len(self.compact_starts):
+            return t
+        i = max(0, int(np.searchsorted(self.compact_starts, t, side="right")) - 1)
+        # 落在區段間插入的靜音時，夾到該語音區的結尾
+        return float(self.original_starts[i] + min(max(t - self.compact_starts[i], 0.0), self.lengths[i]))
+
+    def map_segments(self, segments: list[dict]) -> list[dict]:
+        return [{**seg, "start": round(self.to_original(seg["start"]), 2), "end": round(self.to_original(seg["end"]), 2)}
+                for seg in segments]
+
+
+def compact(audio: np.ndarray, regions: list[tuple[int, int]], sr: int, gap_ms: int = VAD_GAP_MS):
+    """只保留語音區 (中間以短靜音隔開)，回傳 (壓縮後音訊, TimeMap)。"""
+    gap = np.zeros(int(sr * gap_ms / 1000), dtype=audio.dtype)
+    pieces, compact_starts, cursor = [], [], 0
+    for i, (start, end) in enumerate(regions):
+        if i:
+            pieces.append(gap)
+            cursor += len(gap)
+        compact_starts.append(cursor)
+        pieces.append(audio[start:end])
+        cursor += end - start
+    timemap = TimeMap(
+        np.array(compact_starts, dtype=np.float64) / sr,
+        np.array([s for s, _ in regions], dtype=np.float64) / sr,
+        np.array([e - s for s, e in regions], dtype=np.float64) / sr,
+    )
+    return (np.concatenate(pieces) if pieces else audio[:0]), timemap
+
+
+def speech_stats(regions: list[tuple[int, int]], total_samples: int, sr: int) -> dict:
+    speech = int(sum(e - s for s, e in regions))
+    return {
+        "regions": len(regions),
+        "speech_seconds": round(speech / sr, 1),
+        "total_seconds": round(total_samples / sr, 1),
+        "skipped_ratio": round(1 - speech / total_samples, 3) if total_samples else 0.0,
+    }
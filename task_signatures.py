@@ -0,0 +1,57 @@
+# task_signatures.py
+# web 端用的 task 代號：只以名稱建立 signature 送進 broker，不 import tasks 本身
+import os
+import uuid
+from celery import chain, group
+
+from celery_app import celery
+
+extract_audio_task = celery.signature('tasks.extract_audio_task')
+transcribe_audio_task = celery.signature('tasks.transcribe_audio_task')
+translate_segments_task = celery.signature('tasks.translate_segments_task')
+summarize_text_task = celery.signature('tasks.summarize_text_task')
+preview_action_items_task = celery.signature('tasks.preview_action_items_task')
+ai_translate_text_task = celery.signature('tasks.ai_translate_text_task')
+ai_summarize_text_task = celery.signature('tasks.ai_summarize_text_task')
+ai_extract_action_items_task = celery.signature('tasks.ai_extract_action_items_task')
+
+
+def si(task, *args, **kwargs):
+    """等同 Task.si()：immutable signature，不接收上一個階段的回傳值。"""
+    return celery.signature(task.task, args=args, kwargs=kwargs, immutable=True)
+
+
+# --- Fused processing pipeline ---
+PIPELINE_STAGES = ('extract', 'transcribe', 'translate', 'summary', 'action_items')
+
+def build_processing_pipeline(input_path, language='auto', target_language='繁體中文', use_demucs=False, model_size=None,
+                              output_stem=None, backend=None, use_vad=None):
+    """extract → transcribe → (translate | summary | action_items)，回傳 (canvas, stages)。
+
+    每個階段的 task_id 事先產生，stages 記錄 task_id 與輸出路徑供進度彙總使用。
+    """
+    stem = output_stem or os.path.splitext(input_path)[0]
+    paths = {
+        'extract': stem + ".wav",
+        'transcribe': stem + ".txt",
+        'translate': stem + "_translated.txt",
+    }
+    stages = {name: {'task_id': str(uuid.uuid4()), 'result_path': paths.get(name)} for name in PIPELINE_STAGES}
+    transcript = paths['transcribe']
+    # 各階段失敗時拋出例外 (raise_on_error)，chain 停在該階段，不會拿不存在的檔案繼續排後面的 task
+    canvas = chain(
+        si(extract_audio_task, input_path, paths['extract'], raise_on_error=True)
+            .set(task_id=stages['extract']['task_id']),
+        si(transcribe_audio_task, paths['extract'], transcript, language, use_demucs, model_size,
+           backend=backend, use_vad=use_vad, raise_on_error=True)
+            .set(task_id=stages['transcribe']['task_id']),
+        group(
+            si(translate_segments_task, transcript, paths['translate'], target_language, raise_on_error=True)
+                .set(task_id=stages['translate']['task_id']),
+            si(summarize_text_task, None, target_language, text_path=transcript, raise_on_error=True)
+                .set(task_id=stages['summary']['task_id']),
+            si(preview_action_items_task, text_path=transcript, raise_on_error=True)
+                .set(task_id=stages['action_items']['task_id']),
+        ),
+    )
+    return canvas, stages
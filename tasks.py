@@ -1,17 +1,18 @@
 import os
-import sys
-import whisper
-import torch
-import shutil
-import subprocess
-import time
-import re
-import json
 import requests
-from celery import Celery, Task
-from opencc import OpenCC
-from moviepy import VideoFileClip
+from celery import Task, states
+from celery.signals import worker_process_init, task_postrun, task_prerun
+from celery.exceptions import Ignore
 from dotenv import load_dotenv
+from celery_app import celery, worker_queues
+from services import dify_client, result_cache, progress_bus, task_queues, action_items
+from services.result_cache import file_digest
+from services.summarizer import build_summary_prompt, SUMMARY_CHUNK_TOKENS
+from services.transcript import Segment, estimate_tokens, render
+from services.segment_store import write_segments
+from services.translator import translate_segments
+# ffmpeg / Whisper / torch / demucs 相關模組在用到的 task 內才 import：
+# 只跑 llm / interactive queue 的 worker 不必載入 (也不佔記憶體)
 
 load_dotenv()
 
@@ -20,112 +21,286 @@ DIFY_TRANSLATOR_API_KEY = os.environ.get("DIFY_TRANSLATOR_API_KEY")
 DIFY_SUMMARIZER_API_KEY = os.environ.get("DIFY_SUMMARIZER_API_KEY")
 DIFY_ACTION_EXTRACTOR_API_KEY = os.environ.get("DIFY_ACTION_EXTRACTOR_API_KEY")
 
-CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
-CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
-celery = Celery('tasks', broker=CELERY_BROKER_URL, backend=CELERY_RESULT_BACKEND)
+@task_prerun.connect
+def record_queue_wait(task=None, **kwargs):
+    enqueued_at = task_queues.header(task.request, task_queues.ENQUEUED_HEADER)
+    if enqueued_at is not None:
+        task_queues.record_wait(task_queues.TASK_ROUTES.get(task.name, {}).get('queue', task_queues.INTERACTIVE_QUEUE), enqueued_at)
+
+@worker_process_init.connect
+def init_worker_models(**kwargs):
+    # 每個 worker process 只載入一次模型，之後的轉錄任務直接共用；不處理 media queue 的 worker 不載入
+    if worker_queues and task_queues.MEDIA_QUEUE not in worker_queues:
+        return
+    from services.transcription import preload_models
+    preload_models()
 
 class ProgressTask(Task):
+    def __call__(self, *args, **kwargs):
+        # 同一使用者在此 queue 執行中的 task 已達上限時延後重排，避免一個人的批次佔滿 worker
+        queue = task_queues.TASK_ROUTES.get(self.name, {}).get('queue', task_queues.INTERACTIVE_QUEUE)
+        user_id = task_queues.header(self.request, task_queues.USER_HEADER)
+        scheduled = not (self.request.called_directly or self.request.is_eager)
+        if scheduled and not task_queues.acquire_slot(queue, user_id, self.request.id):
+            # 以同一個 task_id 重新排到隊尾；不用 retry()，延後不算重試次數也不會變成 RETRY 狀態
+            self.signature_from_request().apply_async(
+                countdown=task_queues.FAIR_RETRY_SECONDS,
+                headers={task_queues.USER_HEADER: user_id,
+                         task_queues.ENQUEUED_HEADER: task_queues.header(self.request, task_queues.ENQUEUED_HEADER)})
+            raise Ignore()
+        try:
+            return self.run(*args, **kwargs)
+        finally:
+            if scheduled:
+                task_queues.release_slot(queue, user_id, self.request.id)
+
     def update_progress(self, current, total, status_msg, extra_info=None):
         meta = {'current': current, 'total': total, 'status_msg': status_msg}
         if extra_info and isinstance(extra_info, dict):
             meta.update(extra_info)
         self.update_state(state='PROGRESS', meta=meta)
+        progress_bus.publish(self.request.id, 'PROGRESS', meta)
 
-def ask_dify(api_key: str, prompt: str, user_id: str = "default-tk-user", inputs: dict = None, response_mode: str = "streaming", conversation_id: str = None, timeout_seconds: int = 1200) -> dict:
+DEFERRED_STATES = (states.IGNORED, states.RETRY, states.REJECTED)
+
+@task_postrun.connect
+def publish_final_state(task_id=None, retval=None, state=None, **kwargs):
+    # 結束狀態也推一次，SSE 端收到後即可關閉該 task 的訂閱
+    if state in DEFERRED_STATES:
+        # 延後重排 (Ignore) 或 retry 的 task 還會再跑，推 PENDING 讓前端繼續追蹤
+        progress_bus.publish(task_id, 'PENDING', {'status_msg': 'Waiting in queue...'})
+        return
+    if isinstance(retval, Exception):
+        info = {'error': str(retval)}
+    else:
+        info = dict(retval) if isinstance(retval, dict) else {'result': str(retval)}
+    if info.get('result_path'):
+        info['download_filename'] = os.path.basename(info['result_path'])
+    progress_bus.publish(task_id, state, info)
+
+def ask_dify(api_key: str, prompt: str, user_id: str = "default-tk-user", inputs: dict = None, response_mode: str = "streaming", conversation_id: str = None, timeout_seconds: int = 1200, on_token=None) -> dict:
     if not api_key or not DIFY_API_BASE_URL:
         return {"answer": "Error: DIFY_API_KEY or DIFY_API_BASE_URL not set."}
-    url = f"{DIFY_API_BASE_URL}/chat-messages"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    payload = {"inputs": inputs or {}, "query": prompt, "user": user_id, "response_mode": response_mode}
-    if conversation_id:
-        payload["conversation_id"] = conversation_id
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=timeout_seconds, stream=(response_mode == 'streaming'))
-        response.raise_for_status()
-        if response_mode == 'streaming':
-            # Handle streaming response
-            return {"answer": "Streaming response handling placeholder"}
-        else:
-            return response.json()
+        return dify_client.chat_message(
+            api_key, prompt, user_id=user_id, inputs=inputs, response_mode=response_mode,
+            conversation_id=conversation_id, timeout=timeout_seconds, on_token=on_token, base_url=DIFY_API_BASE_URL,
+        )
     except requests.exceptions.RequestException as e:
         return {"answer": f"Dify API request error: {e}"}
 
-@celery.task(base=ProgressTask, bind=True)
-def extract_audio_task(self, input_path, output_path):
+@celery.task(base=ProgressTask, bind=True, acks_late=True)
+def extract_audio_task(self, input_path, output_path, raise_on_error=False):
     try:
+        from services.audio import extract_to_wav
         self.update_progress(0, 100, "Starting audio extraction...")
-        video = VideoFileClip(input_path)
-        video.audio.write_audiofile(output_path)
+        extract_to_wav(input_path, output_path,
+                       on_progress=lambda ratio: self.update_progress(int(ratio * 99), 100, "Extracting audio..."))
         self.update_progress(100, 100, "Audio extracted successfully.")
         return {'status': 'Success', 'result_path': output_path}
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
+        if raise_on_error:
+            raise  # pipeline 內重新拋出，chain 才會停在失敗的階段，不再排後面的 task
         return {'status': 'Error', 'error': str(e)}
 
-@celery.task(base=ProgressTask, bind=True)
-def transcribe_audio_task(self, audio_path, output_txt_path, language, use_demucs):
+@celery.task(base=ProgressTask, bind=True, acks_late=True)
+def transcribe_audio_task(self, audio_path, output_txt_path, language, use_demucs, model_size=None, bypass_cache=False,
+                          backend=None, use_vad=None, raise_on_error=False):
     try:
+        from services.audio import decode_pcm
+        from services.transcription import SAMPLE_RATE, get_model, transcribe_chunked
+        from services.vad import TRANSCRIBE_VAD
         self.update_progress(0, 100, "Loading model...")
-        model = whisper.load_model("base")
-        self.update_progress(20, 100, "Transcribing...")
-        result = model.transcribe(audio_path, language=(language if language != 'auto' else None))
+        model, cache_info = get_model(model_size, backend=backend)
+        lang = language if language != 'auto' else None
+        use_vad = TRANSCRIBE_VAD if use_vad is None else use_vad
+        self.update_progress(5, 100, "Hashing audio...", {'model_cache': cache_info})
+        audio_digest = file_digest(audio_path)
+
+        def separate(audio, regions):
+            from services.separation import separate_vocals
+            self.update_progress(20, 100, "Separating vocals...", {'model_cache': cache_info})
+            return separate_vocals(audio, SAMPLE_RATE, audio_digest, regions, on_progress=lambda ratio: self.update_progress(
+                20 + int(ratio * 15), 100, "Separating vocals...", {'model_cache': cache_info}))
+
+        def run_transcription():
+            self.update_progress(10, 100, "Loading audio...", {'model_cache': cache_info})
+            # 影片也可直接丟進來：音軌在記憶體中解碼，不產生中間 WAV
+            audio = decode_pcm(audio_path, on_progress=lambda ratio: self.update_progress(
+                10 + int(ratio * 10), 100, "Decoding audio...", {'model_cache': cache_info}))
+            base = 35 if use_demucs else 20
+            self.update_progress(20, 100, "Transcribing...", {'model_cache': cache_info})
+
+            def on_chunk(done, total, segments):
+                preview = " ".join(s["text"].strip() for s in segments)[-500:]
+                self.update_progress(base + int((95 - base) * done / total), 100, f"Transcribed chunk {done}/{total}",
+                                     {'model_cache': cache_info, 'chunks_done': done, 'chunks_total': total, 'preview': preview})
+
+            return transcribe_chunked(model, audio, language=lang, model_size=model_size, on_chunk=on_chunk,
+                                      backend=backend, use_vad=use_vad, separate=separate if use_demucs else None)
+
+        # 同一份音訊 + backend/模型 + VAD/demucs + 語言只轉錄一次
+        identity = cache_info['key'] + ("+vad" if use_vad else "") + ("+demucs" if use_demucs else "")
+        result = result_cache.cached("transcribe", identity, lang or 'auto', audio_digest,
+                                     run_transcription, bypass=bypass_cache)
+        # 逐段保存 (JSONL + 位移索引)，.txt 則是帶時間戳的 [0000s - 0008s] 格式供後續翻譯 / 摘要使用
+        segments_path = write_segments(os.path.splitext(output_txt_path)[0], result["segments"])
         with open(output_txt_path, "w", encoding="utf-8") as f:
-            f.write(result["text"])
-        self.update_progress(100, 100, "Transcription complete.")
-        return {'status': 'Success', 'result_path': output_txt_path}
+            f.write(render([Segment(s["start"], s["end"], s["text"].strip()) for s in result["segments"]]))
+        # skipped_ratio = VAD 判定為靜音、沒有送進模型的比例
+        vad_stats = result.get("vad")
+        self.update_progress(100, 100, "Transcription complete.", {'model_cache': cache_info, 'vad': vad_stats})
+        return {'status': 'Success', 'result_path': output_txt_path, 'segments_path': segments_path,
+                'segments': len(result["segments"]), 'model_cache': cache_info, 'vad': vad_stats}
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
+        if raise_on_error:
+            raise  # pipeline 內重新拋出，chain 才會停在失敗的階段，不再排後面的 task
         return {'status': 'Error', 'error': str(e)}
 
 @celery.task(base=ProgressTask, bind=True)
-def translate_segments_task(self, input_txt_path, output_txt_path, target_language):
-    # This is a placeholder for a real implementation
+def translate_segments_task(self, input_txt_path, output_txt_path, target_language, bypass_cache=False,
+                            raise_on_error=False):
     try:
         self.update_progress(0, 100, "Starting translation...")
-        with open(input_txt_path, 'r', encoding='utf-8') as f_in, open(output_txt_path, 'w', encoding='utf-8') as f_out:
+        with open(input_txt_path, 'r', encoding='utf-8') as f_in:
             content = f_in.read()
-            # Placeholder translation logic
-            translated_content = f"[Translated to {target_language}]\n{content}"
+
+        def on_batch(done, total, segments):
+            preview = "\n".join(seg.format() for seg in segments)[-1000:]
+            self.update_progress(int(99 * done / total), 100, f"Translated batch {done}/{total}",
+                                 {'batches_done': done, 'batches_total': total, 'preview': preview})
+
+        translate = lambda text, lang: dify_client.translate_text(text, lang, bypass_cache=bypass_cache)
+        translated_content = translate_segments(content, target_language, translate, on_batch=on_batch)
+        with open(output_txt_path, 'w', encoding='utf-8') as f_out:
             f_out.write(translated_content)
         self.update_progress(100, 100, "Translation complete.")
         return {'status': 'Success', 'result_path': output_txt_path, 'content': translated_content}
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
+        if raise_on_error:
+            raise  # pipeline 內重新拋出，chain 才會停在失敗的階段，不再排後面的 task
         return {'status': 'Error', 'error': str(e)}
 
+def _read_text(text_content, text_path):
+    # pipeline 階段之間只傳檔案路徑，由 task 自行讀取內容
+    if text_path:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    return text_content
+
+def _dify_succeeded(response):
+    # ask_dify 失敗時只回傳錯誤字串，不能寫進快取；空白回答也不快取
+    return bool(response.get("message_id")) and not response.get("error") and dify_client.usable_answer(response.get("answer"))
+
+def _summarize_chunk(prompt):
+    # map 階段：各 chunk 獨立呼叫，不沿用 conversation
+    def compute():
+        response = dify_client.chat_message(DIFY_SUMMARIZER_API_KEY, prompt, user_id="default-tk-user",
+                                            response_mode='blocking', timeout=1200, base_url=DIFY_API_BASE_URL)
+        answer = response.get("answer", "")
+        # 錯誤訊息不能當成部分摘要，回傳空字串讓 build_summary_prompt 判定失敗
+        return answer if dify_client.usable_answer(answer) else ""
+    return result_cache.cached("summarize-chunk", DIFY_SUMMARIZER_API_KEY, None, prompt, compute,
+                               should_store=dify_client.usable_answer)
+
 @celery.task(base=ProgressTask, bind=True)
-def summarize_text_task(self, text_content, target_language, conversation_id=None, revision_instruction=None):
+def summarize_text_task(self, text_content, target_language, conversation_id=None, revision_instruction=None, text_path=None, bypass_cache=False,
+                        raise_on_error=False):
     try:
         self.update_progress(1, 100, "Preparing prompt...")
-        prompt = f"Summarize for {target_language}: {text_content}"
-        if revision_instruction:
+        text_content = _read_text(text_content, text_path)
+        if revision_instruction and conversation_id and estimate_tokens(text_content) > SUMMARY_CHUNK_TOKENS:
+            # 長逐字稿的最終摘要已在 conversation 中，只送修改指示
+            prompt = f"Revise the summary above based on '{revision_instruction}'"
+        elif revision_instruction:
             prompt = f"Revise based on '{revision_instruction}': {text_content}"
-        self.update_progress(20, 100, "Requesting Dify API...")
-        response = ask_dify(api_key=DIFY_SUMMARIZER_API_KEY, prompt=prompt, conversation_id=conversation_id, response_mode='blocking')
+        else:
+            prompt = None
+        on_token = lambda partial: self.update_progress(50, 100, "Generating summary...", {'partial_summary': partial})
+
+        if prompt:
+            self.update_progress(50, 100, "Requesting Dify API...")
+            response = ask_dify(api_key=DIFY_SUMMARIZER_API_KEY, prompt=prompt, conversation_id=conversation_id, response_mode='streaming', on_token=on_token)
+        else:
+            def run_summary():
+                def on_partial(stage, done, total):
+                    self.update_progress(5 + int(40 * done / total), 100, f"Summarizing chunks ({stage} {done}/{total})...")
+                final_prompt = build_summary_prompt(text_content, target_language, _summarize_chunk, on_progress=on_partial)
+                self.update_progress(50, 100, "Requesting Dify API...")
+                return ask_dify(api_key=DIFY_SUMMARIZER_API_KEY, prompt=final_prompt, conversation_id=conversation_id, response_mode='streaming', on_token=on_token)
+            # 接續既有 conversation 的請求不走快取
+            response = result_cache.cached("summary", DIFY_SUMMARIZER_API_KEY, target_language, text_content, run_summary,
+                                           bypass=bypass_cache or bool(conversation_id), should_store=_dify_succeeded)
         summary = response.get("answer", "Summary failed")
         new_conv_id = response.get("conversation_id")
         self.update_progress(100, 100, "Summary generated.")
         return {'status': 'Success', 'summary': summary, 'conversation_id': new_conv_id}
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
+        if raise_on_error:
+            raise  # pipeline 內重新拋出，chain 才會停在失敗的階段，不再排後面的 task
         return {'status': 'Error', 'error': str(e)}
 
 @celery.task(base=ProgressTask, bind=True)
-def preview_action_items_task(self, text_content):
+def preview_action_items_task(self, text_content=None, text_path=None, bypass_cache=False, raise_on_error=False):
     try:
-        self.update_progress(10, 100, "Requesting Dify for action items...")
-        response = ask_dify(api_key=DIFY_ACTION_EXTRACTOR_API_KEY, prompt=text_content, response_mode='blocking')
-        answer_text = response.get("answer", "")
-        self.update_progress(80, 100, "Parsing response...")
-        parsed_items = []
-        try:
-            parsed_items = json.loads(answer_text)
-            if not isinstance(parsed_items, list):
-                parsed_items = []
-        except (json.JSONDecodeError, TypeError):
-            parsed_items = []
-        self.update_progress(100, 100, "Action item preview generated.")
-        return {'status': 'Success', 'parsed_items': parsed_items}
+        text_content = _read_text(text_content, text_path)
+        self.update_progress(5, 100, "Requesting Dify for action items...")
+
+        def extract(window):
+            # 每個視窗各自快取；短逐字稿只有一個視窗 (即原文)
+            response = result_cache.cached(
+                "action-preview", DIFY_ACTION_EXTRACTOR_API_KEY, None, window,
+                lambda: ask_dify(api_key=DIFY_ACTION_EXTRACTOR_API_KEY, prompt=window, response_mode='blocking'),
+                bypass=bypass_cache, should_store=_dify_succeeded)
+            return response.get("answer", "")
+
+        def on_window(done, total, items):
+            # 視窗陸續完成時就把目前合併的項目推給前端預覽
+            self.update_progress(5 + int(90 * done / total), 100, f"Extracted window {done}/{total}",
+                                 {'windows_done': done, 'windows_total': total, 'parsed_items': items})
+
+        parsed_items, stats = action_items.extract_windows(text_content, extract, on_window=on_window)
+        if stats['windows'] and stats['failed'] == stats['windows']:
+            raise ValueError("Action item extractor returned no parseable items")
+        self.update_progress(100, 100, "Action item preview generated.", {'windows': stats})
+        return {'status': 'Success', 'parsed_items': parsed_items, 'windows': stats}
+    except Exception as e:
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        if raise_on_error:
+            raise  # pipeline 內重新拋出，chain 才會停在失敗的階段，不再排後面的 task
+        return {'status': 'Error', 'error': str(e)}
+
+# --- AI text tools (ai_routes 的非同步執行路徑) ---
+@celery.task(base=ProgressTask, bind=True)
+def ai_translate_text_task(self, text, target_lang, user_id="system", bypass_cache=False):
+    try:
+        def on_batch(done, total, segments):
+            self.update_progress(int(99 * done / total), 100, f"Translated batch {done}/{total}")
+        translate = lambda t, lang: dify_client.translate_text(t, lang, user_id=user_id, bypass_cache=bypass_cache)
+        return {'status': 'Success', 'translated': translate_segments(text, target_lang, translate, on_batch=on_batch)}
+    except Exception as e:
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        return {'status': 'Error', 'error': str(e)}
+
+@celery.task(base=ProgressTask, bind=True)
+def ai_summarize_text_task(self, text, user_id="system", bypass_cache=False):
+    try:
+        return {'status': 'Success', 'summary': dify_client.summarize_text(text, user_id=user_id, bypass_cache=bypass_cache)}
+    except Exception as e:
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        return {'status': 'Error', 'error': str(e)}
+
+@celery.task(base=ProgressTask, bind=True)
+def ai_extract_action_items_task(self, text, user_id="system", bypass_cache=False):
+    try:
+        def on_window(done, total, items):
+            self.update_progress(int(99 * done / total), 100, f"Extracted window {done}/{total}", {'items': items})
+        items = dify_client.extract_action_items(text, user_id=user_id, bypass_cache=bypass_cache, on_window=on_window)
+        return {'status': 'Success', 'items': items}
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
         return {'status': 'Error', 'error': str(e)}
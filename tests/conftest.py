@@ -0,0 +1,18 @@
+import pytest
+from flask import Flask
+
+from models import db
+
+
+@pytest.fixture
+def db_session():
+    """in-memory SQLite 上的 models，測試結束即丟棄。"""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
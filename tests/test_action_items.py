@@ -0,0 +1,51 @@
+import pytest
+
+from services.action_items import ObjectStream, parse_objects, merge_items
+
+
+def _feed_in_chunks(text, size):
+    stream = ObjectStream()
+    out = []
+    for i in range(0, len(text), size):
+        out += stream.feed(text[i:i + size])
+    return out + stream.close(), stream.dropped
+
+
+ANSWER = """以下是待辦事項：
+```json
+[
+  {"item": "預算", "action": "整理 {Q3} 數字", "owner": "Amy"},
+  {"item": "報告", "action": "寄出 \\"final\\" 版本",},
+  {"item": "截斷", "action": "這一筆沒有收
+```"""
+
+
+@pytest.mark.parametrize("size", [1, 7, len(ANSWER)])
+def test_stream_yields_complete_objects_regardless_of_chunking(size):
+    objects, dropped = _feed_in_chunks(ANSWER, size)
+    assert [o["action"] for o in objects] == ["整理 {Q3} 數字", '寄出 "final" 版本']
+    assert dropped == 1
+
+
+def test_unclosed_object_does_not_swallow_the_following_items():
+    objects, dropped = _feed_in_chunks('[{"action": "a", {"action": "b"}, {"action": "c"}]', 5)
+    assert [o["action"] for o in objects] == ["b", "c"]
+    assert dropped == 1
+
+
+def test_wrapped_items_are_unpacked():
+    items, dropped, ok = parse_objects('{"items": [{"action": "x"}, {"action": " "}]}')
+    assert (items, dropped, ok) == ([{"action": "x"}], 0, True)
+
+
+@pytest.mark.parametrize("answer, ok", [("```json\n[]\n```", True), ("沒有待辦事項", False), (None, False)])
+def test_empty_answers(answer, ok):
+    assert parse_objects(answer) == ([], 0, ok)
+
+
+def test_merge_keeps_first_item_and_fills_missing_fields():
+    merged = merge_items([
+        [{"item": "預算", "action": "整理數字", "owner": None}],
+        [{"item": "預算 ", "action": "整理數字。", "owner": "Amy", "due_date": "2026-11-01"}],
+    ])
+    assert merged == [{"item": "預算", "action": "整理數字", "owner": "Amy", "due_date": "2026-11-01"}]
@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+import action_item_routes
+from action_item_routes import bulk_create_action_items
+from models import ActionItem, Meeting, User
+
+
+@pytest.fixture
+def meeting(db_session):
+    db_session.add_all([User(username=name, password_hash="x") for name in ("alice", "bob@example.com", "Chen Wei")])
+    meeting = Meeting(topic="Planning", meeting_date=date(2024, 1, 1))
+    db_session.add(meeting)
+    db_session.commit()
+    return meeting
+
+
+ITEMS = [
+    {"item": "budget", "action": "send the budget", "owner": "alice", "due_date": "2024-02-01"},
+    {"item": None, "action": "book the room", "owner": "bob"},           # email 前綴
+    {"item": "hiring", "action": "draft the JD", "owner": "chenwei"},   # 去掉空白
+    {"action": "   "},                                                   # 沒有 action，略過
+    {"action": "unassigned", "owner": "nobody at all"},
+    {"action": "explicit owner", "owner_id": 1},
+]
+
+
+def _assert_rows_match(db_session, created):
+    # 回傳的每一筆 id 都要對到資料庫中同一筆代辦與 owner
+    assert [c["action"] for c in created] == [i["action"] for i in ITEMS if i["action"].strip()]
+    for c in created:
+        row = db_session.get(ActionItem, c["id"])
+        assert (row.action, row.item, row.owner_id) == (c["action"], c["item"], c["owner_id"])
+        assert row.due_date == (date.fromisoformat(c["due_date"]) if c["due_date"] else None)
+        assert c["owner_name"] == (db_session.get(User, row.owner_id).username if row.owner_id else None)
+
+
+def test_bulk_insert_returns_ids_in_payload_order(db_session, meeting):
+    created = bulk_create_action_items(meeting, ITEMS)
+    db_session.commit()
+    assert [c["owner_name"] for c in created] == ["alice", "bob@example.com", "Chen Wei", None, "alice"]
+    _assert_rows_match(db_session, created)
+
+
+def test_per_row_fallback_without_returning(db_session, meeting, monkeypatch):
+    # MySQL innodb_autoinc_lock_mode=2：沒有 RETURNING，id 也不保證連續，逐列 INSERT
+    monkeypatch.setattr(db_session.get_bind().dialect, "insert_executemany_returning", False)
+    monkeypatch.setattr(action_item_routes, "_autoinc_step", lambda: None)
+    # 先插一筆別的會議的代辦，確認不會被誤認成這批的資料
+    other = Meeting(topic="Other", meeting_date=date(2024, 1, 2))
+    db_session.add(other)
+    db_session.flush()
+    db_session.add(ActionItem(meeting_id=other.id, action="someone else's"))
+    db_session.flush()
+    created = bulk_create_action_items(meeting, ITEMS)
+    db_session.commit()
+    assert all(db_session.get(ActionItem, c["id"]).meeting_id == meeting.id for c in created)
+    _assert_rows_match(db_session, created)
@@ -0,0 +1,97 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+# app 在 import 時讀取設定，必須先設好
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-that-is-long-enough-for-hs256")
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import app, db  # noqa: E402
+import api_routes  # noqa: E402,F401  (註冊 /api 路由)
+from models import User, Meeting, ActionItem  # noqa: E402
+from services import redis_store  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(redis_store._clients, True, fakeredis.FakeRedis(decode_responses=True))
+    monkeypatch.setitem(redis_store._clients, False, fakeredis.FakeRedis())
+    with app.app_context():
+        db.create_all()
+        user = User(username="alice", password_hash="x", role="user")
+        db.session.add(user)
+        db.session.flush()
+        base = datetime(2026, 1, 1)
+        for i in range(5):
+            # 兩兩同一天，分頁必須以 (meeting_date, id) 排序才不會漏掉或重複
+            meeting = Meeting(topic=f"m{i}", meeting_date=base + timedelta(days=i // 2), created_by_id=user.id)
+            db.session.add(meeting)
+            db.session.flush()
+            for j in range(3):
+                db.session.add(ActionItem(meeting_id=meeting.id, action=f"a{i}-{j}", owner_id=user.id if j else None))
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        test_client = app.test_client()
+        test_client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        yield test_client
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.mark.parametrize("query", ["creator_id=abc", "owner_id=1.5", "date_from=yesterday"])
+def test_malformed_meeting_filters_are_rejected(client, query):
+    response = client.get(f"/api/meetings?{query}")
+    assert response.status_code == 400
+
+
+def test_malformed_owner_filter_on_action_items_is_rejected(client):
+    assert client.get("/api/meetings/1/action_items?owner_id=me").status_code == 400
+    assert len(client.get("/api/meetings/1/action_items?owner_id=1").get_json()) == 2
+
+
+def _walk(client, url):
+    pages, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        pages.append(response.get_json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_meetings_keyset_pages_cover_every_row_once(client):
+    pages = _walk(client, "/api/meetings?limit=2&fields=topic")
+    assert [len(page) for page in pages] == [2, 2, 1]
+    rows = [row for page in pages for row in page]
+    # meeting_date DESC, id DESC；同一天的兩筆不會因為分頁邊界而重複或漏掉
+    assert [row["topic"] for row in rows] == ["m4", "m3", "m2", "m1", "m0"]
+    assert set(rows[0]) == {"id", "topic"}
+
+
+def test_unpaginated_request_returns_the_full_list(client):
+    response = client.get("/api/meetings")
+    assert len(response.get_json()) == 5 and "X-Next-Cursor" not in response.headers
+
+
+def test_action_item_pages_follow_id_order(client):
+    pages = _walk(client, "/api/meetings/1/action_items?limit=1")
+    assert [item["action"] for page in pages for item in page] == ["a0-0", "a0-1", "a0-2"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    api_routes._encode_cursor(5),  # 欄位數不符
+    api_routes._encode_cursor("2026-01-01T00:00:00", "5"),  # id 不是整數
+    api_routes._encode_cursor(5, 5),  # 日期不是字串
+    api_routes._encode_cursor("yesterday", 5),
+])
+def test_malformed_cursors_are_rejected(client, cursor):
+    response = client.get(f"/api/meetings?cursor={cursor}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
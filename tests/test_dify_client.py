@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services import dify_client
+
+
+class StubDify(ThreadingHTTPServer):
+    """本機假 Dify：記錄每把 key 的同時在途數、使用過的連線，前 fail_first 個請求回 503。"""
+    daemon_threads = True
+
+    def __init__(self, delay=0.05, fail_first=0, retry_after=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.delay, self.fail_first, self.retry_after = delay, fail_first, retry_after
+        self.lock = threading.Lock()
+        self.requests, self.connections = 0, set()
+        self.inflight, self.max_inflight = {}, {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive，才看得出連線是否被重用
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        key = self.headers["Authorization"]
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests += 1
+            attempt = server.requests
+            server.connections.add(self.client_address)
+            server.inflight[key] = server.inflight.get(key, 0) + 1
+            server.max_inflight[key] = max(server.max_inflight.get(key, 0), server.inflight[key])
+        time.sleep(server.delay)
+        with server.lock:
+            server.inflight[key] -= 1
+        if attempt <= server.fail_first:
+            self._reply(503, {"message": "busy"}, {"Retry-After": server.retry_after} if server.retry_after else {})
+        else:
+            self._reply(200, {"answer": f"echo:{body['query']}"})
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server = StubDify(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_client(monkeypatch):
+    # 每個測試用新的 session / semaphore，統計寫到本機 fakeredis (沒有安裝時 _record 照常 fail open)
+    monkeypatch.setattr(dify_client, "_session", None)
+    monkeypatch.setattr(dify_client, "_semaphores", {})
+    try:
+        import fakeredis
+    except ImportError:
+        return
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(dify_client, "get_redis", lambda decode_responses=True: client)
+
+
+def _no_sleep(monkeypatch, record=None):
+    # 只換掉 dify_client 看到的 time.sleep，stub server 的 thread 不受影響
+    fake = types.SimpleNamespace(sleep=record or (lambda seconds: None),
+                                 perf_counter=time.perf_counter, monotonic=time.monotonic)
+    monkeypatch.setattr(dify_client, "time", fake)
+
+
+def _call(server, key, query):
+    with dify_client.post(key, "/completion-messages", {"query": query}, base_url=server.url) as resp:
+        return resp.json()["answer"]
+
+
+def _parallel(fn, n):
+    results = [None] * n
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, fn(i))) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_connections_are_pooled(stub):
+    server = stub(delay=0)
+    for i in range(10):
+        assert _call(server, "key-a", f"q{i}") == f"echo:q{i}"
+    assert server.requests == 10
+    assert len(server.connections) == 1
+
+
+def test_concurrency_is_capped_per_key(stub, monkeypatch):
+    monkeypatch.setattr(dify_client, "MAX_CONCURRENCY", 2)
+    server = stub(delay=0.1)
+    results = _parallel(lambda i: _call(server, "key-a" if i % 2 else "key-b", str(i)), 12)
+    assert results == [f"echo:{i}" for i in range(12)]
+    assert server.max_inflight == {"Bearer key-a": 2, "Bearer key-b": 2}
+    # 池內連線數不超過同時在途的請求數
+    assert len(server.connections) <= 4
+
+
+def test_retries_with_backoff(stub, monkeypatch):
+    delays = []
+    _no_sleep(monkeypatch, delays.append)
+    monkeypatch.setattr(dify_client, "BACKOFF_BASE", 0.5)
+    server = stub(delay=0, fail_first=3)
+    assert _call(server, "key-a", "q") == "echo:q"
+    assert server.requests == 4
+    assert len(delays) == 3
+    # full jitter：第 n 次重試的等待落在 [0, base * 2^n]
+    assert all(0 <= d <= 0.5 * 2 ** n for n, d in enumerate(delays))
+
+
+def test_retry_after_is_honoured_and_retries_are_bounded(stub, monkeypatch):
+    delays = []
+    _no_sleep(monkeypatch, delays.append)
+    monkeypatch.setattr(dify_client, "MAX_RETRIES", 2)
+    server = stub(delay=0, fail_first=10, retry_after="3")
+    with pytest.raises(dify_client.requests.HTTPError):
+        _call(server, "key-a", "q")
+    assert server.requests == 3
+    assert delays == [3.0, 3.0]
+
+
+def test_metrics_are_shared_through_redis(stub, monkeypatch):
+    pytest.importorskip("fakeredis")
+    _no_sleep(monkeypatch)
+    server = stub(delay=0, fail_first=1)
+    _call(server, "key-a", "q1")
+    _call(server, "key-a", "q2")
+    m = dify_client.metrics()["/completion-messages"]
+    assert (m["calls"], m["errors"], m["retries"]) == (3, 1, 1)
+    assert m["max_ms"] >= m["last_ms"] > 0
+    assert m["avg_ms"] == round(m["total_ms"] / 3, 1)
+
+
+@pytest.mark.parametrize("answer, stored", [
+    ("翻譯結果", True),
+    ("", False),
+    ("   \n", False),
+    ({"message": "no answer"}, False),
+    ("Error: DIFY_API_KEY or DIFY_API_BASE_URL not set.", False),
+    ("Dify API stream error: quota exceeded", False),
+])
+def test_usable_answer(answer, stored):
+    assert dify_client.usable_answer(answer) is stored
+
+
+def test_empty_translation_is_not_cached(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from services import result_cache
+    cache = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(result_cache, "get_redis", lambda decode_responses=True: cache)
+    monkeypatch.setenv("DIFY_TRANSLATOR_API_KEY", "key-t")
+    answers = iter(["", "hello"])
+    monkeypatch.setattr(dify_client, "_post_completion", lambda *args, **kwargs: next(answers))
+    assert dify_client.translate_text("你好", "English") == ""
+    assert dify_client.translate_text("你好", "English") == "hello"
+    assert dify_client.translate_text("你好", "English") == "hello"  # 第二次的回答才寫進快取
@@ -0,0 +1,50 @@
+import pytest
+
+from models import User
+from services import owner_index as owners
+from services.owner_index import owner_index, resolve_owners
+
+
+@pytest.fixture
+def users(db_session):
+    names = ["john.doe@example.com", "王小明", "alice.wang", "chen1", "chen2"]
+    db_session.add_all(User(username=n, password_hash="x") for n in names)
+    db_session.commit()
+    owner_index.invalidate()
+    return {u.username: u.id for u in db_session.query(User)}
+
+
+def test_aliases_cover_email_prefix_and_separators():
+    assert owners.aliases("John.Doe@Example.com") == {
+        "john.doe@example.com", "john.doe", "johndoe@examplecom", "johndoe"}
+    assert owners.normalize(" 王小明（PM） ") == "王小明"
+
+
+@pytest.mark.parametrize("name, username", [
+    ("John Doe", "john.doe@example.com"),
+    ("JOHN.DOE", "john.doe@example.com"),
+    ("王小明(PM)", "王小明"),
+    ("Alice Wang", "alice.wang"),
+    ("alice.wnag", "alice.wang"),  # 拼錯一個字仍在相似度門檻內
+])
+def test_lookup_resolves_aliases_and_close_matches(users, name, username):
+    assert owner_index.lookup(name) == (users[username], username)
+
+
+@pytest.mark.parametrize("name", ["chen", "bob", ""])
+def test_ambiguous_or_unknown_names_are_not_assigned(users, name):
+    assert owner_index.lookup(name) is None
+
+
+def test_new_users_are_visible_after_insert(users, db_session):
+    assert owner_index.lookup("bob") is None
+    db_session.add(User(username="bob", password_hash="x"))
+    db_session.commit()
+    assert owner_index.lookup("Bob")[1] == "bob"
+
+
+def test_resolve_owners_maps_each_requested_name(users):
+    assert resolve_owners(["王小明", " John Doe ", "nobody", None]) == {
+        "王小明": (users["王小明"], "王小明"),
+        "John Doe": (users["john.doe@example.com"], "john.doe@example.com"),
+    }
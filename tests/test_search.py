@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from models import Meeting, Transcript, TranscriptSegment, Summary
+from services import search
+
+
+@pytest.fixture
+def corpus(db_session):
+    for ddl in search.SQLITE_FTS_DDL:
+        db_session.execute(text(ddl))
+    meeting = Meeting(topic="預算會議", meeting_date=datetime(2026, 3, 1))
+    db_session.add(meeting)
+    db_session.flush()
+    transcript = Transcript(meeting_id=meeting.id, kind="original")
+    db_session.add(transcript)
+    db_session.flush()
+    texts = [
+        "下一季的預算需要重新分配",
+        "午餐吃什麼",
+        "budget, budget and more budget",
+        "budget review <draft> for Q3",
+    ]
+    for seq, content in enumerate(texts):
+        db_session.add(TranscriptSegment(transcript_id=transcript.id, meeting_id=meeting.id, seq=seq,
+                                         start_time=seq * 10.0, end_time=seq * 10.0 + 5, text=content))
+    db_session.add(Summary(meeting_id=meeting.id, language="zh", content="決議：" + "雜項討論。" * 60 + "預算下修一成。"))
+    db_session.commit()
+    return meeting
+
+
+def _texts(result):
+    return [hit["highlight"] for hit in result["segments"]]
+
+
+def test_fulltext_hits_are_ranked_by_relevance(corpus):
+    assert _texts(search.search("預算需要")) == ["下一季的<mark>預算需要</mark>重新分配"]
+    # bm25：詞頻高的舊段落排在較新的段落前面
+    hits = search.search("budget")["segments"]
+    assert [hit["start"] for hit in hits] == [20.0, 30.0]
+    assert search.search("budget", meeting_id=corpus.id)["segments"] == hits
+
+
+def test_highlight_escapes_html_and_marks_every_term(corpus):
+    [hit] = search.search("review Q3")["segments"]
+    assert hit["highlight"] == "budget <mark>review</mark> &lt;draft&gt; for <mark>Q3</mark>"
+    assert hit["meeting_topic"] == "預算會議"
+
+
+def test_summary_snippet_is_centered_on_the_first_hit(corpus):
+    [summary] = search.search("下修")["summaries"]
+    assert summary["highlight"].startswith("…")
+    assert "<mark>下修</mark>" in summary["highlight"]
+
+
+def test_single_character_query_falls_back_to_like(corpus):
+    assert _texts(search.search("餐")) == ["午<mark>餐</mark>吃什麼"]
+    # 短詞與可用索引的詞混用時，短詞在索引命中裡過濾
+    assert _texts(search.search("重新分配 季")) == ["下一<mark>季</mark>的預算需要<mark>重新分配</mark>"]
+    assert search.search("50%")["segments"] == []
+
+
+def test_mysql_uses_fulltext_for_long_terms_and_like_for_short_ones():
+    join, where, order, params = search._match_clause("segments", ["預算", "季"], "mysql")
+    assert "MATCH(x.text) AGAINST (:q IN BOOLEAN MODE)" in where and "LIKE :t0" in where
+    assert params == {"q": '+"預算"', "t0": "%季%"}
+
+    join, where, order, params = search._match_clause("segments", ["季"], "mysql")
+    assert "LIMIT %d" % search.SEARCH_LIKE_SCAN in join and "MATCH" not in where
+    assert search._match_clause("segments", ["季"], "mysql", scoped=True)[0] == ""
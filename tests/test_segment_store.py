@@ -0,0 +1,43 @@
+import json
+
+from services import segment_store
+
+
+def _write(tmp_path, n=10):
+    stem = str(tmp_path / "meeting")
+    segments = [{"start": i * 10.0, "end": i * 10.0 + 8, "text": f" 第 {i} 段 \"quoted\" "} for i in range(n)]
+    segment_store.write_segments(stem, segments)
+    return stem
+
+
+def test_index_records_start_and_line_offset(tmp_path):
+    stem = _write(tmp_path)
+    data_path, index_path = segment_store.paths_for(stem)
+    starts, offsets = segment_store._load_index(index_path)
+    assert segment_store.count(stem) == 10
+    assert starts == [i * 10.0 for i in range(10)]
+    with open(data_path, "rb") as f:
+        data = f.read()
+    for i, offset in enumerate(offsets):
+        line = data[offset:data.index(b"\n", offset)]
+        assert json.loads(line) == {"start": i * 10.0, "end": i * 10.0 + 8, "text": f"第 {i} 段 \"quoted\""}
+
+
+def test_time_window_includes_the_segment_spanning_start(tmp_path):
+    stem = _write(tmp_path)
+    segments, first, total = segment_store.read_segments(stem, start=25.0, end=50.0)
+    assert (first, total) == (2, 10)
+    assert [seg.start for seg in segments] == [20.0, 30.0, 40.0]
+
+    # 落在兩段之間的空檔：前一段已結束，從下一段開始
+    segments, first, _ = segment_store.read_segments(stem, start=29.0, end=31.0)
+    assert first == 3 and [seg.start for seg in segments] == [30.0]
+
+
+def test_offset_and_limit_page_through_segments(tmp_path):
+    stem = _write(tmp_path)
+    segments, first, total = segment_store.read_segments(stem, offset=7, limit=2)
+    assert (first, total) == (7, 10)
+    assert [seg.text for seg in segments] == ['第 7 段 "quoted"', '第 8 段 "quoted"']
+    assert segment_store.read_segments(stem, offset=10) == ([], 10, 10)
+    assert segment_store.read_segments(stem, start=1000.0) == ([], 10, 10)
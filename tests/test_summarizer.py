@@ -0,0 +1,33 @@
+import pytest
+
+from services import summarizer
+
+
+def _transcript(lines):
+    return "\n".join(f"[{i * 10}.00s - {i * 10 + 5}.00s] line {i} " + "word " * 40 for i in range(lines))
+
+
+def test_long_transcript_is_reduced_from_every_part():
+    def complete(prompt):
+        return f"summary of {prompt.split(' of a meeting')[0]}"
+
+    prompt = summarizer.build_summary_prompt(_transcript(40), "en", complete, budget=200, workers=2)
+    assert prompt.startswith("Combine these partial summaries")
+    assert "summary of" in prompt
+
+
+@pytest.mark.parametrize("empty", ["", "   ", None])
+def test_empty_map_window_fails_the_summary(empty):
+    def complete(prompt):
+        return empty if "part 2/" in prompt else "ok"
+
+    with pytest.raises(summarizer.IncompleteSummaryError, match="map: part 2 of"):
+        summarizer.build_summary_prompt(_transcript(40), "en", complete, budget=200, workers=2)
+
+
+def test_empty_merge_fails_the_summary():
+    def complete(prompt):
+        return "" if prompt.startswith("Merge") else "partial " * 60
+
+    with pytest.raises(summarizer.IncompleteSummaryError, match="reduce-1"):
+        summarizer.build_summary_prompt(_transcript(40), "en", complete, budget=200, workers=2)
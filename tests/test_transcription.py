@@ -0,0 +1,90 @@
+import os
+
+import billiard
+import numpy as np
+import pytest
+
+pytest.importorskip("whisper")
+pytest.importorskip("torch")
+
+from services import transcription
+from services.transcription import SAMPLE_RATE, TranscriptionBackend, plan_chunks, transcribe_chunked
+
+
+class EchoBackend(TranscriptionBackend):
+    """每個 chunk 回傳一個 segment，內容記下 chunk 長度與執行的 process。"""
+    name = "echo"
+
+    def load(self, model_size, device):
+        return {"size": model_size, "pid": os.getpid()}
+
+    def detect_language(self, model, audio):
+        return "en"
+
+    def transcribe(self, model, audio, language):
+        middle = len(audio) / SAMPLE_RATE / 2
+        return [{"start": middle, "end": middle + 0.5, "text": f"{len(audio)}:{model['pid']}"}]
+
+
+def _audio(seconds):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+
+
+def _transcribe(audio, workers, queue=None):
+    chunks_done = []
+    result = transcribe_chunked(EchoBackend().load("tiny", "cpu"), audio, language="en", workers=workers,
+                                backend="echo", use_vad=False,
+                                on_chunk=lambda done, total, segments: chunks_done.append((done, total)))
+    result["chunks_done"] = chunks_done
+    if queue is not None:
+        queue.put(result)
+    return result
+
+
+@pytest.fixture
+def echo_backend(monkeypatch):
+    monkeypatch.setitem(transcription.BACKENDS, "echo", EchoBackend())
+    # 20 秒一段，讓短音訊也會切成多個 chunk
+    monkeypatch.setattr(transcription, "plan_chunks", lambda audio: plan_chunks(audio, chunk_seconds=20,
+                                                                                overlap_seconds=1, search_seconds=5))
+
+
+def test_parallel_chunks_match_sequential(echo_backend):
+    audio = _audio(70)
+    sequential = _transcribe(audio, workers=1)
+    parallel = _transcribe(audio, workers=2)
+    assert parallel["chunks"] == sequential["chunks"] == 4
+    assert len(parallel["segments"]) == 4
+    assert [s["start"] for s in parallel["segments"]] == [s["start"] for s in sequential["segments"]]
+    assert [s["text"].split(":")[0] for s in parallel["segments"]] == \
+        [s["text"].split(":")[0] for s in sequential["segments"]]
+    # 平行路徑的 chunk 在子 process 裡轉錄
+    assert {s["text"].split(":")[1] for s in parallel["segments"]} - {str(os.getpid())}
+    assert parallel["chunks_done"] == [(i, 4) for i in range(1, 5)]
+
+
+def test_parallel_chunks_inside_daemon_process(echo_backend):
+    # Celery prefork 的 worker process 是 daemon；在裡面開 pool 不能失敗
+    queue = billiard.get_context("fork").Queue()
+    worker = billiard.get_context("fork").Process(target=_transcribe, args=(_audio(50), 2, queue), daemon=True)
+    worker.start()
+    result = queue.get(timeout=120)
+    worker.join(timeout=30)
+    assert result["chunks"] == 3
+    assert len(result["segments"]) == 3
+
+
+def test_vad_without_speech_falls_back_to_whole_file(echo_backend):
+    # 全靜音：VAD 找不到語音區時仍整段轉錄，不回傳空白逐字稿
+    silent = np.zeros(30 * SAMPLE_RATE, dtype=np.float32)
+    result = transcribe_chunked(EchoBackend().load("tiny", "cpu"), silent, language="en", workers=1, backend="echo", use_vad=True)
+    assert result["vad"]["regions"] == 0
+    assert result["vad"]["fallback"] == "whole_file"
+    assert result["vad"]["skipped_ratio"] == 0.0
+    assert result["chunks"] == 2 and len(result["segments"]) == 2
+
+
+def test_empty_audio_is_an_error(echo_backend):
+    with pytest.raises(ValueError):
+        transcribe_chunked(None, np.zeros(0, dtype=np.float32), backend="echo", use_vad=True)
@@ -0,0 +1,51 @@
+import re
+
+from services.transcript import parse_segments, render
+from services.translator import translate_segments
+
+TEXT = (
+    "I met Dr. Reed at 3.5 p.m. on example.com today.\n"
+    "The budget grew by 12.75% vs. last year, e.g. for Q3.\n"
+    "\n"
+    "Next paragraph here. It has two sentences.\n"
+    "\n\n"
+    "  Indented line after two blank lines."
+)
+
+
+def _echo(text, target_lang):
+    # 依標號原樣回傳，模擬逐行對齊的翻譯
+    return text
+
+
+def test_untimestamped_text_keeps_lines_and_paragraphs():
+    segments = parse_segments(TEXT)
+    assert [seg.text for seg in segments] == [
+        "I met Dr. Reed at 3.5 p.m. on example.com today.",
+        "The budget grew by 12.75% vs. last year, e.g. for Q3.",
+        "Next paragraph here. It has two sentences.",
+        "Indented line after two blank lines.",
+    ]
+    assert render(segments) == TEXT
+
+
+def test_translate_round_trip_across_batches():
+    # 預算壓到每批一行，確認跨批組回時分隔不變
+    assert translate_segments(TEXT, "English", _echo, budget=1, workers=3) == TEXT
+    assert translate_segments(TEXT, "English", _echo) == TEXT
+
+
+def test_translated_lines_keep_original_separators():
+    upper = lambda text, lang: re.sub(r"(<\d+> )(.*)", lambda m: m.group(1) + m.group(2).upper(), text)
+    out = translate_segments(TEXT, "English", upper)
+    assert out == TEXT.upper()
+
+
+def test_timestamped_lines_unchanged():
+    text = "[0000s - 0008s] Hello there. Dr. Reed\n[0008s - 0012s] 3.5 percent"
+    segments = parse_segments(text)
+    assert [(seg.start, seg.end, seg.text) for seg in segments] == [
+        (0.0, 8.0, "Hello there. Dr. Reed"),
+        (8.0, 12.0, "3.5 percent"),
+    ]
+    assert translate_segments(text, "English", _echo) == text
@@ -0,0 +1,57 @@
+import io
+import os
+import time
+
+from services import upload_store
+
+
+def _age(folder, upload_id, seconds):
+    sessions = os.path.join(folder, upload_store.SESSION_DIR)
+    when = time.time() - seconds
+    for name in os.listdir(sessions):
+        if name.startswith(upload_id):
+            os.utime(os.path.join(sessions, name), (when, when))
+
+
+def test_stale_sessions_are_removed(tmp_path):
+    folder = str(tmp_path)
+    stale = upload_store.create_session(folder, "old.wav", 10)
+    active = upload_store.create_session(folder, "new.wav", 10)
+    upload_store.write_chunk(folder, active["upload_id"], 0, io.BytesIO(b"12345"), 5)
+    _age(folder, stale["upload_id"], upload_store.UPLOAD_SESSION_TTL + 60)
+
+    assert upload_store.cleanup_stale_sessions(folder) == 1
+    assert upload_store.session_status(folder, active["upload_id"])["offset"] == 5
+    remaining = os.listdir(os.path.join(folder, upload_store.SESSION_DIR))
+    assert not [name for name in remaining if name.startswith(stale["upload_id"])]
+
+
+def test_creating_a_session_sweeps_abandoned_ones(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    monkeypatch.setattr(upload_store, "_last_sweep", 0.0)
+    abandoned = upload_store.create_session(folder, "old.wav", 10)
+    _age(folder, abandoned["upload_id"], upload_store.UPLOAD_SESSION_TTL + 60)
+    monkeypatch.setattr(upload_store, "_last_sweep", 0.0)
+
+    upload_store.create_session(folder, "new.wav", 10)
+    remaining = os.listdir(os.path.join(folder, upload_store.SESSION_DIR))
+    assert len(remaining) == 2 and not [name for name in remaining if name.startswith(abandoned["upload_id"])]
+
+
+def test_blob_is_only_owned_by_users_who_uploaded_it(tmp_path):
+    folder = str(tmp_path)
+    data = b"meeting audio"
+    session = upload_store.create_session(folder, "a.wav", len(data), user_id="1")
+    upload_store.write_chunk(folder, session["upload_id"], 0, io.BytesIO(data), len(data))
+    digest = upload_store.finalize(folder, session["upload_id"])["sha256"]
+
+    assert upload_store.find_blob(folder, digest)
+    assert upload_store.owns_blob(folder, digest, "1")
+    assert not upload_store.owns_blob(folder, digest, "2")
+
+    # 第二位使用者完整上傳同樣內容後才取得引用權，儲存仍只有一份
+    session = upload_store.create_session(folder, "b.wav", len(data), user_id="2")
+    upload_store.write_chunk(folder, session["upload_id"], 0, io.BytesIO(data), len(data))
+    assert upload_store.finalize(folder, session["upload_id"])["deduplicated"]
+    assert upload_store.owns_blob(folder, digest, "2")
+    assert len(os.listdir(os.path.join(folder, upload_store.BLOB_DIR))) == 1
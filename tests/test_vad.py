@@ -0,0 +1,50 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services import vad  # noqa: E402
+
+SR = 16000
+
+
+def test_compact_time_maps_back_to_the_original_timeline():
+    audio = np.arange(10 * SR, dtype=np.float32)
+    regions = [(1 * SR, 3 * SR), (6 * SR, 7 * SR)]
+    compacted, timemap = vad.compact(audio, regions, SR, gap_ms=500)
+
+    assert len(compacted) == 3 * SR + SR // 2
+    # 第二個語音區在壓縮音訊中從 2.5s 開始，對應原始的 6s
+    assert compacted[int(2.5 * SR)] == audio[6 * SR]
+    assert timemap.to_original(0.0) == 1.0
+    assert timemap.to_original(1.5) == 2.5
+    assert timemap.to_original(2.75) == 6.25
+    # 插入的靜音夾到前一個語音區的結尾
+    assert timemap.to_original(2.2) == 3.0
+
+
+def test_map_segments_rewrites_start_and_end_only():
+    timemap = vad.TimeMap(np.array([0.0, 2.3]), np.array([60.0, 125.0]), np.array([2.0, 4.0]))
+    segments = [{"start": 0.5, "end": 2.15, "text": "a"}, {"start": 2.3, "end": 3.333, "text": "b"}]
+    assert timemap.map_segments(segments) == [
+        {"start": 60.5, "end": 62.0, "text": "a"},
+        {"start": 125.0, "end": 126.03, "text": "b"},
+    ]
+
+
+def test_empty_time_map_is_identity():
+    _, timemap = vad.compact(np.zeros(SR, dtype=np.float32), [], SR)
+    assert timemap.to_original(12.5) == 12.5
+
+
+def test_detect_speech_skips_long_silence():
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 1e-4, 12 * SR).astype(np.float32)
+    t = np.arange(2 * SR) / SR
+    audio[2 * SR:4 * SR] += 0.3 * np.sin(2 * np.pi * 220 * t)
+    audio[8 * SR:10 * SR] += 0.3 * np.sin(2 * np.pi * 220 * t)
+
+    regions = vad.detect_speech(audio, SR)
+    assert len(regions) == 2
+    for (start, end), expected in zip(regions, (2, 8)):
+        assert abs(start / SR - (expected - vad.VAD_PAD_MS / 1000)) < 0.05
+        assert end / SR > expected + 2
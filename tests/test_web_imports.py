@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# web process 不能載入 worker 端的重型模組 (見 benchmarks/bench_import.py)
+WORKER_ONLY = ["tasks", "whisper", "torch", "numpy", "demucs", "services.transcription", "services.audio", "services.vad"]
+
+
+def test_web_process_does_not_import_ml_modules():
+    env = {**os.environ, "DATABASE_URL": "sqlite://", "JWT_SECRET_KEY": "test-secret-key-that-is-long-enough-for-hs256"}
+    code = f"import sys, app; print(','.join(m for m in {WORKER_ONLY!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
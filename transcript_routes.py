@@ -0,0 +1,136 @@
+# transcript_routes.py
+import os
+from flask import Blueprint, request, jsonify, current_app, Response
+from flask_jwt_extended import jwt_required
+from werkzeug.utils import secure_filename
+from sqlalchemy import insert
+from models import db, Meeting, Transcript, TranscriptSegment, Summary
+from services import segment_store, search
+from services.transcript import parse_segments, render, render_srt, render_vtt
+
+transcript_bp = Blueprint("transcript_bp", __name__, url_prefix="/api")
+
+TRANSCRIPT_PAGE_SIZE = 200
+TRANSCRIPT_MAX_PAGE_SIZE = 2000
+
+_FORMATS = {
+    "txt": ("text/plain; charset=utf-8", ".txt"),
+    "srt": ("application/x-subrip; charset=utf-8", ".srt"),
+    "vtt": ("text/vtt; charset=utf-8", ".vtt"),
+}
+
+def _float_arg(name):
+    value = request.args.get(name)
+    return float(value) if value not in (None, "") else None
+
+@transcript_bp.get("/transcripts/<filename>")
+@jwt_required()
+def get_transcript(filename):
+    """讀取轉錄結果的一段或全部。
+
+    filename 為轉錄 task 的 download_filename (例如 <uuid>.txt)。
+    ?format=json|txt|srt|vtt  ?start=&end= 時間窗 (秒)  ?offset=&limit= 段落分頁
+    """
+    stem = os.path.join(current_app.config['UPLOAD_FOLDER'], os.path.splitext(secure_filename(filename))[0])
+    if not os.path.exists(segment_store.paths_for(stem)[1]):
+        return jsonify({"error": "transcript segments not found"}), 404
+    fmt = request.args.get("format", "json")
+    if fmt != "json" and fmt not in _FORMATS:
+        return jsonify({"error": f"format must be one of json, {', '.join(_FORMATS)}"}), 400
+    try:
+        start, end = _float_arg("start"), _float_arg("end")
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = request.args.get("limit")
+        limit = int(limit) if limit else (TRANSCRIPT_PAGE_SIZE if fmt == "json" else None)
+    except ValueError:
+        return jsonify({"error": "start/end must be numbers, offset/limit integers"}), 400
+    if fmt == "json" and limit is not None:
+        limit = max(1, min(limit, TRANSCRIPT_MAX_PAGE_SIZE))
+
+    segments, first, total = segment_store.read_segments(stem, start, end, offset, limit)
+    if fmt == "json":
+        next_offset = first + len(segments)
+        return jsonify({
+            "segments": [{"index": first + i, "start": s.start, "end": s.end, "text": s.text} for i, s in enumerate(segments)],
+            "offset": first,
+            "total": total,
+            "next_offset": next_offset if next_offset < total and (end is None or len(segments) == limit) else None,
+        })
+
+    mimetype, ext = _FORMATS[fmt]
+    body = render_srt(segments, first_index=first + 1) if fmt == "srt" else render_vtt(segments) if fmt == "vtt" else render(segments)
+    headers = {}
+    if request.args.get("download") == "1":
+        headers["Content-Disposition"] = f"attachment; filename={os.path.basename(stem)}{ext}"
+    return Response(body, mimetype=mimetype, headers=headers)
+
+# --- 存進資料庫 (與 Meeting 關聯) 與全文搜尋 ---
+@transcript_bp.post("/meetings/<int:meeting_id>/transcripts")
+@jwt_required()
+def import_transcript(meeting_id):
+    """把轉錄結果存進資料庫。body: {filename: 轉錄 task 的 download_filename} 或 {text: 帶時間戳的逐字稿}。"""
+    if not db.session.get(Meeting, meeting_id):
+        return jsonify({"error": "meeting not found"}), 404
+    data = request.get_json(force=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    if filename:
+        stem = os.path.join(current_app.config['UPLOAD_FOLDER'], os.path.splitext(filename)[0])
+        if not os.path.exists(segment_store.paths_for(stem)[1]):
+            return jsonify({"error": "transcript segments not found"}), 404
+        segments, _, _ = segment_store.read_segments(stem)
+    elif (data.get("text") or "").strip():
+        segments = parse_segments(data["text"])
+    else:
+        return jsonify({"error": "filename or text is required"}), 400
+
+    transcript = Transcript(meeting_id=meeting_id, language=data.get("language"),
+                            kind=data.get("kind") or "original", source_filename=filename or None)
+    db.session.add(transcript)
+    db.session.flush()
+    if segments:
+        # executemany 一次寫入；全文索引由 DB (FULLTEXT / FTS5 trigger) 維護
+        db.session.execute(insert(TranscriptSegment), [
+            {"transcript_id": transcript.id, "meeting_id": meeting_id, "seq": i,
+             "start_time": seg.start, "end_time": seg.end, "text": seg.text}
+            for i, seg in enumerate(segments)
+        ])
+    db.session.commit()
+    return jsonify(transcript.to_dict(segment_count=len(segments))), 201
+
+@transcript_bp.get("/meetings/<int:meeting_id>/transcripts")
+@jwt_required()
+def list_transcripts(meeting_id):
+    rows = (db.session.query(Transcript, db.func.count(TranscriptSegment.id))
+            .outerjoin(TranscriptSegment, TranscriptSegment.transcript_id == Transcript.id)
+            .filter(Transcript.meeting_id == meeting_id)
+            .group_by(Transcript.id)
+            .order_by(Transcript.id).all())
+    return jsonify([transcript.to_dict(segment_count=count) for transcript, count in rows])
+
+@transcript_bp.post("/meetings/<int:meeting_id>/summaries")
+@jwt_required()
+def import_summary(meeting_id):
+    if not db.session.get(Meeting, meeting_id):
+        return jsonify({"error": "meeting not found"}), 404
+    data = request.get_json(force=True) or {}
+    content = (data.get("content") or "").strip()
+    if not content:
+        return jsonify({"error": "content is required"}), 400
+    summary = Summary(meeting_id=meeting_id, language=data.get("language"), content=content)
+    db.session.add(summary)
+    db.session.commit()
+    return jsonify(summary.to_dict()), 201
+
+@transcript_bp.get("/search")
+@jwt_required()
+def search_meetings():
+    """全文搜尋逐字稿段落與摘要；?q=關鍵字 (空白分隔、全部需命中) &limit= &meeting_id="""
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        limit = int(request.args.get("limit", search.SEARCH_DEFAULT_LIMIT))
+        meeting_id = int(request.args["meeting_id"]) if request.args.get("meeting_id") else None
+    except ValueError:
+        return jsonify({"error": "limit and meeting_id must be integers"}), 400
+    return jsonify(search.search(q, limit=limit, meeting_id=meeting_id))
@@ -0,0 +1,83 @@
+# upload_routes.py
+import re
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.utils import secure_filename
+from services import upload_store
+from services.upload_store import UploadError
+
+upload_bp = Blueprint("upload_bp", __name__, url_prefix="/api")
+
+# 分段上傳：POST 建立 session → PUT (Content-Range) 逐段寫入 → POST complete 取得 blob
+# 斷線後 GET 取得已提交的 offset，從那裡繼續 PUT
+_CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+def _folder():
+    return current_app.config['UPLOAD_FOLDER']
+
+def _max_size():
+    return current_app.config.get('MAX_CONTENT_LENGTH')
+
+def _own_session(upload_id):
+    meta = upload_store.session_status(_folder(), upload_id)
+    if str(meta.get("user_id")) != str(get_jwt_identity()):
+        raise UploadError("upload not found", 404)
+    return meta
+
+@upload_bp.errorhandler(UploadError)
+def _upload_error(e):
+    return jsonify({"error": str(e), **e.extra}), e.status
+
+@upload_bp.post("/uploads")
+@jwt_required()
+def create_upload():
+    data = request.get_json(force=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    if not filename:
+        return jsonify({"error": "filename is required"}), 400
+    try:
+        size = int(data["size"]) if data.get("size") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid size"}), 400
+    # 前端先算好 sha256 時，自己上傳過的相同內容不必再傳；別人的檔案必須完整上傳一次證明持有
+    digest = (data.get("sha256") or "").lower()
+    if upload_store.owns_blob(_folder(), digest, get_jwt_identity()) and upload_store.find_blob(_folder(), digest):
+        return jsonify({"complete": True, "blob": digest, "sha256": digest, "deduplicated": True})
+    meta = upload_store.create_session(_folder(), filename, size, get_jwt_identity(), _max_size())
+    return jsonify({"upload_id": meta["upload_id"], "offset": 0, "size": size}), 201
+
+@upload_bp.get("/uploads/<upload_id>")
+@jwt_required()
+def upload_status(upload_id):
+    meta = _own_session(upload_id)
+    return jsonify({"upload_id": upload_id, "offset": meta["offset"], "size": meta.get("size")})
+
+@upload_bp.put("/uploads/<upload_id>")
+@jwt_required()
+def upload_chunk(upload_id):
+    _own_session(upload_id)
+    m = _CONTENT_RANGE_RE.match(request.headers.get("Content-Range", ""))
+    if not m:
+        return jsonify({"error": "Content-Range: bytes <start>-<end>/<total> is required"}), 400
+    start, end = int(m.group(1)), int(m.group(2))
+    total = int(m.group(3)) if m.group(3) != "*" else None
+    length = end - start + 1
+    if length <= 0 or (request.content_length is not None and request.content_length != length):
+        return jsonify({"error": "Content-Range does not match body length"}), 400
+    # request.stream 直接串流寫檔，不把整段 body 讀進記憶體
+    meta = upload_store.write_chunk(_folder(), upload_id, start, request.stream, length, total, _max_size())
+    return jsonify({"upload_id": upload_id, "offset": meta["offset"], "size": meta.get("size")})
+
+@upload_bp.post("/uploads/<upload_id>/complete")
+@jwt_required()
+def complete_upload(upload_id):
+    _own_session(upload_id)
+    result = upload_store.finalize(_folder(), upload_id)
+    return jsonify({"complete": True, **result})
+
+@upload_bp.delete("/uploads/<upload_id>")
+@jwt_required()
+def abort_upload(upload_id):
+    _own_session(upload_id)
+    upload_store.abort(_folder(), upload_id)
+    return jsonify({"message": "upload aborted"})